@@ -15,6 +15,9 @@ from datetime import datetime, timedelta
 import FinanceDataReader as fdr
 
 from scripts.core.scorer import MarketScorer
+from scripts.core.fetcher import StockDataFetcher
+from scripts.core.price_store import PriceStore
+from scripts.config import PATHS
 
 # ===== CONFIG =====
 INITIAL_CAPITAL = 100000
@@ -23,6 +26,7 @@ EXIT_RANK = 20
 MAX_POSITIONS = 20
 FEE_RATE = 0.0025  # 0.25%
 START_DATE = "2020-01-01"  # Fetch from early 2020 to have enough warmup for 2020-12-24 start
+CACHE_DIR = PATHS['CACHE_DIR']
 
 def load_financials():
     """Load financial data (assuming static for backtest)"""
@@ -46,34 +50,19 @@ def get_sp500_tickers():
         return [d['ticker'] for d in data]
 
 def fetch_price_data(tickers, start_date, end_date):
-    """Fetch historical price data for all tickers"""
+    """Fetch historical price data for all tickers (via local price store)"""
     print(f"📈 Fetching price data: {start_date} to {end_date}")
     
-    all_data = []
-    for i, ticker in enumerate(tickers):
-        if i % 50 == 0:
-            print(f"   Progress: {i}/{len(tickers)}")
-        try:
-            df = fdr.DataReader(ticker, start_date, end_date)
-            if df is not None and len(df) > 0:
-                df = df.reset_index()
-                df['Ticker'] = ticker
-                # Rename 'index' to 'Date' if needed
-                if 'index' in df.columns:
-                    df = df.rename(columns={'index': 'Date'})
-                # Select only the columns we need
-                cols = ['Date', 'Ticker', 'Open', 'High', 'Low', 'Close', 'Volume']
-                df = df[[c for c in cols if c in df.columns]]
-                all_data.append(df)
-        except Exception as e:
-            pass
-    
-    print(f"   Collected data from {len(all_data)} tickers")
+    # Only bars missing from data/price_store are downloaded
+    fetcher = StockDataFetcher()
+    df = fetcher.fetch_price_history_bulk(tickers, start_date=start_date, store=PriceStore(), min_rows=1)
     
-    if not all_data:
+    if df.empty:
         return pd.DataFrame()
     
-    return pd.concat(all_data, ignore_index=True)
+    df = df[pd.to_datetime(df['Date']) <= pd.Timestamp(end_date)]
+    print(f"   Collected data from {df['Ticker'].nunique()} tickers")
+    return df.reset_index(drop=True)
 
 def run_backtest():
     print("=" * 60)
@@ -122,28 +111,25 @@ def run_backtest():
     rebalance_days = trading_days[::5]
     print(f"📊 Rebalance dates: {len(rebalance_days)}")
     
+    # Score all rebalance dates in one pass (cached across runs)
+    day_counts = price_df.groupby('Date').size()
+    cube = scorer.score_panel(price_df, financials, consensus, dates=rebalance_days,
+                              cache_path=os.path.join(CACHE_DIR, 'score_cube_v2.pkl'))
+    
     for i, date in enumerate(rebalance_days):
         if i % 50 == 0:
             print(f"   Simulating: {i}/{len(rebalance_days)} ({date.date()})")
         
-        # Get daily data
-        daily_df = price_df[price_df['Date'] == date].copy()
-        
-        if len(daily_df) < 100:  # Need enough stocks
+        if day_counts.get(date, 0) < 100:  # Need enough stocks
             continue
         
-        # Calculate scores
-        try:
-            scored_df = scorer.apply_sector_scoring(daily_df, financials, consensus)
-        except Exception as e:
-            continue
-        
-        if scored_df.empty:
+        if date not in cube['Rank'].index:
             continue
         
         # Create rank map
-        rank_map = dict(zip(scored_df['Ticker'], scored_df['Rank']))
-        price_map = dict(zip(scored_df['Ticker'], scored_df['Close']))
+        ranks = cube['Rank'].loc[date].dropna()
+        rank_map = ranks.to_dict()
+        price_map = cube['Close'].loc[date, ranks.index].to_dict()
         
         # 1. Mark to market
         total_value = cash
@@ -176,17 +162,16 @@ def run_backtest():
         # 3. Buy: Top N (if room)
         open_slots = MAX_POSITIONS - len(portfolio)
         if open_slots > 0:
-            top_stocks = scored_df[scored_df['Rank'] <= TOP_N].sort_values('Rank')
+            top_stocks = ranks[ranks <= TOP_N].sort_values(kind='stable')
             
-            for _, row in top_stocks.iterrows():
+            for ticker in top_stocks.index:
                 if open_slots <= 0:
                     break
                     
-                ticker = row['Ticker']
                 if ticker in portfolio:
                     continue
                 
-                price = row['Close']
+                price = price_map[ticker]
                 target_value = total_value / MAX_POSITIONS
                 
                 if cash > target_value * 0.9:
@@ -3,6 +3,27 @@ import subprocess
 import sys
 import os
 import time
+from datetime import datetime
+from scripts.core.metrics import append_metrics, children_cpu_s, peak_rss_mb
+
+# One id per workflow run (groups the step records in data/run_metrics.jsonl)
+RUN_ID = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+def record_step(step_name, script_relative_path, duration, cpu_start, status):
+    """Append one step's duration / resource usage to the run metrics log"""
+    cpu_end = children_cpu_s()
+    try:
+        append_metrics([{
+            "run_id": RUN_ID, "source": "daily_workflow", "stage": step_name,
+            "component": script_relative_path,
+            "started_at": datetime.fromtimestamp(time.time() - duration).strftime('%Y-%m-%d %H:%M:%S'),
+            "status": status,
+            "wall_s": round(duration, 3),
+            "cpu_s": round(cpu_end - cpu_start, 3) if cpu_start is not None else None,
+            "peak_rss_mb": peak_rss_mb('children'),  # largest child so far
+        }])
+    except Exception as e:
+        print(f"⚠️ Failed to record step metrics: {e}")
 
 def run_step(script_relative_path, step_name):
     """Runs a python script and handles errors."""
@@ -19,10 +40,13 @@ def run_step(script_relative_path, step_name):
         sys.exit(1)
 
     start_time = time.time()
+    cpu_start = children_cpu_s()
     try:
         # Force UTF-8 encoding for the subprocess to handle emojis correctly on Windows
         env = os.environ.copy()
         env["PYTHONIOENCODING"] = "utf-8"
+        # Project root on the path: steps import `scripts.*` (engine.py has no sys.path setup)
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (base_dir, env.get("PYTHONPATH")) if p)
 
         # Use simple python command invocation
         cmd = [sys.executable, script_path]
@@ -35,7 +59,8 @@ def run_step(script_relative_path, step_name):
             text=True, 
             encoding='utf-8',
             errors='replace',
-            env=env
+            env=env,
+            cwd=base_dir
         )
         
         # Read output in real-time
@@ -49,13 +74,16 @@ def run_step(script_relative_path, step_name):
             
         duration = time.time() - start_time
         print(f"\n✅ FINISHED STEP: {step_name} (took {duration:.1f}s)")
+        record_step(step_name, script_relative_path, duration, cpu_start, "ok")
         return True
         
     except subprocess.CalledProcessError as e:
+        record_step(step_name, script_relative_path, time.time() - start_time, cpu_start, f"error: exit {e.returncode}")
         print(f"\n❌ FAILED STEP: {step_name}")
         print(f"Error Code: {e.returncode}")
         sys.exit(1)
     except Exception as e:
+        record_step(step_name, script_relative_path, time.time() - start_time, cpu_start, f"error: {type(e).__name__}")
         print(f"\n❌ UNEXPECTED ERROR in {step_name}: {str(e)}")
         sys.exit(1)
 
@@ -66,6 +94,7 @@ def main():
     # 1. Update Consensus & Calendar Data
     # This script fetches latest earnings dates and wall street targets
     # [DISABLED] Skipping API calls due to rate limits
+    # (re-enable after one verified end-to-end run with the shared limiter / HTTP cache)
     # run_step("update_daily_data.py", "Update Consensus & Calendar Data")
 
     # 2. Run Core Engine
@@ -75,7 +104,7 @@ def main():
 
     # 3. Generate Social Images
     # Reads data.json, generates ranking/oversold/golden-cross/earnings images via Playwright
-    # Note: This step also fetches live 100-day data for Golden Cross calculation (top 500 stocks)
+    # Note: Golden Cross / RSI come from the engine's signals / technical_analysis in data.json (no API calls)
     run_step(os.path.join("scripts", "social_gen", "generator.py"), "Generate Social Media Images")
 
     # 4. Send to Telegram
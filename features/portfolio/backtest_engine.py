@@ -6,14 +6,16 @@
 """
 import sys
 import os
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 import pandas as pd
 import numpy as np
 import json
 from datetime import datetime, timedelta
 import yfinance as yf
-from core.scorer import MarketScorer
+from scripts.core.scorer import MarketScorer
+from scripts.core.price_store import PriceStore
+from scripts.config import DATA_DIR, PATHS
 
 # ===== CONFIG =====
 INITIAL_CAPITAL = 100000
@@ -22,6 +24,7 @@ EXIT_RANK = 20
 MAX_POSITIONS = 20
 FEE_RATE = 0.0025  # 0.25%
 START_DATE = "2020-01-01"  # Warmup start
+DIV_STORE_DIR = os.path.join(DATA_DIR, 'price_store_div')  # Raw prices + Dividends (yfinance)
 
 def load_financials():
     df = pd.read_csv('data/financials.csv')
@@ -36,9 +39,8 @@ def get_sp500_tickers():
         data = json.load(f)
     return [d['ticker'] for d in data]
 
-def fetch_data_with_dividends(tickers, start_date, end_date):
-    print(f"📈 Fetching Price & Dividend data: {start_date} to {end_date}")
-    
+def download_with_dividends(tickers, start_date, end_date):
+    """Download raw OHLCV + Dividends from yfinance -> {Ticker: DF}"""
     # Chunking to avoid massive requests failing
     chunk_size = 50
     all_data = {}
@@ -87,6 +89,47 @@ def fetch_data_with_dividends(tickers, start_date, end_date):
         except Exception as e:
             print(f"⚠️ Chunk failed: {e}")
             
+    return all_data
+
+def fetch_data_with_dividends(tickers, start_date, end_date, store=None):
+    """
+    Price & Dividend history via the local price store.
+    Only tickers without stored history back to start_date are downloaded in full;
+    the rest only fetch bars after their last stored bar.
+    """
+    print(f"📈 Fetching Price & Dividend data: {start_date} to {end_date}")
+    store = store or PriceStore(DIV_STORE_DIR)
+    start_ts = pd.Timestamp(start_date)
+    
+    # Group tickers by the date we need to download from
+    fetch_groups = {}
+    for ticker in tickers:
+        known_start = store.history_start(ticker)
+        last = store.last_date(ticker)
+        if known_start is None or known_start > start_ts or last is None:
+            fetch_groups.setdefault(start_ts, []).append(ticker)
+        else:
+            fetch_groups.setdefault(pd.Timestamp(last), []).append(ticker)
+    
+    for group_start, group in sorted(fetch_groups.items()):
+        full_history = group_start == start_ts
+        print(f"   {'Full' if full_history else 'Incremental'} download from {group_start.date()} ({len(group)} tickers)")
+        fresh = download_with_dividends(group, group_start.strftime('%Y-%m-%d'), end_date)
+        for ticker, t_df in fresh.items():
+            t_df = t_df.copy()
+            t_df['Date'] = pd.to_datetime(t_df['Date']).dt.tz_localize(None)
+            if full_history:
+                store.write(ticker, t_df, history_start=start_ts)
+            else:
+                store.append(ticker, t_df)
+    store.save_meta()
+    
+    all_data = {}
+    for ticker in tickers:
+        t_df = store.window(ticker, start_ts, end_date)
+        if not t_df.empty:
+            all_data[ticker] = t_df
+            
     print(f"✓ Fetched data for {len(all_data)} tickers")
     return all_data
 
@@ -146,6 +189,12 @@ def run_backtest():
     # Rebalance every 5 trading days
     rebalance_idx = 0
     
+    # Score every rebalance date in one pass (cached across runs)
+    rebalance_days = trading_days[4::5]
+    day_counts = price_df.groupby('Date').size()
+    cube = scorer.score_panel(price_df, financials, consensus, dates=rebalance_days,
+                              cache_path=os.path.join(PATHS['CACHE_DIR'], 'score_cube_v3_div.pkl'))
+    
     print(f"📅 Simulation start: {trading_days[0].date()} to {trading_days[-1].date()}")
     
     for date in trading_days:
@@ -179,16 +228,15 @@ def run_backtest():
         if rebalance_idx >= 5:
             rebalance_idx = 0
             
-            # Get Daily Slice
-            daily_df = price_df[price_df['Date'] == date].copy()
-            if len(daily_df) > 100:
+            # Scores for this date (from the score cube)
+            if day_counts.get(date, 0) > 100 and date in cube['Rank'].index:
                 # Scoring
                 try:
-                    scored_df = scorer.apply_sector_scoring(daily_df, financials, consensus)
+                    ranks = cube['Rank'].loc[date].dropna()
                     
-                    if not scored_df.empty:
-                        rank_map = dict(zip(scored_df['Ticker'], scored_df['Rank']))
-                        price_map = dict(zip(scored_df['Ticker'], scored_df['Close']))
+                    if not ranks.empty:
+                        rank_map = ranks.to_dict()
+                        price_map = cube['Close'].loc[date, ranks.index].to_dict()
                         
                         # 1. Mark to Market & Sell
                         current_pf_value = cash
@@ -223,13 +271,12 @@ def run_backtest():
                                 
                             target_alloc = curr_val_for_alloc / MAX_POSITIONS
                             
-                            candidates = scored_df[scored_df['Rank'] <= TOP_N].sort_values('Rank')
-                            for _, row in candidates.iterrows():
+                            candidates = ranks[ranks <= TOP_N].sort_values(kind='stable')
+                            for ticker in candidates.index:
                                 if open_slots <= 0: break
-                                ticker = row['Ticker']
                                 if ticker in portfolio: continue
                                 
-                                price = row['Close']
+                                price = price_map[ticker]
                                 if cash > target_alloc * 0.9:
                                     qty = int(target_alloc / (price * (1 + FEE_RATE)))
                                     if qty > 0:
@@ -4,12 +4,13 @@ import os
 # Ensure scripts directory is in path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from scripts.core.engine import NaspickEngine
+from scripts.core.engine import NaspickEngine, parse_args
 
 if __name__ == "__main__":
     # Facade Pattern: Delegates all logic to the core engine
     # This maintains compatibility with GitHub Actions
     
     print("🔄 Naspick Facade: Redirecting to Core Engine...")
+    args = parse_args()
     app = NaspickEngine()
-    app.run()
+    app.run(resume=args.resume, from_stage=args.from_stage)
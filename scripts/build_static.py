@@ -1,14 +1,25 @@
 
 import json
 import os
+import sys
 import shutil
-from datetime import datetime
+import re
+import html
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.core.compress import Precompressor, data_json_files
+from scripts.config import PATHS, PRECOMPRESS_WORKERS
 
 # Configuration
 DATA_PATH = os.path.join("data", "data.json")
 TEMPLATE_KO = "page.html"
 TEMPLATE_EN = os.path.join("en", "page.html")
 OUTPUT_DIR = "."  # Root directory
+MANIFEST_PATH = PATHS['BUILD_MANIFEST']
+CHANGED_TICKERS_PATH = PATHS['CHANGED_TICKERS']
 
 SECTOR_SLUGS = {
     "Technology": "technology",
@@ -42,128 +53,231 @@ def load_data():
     with open(DATA_PATH, "r", encoding="utf-8") as f:
         return json.load(f)
 
+def load_manifest():
+    """{"templates": {lang: sha1}, "pages": {relative path: sha1 of rendered html}}"""
+    if os.path.exists(MANIFEST_PATH):
+        try:
+            with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Failed to load build manifest ({e}), doing a full build.")
+    return {"templates": {}, "pages": {}}
+
+def save_manifest(manifest):
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+
+def load_changed_tickers():
+    """Tickers whose data shard changed in the last engine save (None if unknown)"""
+    if not os.path.exists(CHANGED_TICKERS_PATH):
+        return None
+    with open(CHANGED_TICKERS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f).get("tickers")
+
+def sha1(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
 def ensure_dir(path):
     if not os.path.exists(path):
         os.makedirs(path)
 
-def replace_meta_tags(content, meta):
+# Template slots: (slot name, regex whose single group is the replaceable value).
+# Several anchors can feed the same meta key (e.g. description -> meta, og, twitter).
+TEMPLATE_SLOTS = [
+    ("title", r'<title>([^<]*)</title>'),
+    ("description", r'<meta name="description" content="([^"]*)"'),
+    ("url", r'<link rel="canonical" href="([^"]*)"'),
+    ("url_ko", r'<link rel="alternate" hreflang="ko" href="([^"]*)"'),
+    ("url_en", r'<link rel="alternate" hreflang="en" href="([^"]*)"'),
+    ("url_en", r'<link rel="alternate" hreflang="x-default" href="([^"]*)"'),
+    ("og_title", r'<meta property="og:title" content="([^"]*)"'),
+    ("description", r'<meta property="og:description" content="([^"]*)"'),
+    ("url", r'<meta property="og:url" content="([^"]*)"'),
+    ("image", r'<meta property="og:image" content="([^"]*)"'),
+    ("og_title", r'<meta name="twitter:title" content="([^"]*)"'),
+    ("description", r'<meta name="twitter:description" content="([^"]*)"'),
+    ("image", r'<meta name="twitter:image" content="([^"]*)"'),
+]
+
+class TemplateError(Exception):
+    pass
+
+class CompiledTemplate:
     """
-    Replaces meta tag placeholders with actual values.
-    Currently uses simple string replacement for known placeholders or regex could be used.
-    Since we know the exact lines from the template, we can act intelligently.
-    However, the template has hardcoded default values. We will replace them.
+    A page template parsed once into static chunks and named slots.
+    render() fills the slots with one ''.join (no per-page copies of the
+    whole template). Every slot anchor must occur exactly once, otherwise
+    compiling raises TemplateError instead of silently emitting unmodified pages.
     """
-    # Common replacements
-    content = content.replace('<title>종목 상세페이지:나스픽</title>', f'<title>{meta["title"]}</title>')
-    content = content.replace('<title>Stock Analysis | NASPICK</title>', f'<title>{meta["title"]}</title>')
-    
-    # Description
-    content = content.replace('content="미국 주식 실시간 티어 분석 정보"', f'content="{meta["description"]}"')
-    content = content.replace('content="AI-powered stock analysis and ratings"', f'content="{meta["description"]}"')
-    
-    # Canonical & Alternates
-    # NOTE: The template has hardcoded URLs like href="https://naspick.com/" in canonical
-    # We need to replace the entire lines or be specific.
-    
-    # KO Template
-    content = content.replace('<link rel="canonical" href="https://naspick.com/">', f'<link rel="canonical" href="{meta["url"]}">')
-    content = content.replace('<link rel="alternate" hreflang="ko" href="https://naspick.com/">', f'<link rel="alternate" hreflang="ko" href="{meta["url_ko"]}">')
-    content = content.replace('<link rel="alternate" hreflang="en" href="https://naspick.com/en/">', f'<link rel="alternate" hreflang="en" href="{meta["url_en"]}">')
-    content = content.replace('<link rel="alternate" hreflang="x-default" href="https://naspick.com/en/">', f'<link rel="alternate" hreflang="x-default" href="{meta["url_en"]}">')
-    
-    # EN Template (Similar defaults)
-    content = content.replace('<link rel="canonical" href="https://naspick.com/en/">', f'<link rel="canonical" href="{meta["url"]}">')
-    # Note: reusing the replacement logic if strings match exactly
-    
-    # OG Tags
-    content = content.replace('content="종목 상세페이지 | 나스픽"', f'content="{meta["og_title"]}"')
-    content = content.replace('content="Stock Analysis | NASPICK"', f'content="{meta["og_title"]}"')
-    
-    # OG Description (handled by general description replacement usually, but let's be safe if they differ in template)
-    # The template uses same string for og:description as meta description, so previous replace likely caught it.
-    
-    content = content.replace('content="https://naspick.com/"', f'content="{meta["url"]}"')
-    content = content.replace('content="https://naspick.com/en/"', f'content="{meta["url"]}"')
-    
-    # Image Replacements (OG & Twitter)
-    if "image" in meta:
-        # OG Image string in template
-        content = content.replace('content="https://naspick.com/images/og-image.png"', f'content="{meta["image"]}"')
-        # Twitter Image string in template (note the path difference in template: /og-image.png vs /images/og-image.png)
-        content = content.replace('content="https://naspick.com/og-image.png"', f'content="{meta["image"]}"')
-        
-    return content
 
-def generate_stock_pages(data):
-    # Load Templates
+    def __init__(self, source, name="template"):
+        spans = []
+        for slot, pattern in TEMPLATE_SLOTS:
+            matches = list(re.finditer(pattern, source))
+            if len(matches) != 1:
+                raise TemplateError(f"{name}: slot '{slot}' anchor {pattern!r} found {len(matches)} times (expected 1)")
+            spans.append((matches[0].start(1), matches[0].end(1), slot))
+        spans.sort()
+
+        self.parts = []   # static chunks, with None placeholders for slots
+        self.slots = []   # (index in parts, slot name)
+        pos = 0
+        for start, end, slot in spans:
+            self.parts.append(source[pos:start])
+            self.slots.append((len(self.parts), slot))
+            self.parts.append(None)
+            pos = end
+        self.parts.append(source[pos:])
+
+    def render(self, meta):
+        parts = list(self.parts)
+        for idx, slot in self.slots:
+            parts[idx] = html.escape(meta[slot], quote=True)
+        return "".join(parts)
+
+def page_specs(item):
+    """(lang, output path, meta) for the KO and EN page of one ticker"""
+    ticker = item['ticker']
+    name_ko = item.get('name', ticker)
+    name_en = item.get('name_en', item.get('name', ticker))
+
+    url_ko = f"https://naspick.com/stock/{ticker}"
+    url_en = f"https://naspick.com/en/stock/{ticker}"
+    image = f"https://financialmodelingprep.com/image-stock/{ticker.replace('.', '-')}.png"
+
+    # No build date in static meta: it would change every page every day.
+    # page.html sets the dated title / description client-side.
+    title_ko = f"{ticker} 주가 전망 & 목표가 | {name_ko} AI 분석 - 나스픽"
+    desc_ko = f"{name_ko}({ticker}) 적정 주가 및 월스트리트 목표가 분석. AI가 진단한 {name_ko}의 투자 매력도와 실시간 티어 정보를 확인하세요."
+    title_en = f"{ticker} Stock Price Forecast & Target | {name_en} AI Analysis - NASPICK"
+    desc_en = f"{name_en} ({ticker}) stock price target and AI analysis. Check {name_en}'s investment rating and real-time tier score."
+
+    return [
+        ("ko", os.path.join(OUTPUT_DIR, "stock", ticker, "index.html"), {
+            "title": title_ko, "description": desc_ko, "og_title": title_ko,
+            "url": url_ko, "url_ko": url_ko, "url_en": url_en, "image": image,
+        }),
+        ("en", os.path.join(OUTPUT_DIR, "en", "stock", ticker, "index.html"), {
+            "title": title_en, "description": desc_en, "og_title": title_en,
+            "url": url_en, "url_ko": url_ko, "url_en": url_en, "image": image,
+        }),
+    ]
+
+# Worker-process state (compiled templates are sent once per worker, not per task)
+_TEMPLATES = {}
+
+def _init_worker(templates):
+    _TEMPLATES.update(templates)
+
+def _build_ticker(task):
+    """
+    Render one ticker's pages and write those whose content hash differs
+    from the manifest. Returns [(path, sha1, written)].
+    """
+    item, old_hashes = task
+    results = []
+    for lang, path, meta in page_specs(item):
+        page = _TEMPLATES[lang].render(meta)
+        digest = sha1(page)
+        rel = os.path.relpath(path, OUTPUT_DIR).replace(os.sep, "/")
+        if old_hashes.get(rel) == digest and os.path.exists(path):
+            results.append((path, digest, False))
+            continue
+        ensure_dir(os.path.dirname(path))
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(page)
+        os.replace(tmp, path)
+        results.append((path, digest, True))
+    return results
+
+def generate_stock_pages(data, tickers=None, workers=None):
+    """
+    Render KO / EN stock pages, writing only pages whose content changed.
+    tickers: restrict to these tickers (--changed-only); ignored when a
+    template changed, since then every page changes.
+    Returns {path: sha1} of every rendered page.
+    """
+    templates = {}
     with open(TEMPLATE_KO, "r", encoding="utf-8") as f:
-        template_ko = f.read()
+        templates["ko"] = f.read()
     with open(TEMPLATE_EN, "r", encoding="utf-8") as f:
-        template_en = f.read()
-        
-    today = datetime.now().strftime("%Y-%m-%d")
-    
-    print(f"Generating {len(data)} stock pages...")
-    
+        templates["en"] = f.read()
+
+    manifest = load_manifest()
+    template_hashes = {lang: sha1(t) for lang, t in templates.items()}
+    # Raises TemplateError (fails the build) if a slot anchor is missing
+    compiled = {lang: CompiledTemplate(t, name=lang) for lang, t in templates.items()}
+    if tickers is not None:
+        if manifest.get("templates") != template_hashes:
+            print("   Template changed, rebuilding all pages.")
+        else:
+            wanted = set(tickers)
+            data = [item for item in data if item['ticker'] in wanted]
+
+    workers = max(1, workers or PRECOMPRESS_WORKERS)
+    print(f"Generating {len(data)} x 2 stock pages ({workers} workers)...")
+
+    pages = manifest.get("pages", {})
+    tasks = []
     for item in data:
-        ticker = item['ticker']
-        name_ko = item.get('name', ticker)
-        name_en = item.get('name_en', item.get('name', ticker))
-        sector = item.get('sector', '')
-        
-        # 1. Korean Page
-        output_dir_ko = os.path.join(OUTPUT_DIR, "stock", ticker)
-        ensure_dir(output_dir_ko)
-        
-        url_ko = f"https://naspick.com/stock/{ticker}"
-        url_en = f"https://naspick.com/en/stock/{ticker}"
-        
-        title_ko = f"{today} {ticker} 주가 전망 & 목표가 | {name_ko} AI 분석 - 나스픽"
-        desc_ko = f"[{today}] {name_ko}({ticker}) 적정 주가 및 월스트리트 목표가 분석. AI가 진단한 {name_ko}의 투자 매력도와 실시간 티어 정보를 확인하세요."
-        
-        meta_ko = {
-            "title": title_ko,
-            "description": desc_ko,
-            "og_title": title_ko,
-            "url": url_ko,
-            "url_ko": url_ko,
-            "url_en": url_en,
-            "image": f"https://financialmodelingprep.com/image-stock/{ticker.replace('.', '-')}.png"
-        }
-        
-        html_ko = replace_meta_tags(template_ko, meta_ko)
-        
-        with open(os.path.join(output_dir_ko, "index.html"), "w", encoding="utf-8") as f:
-            f.write(html_ko)
-            
-        # 2. English Page
-        output_dir_en = os.path.join(OUTPUT_DIR, "en", "stock", ticker)
-        ensure_dir(output_dir_en)
-        
-        title_en = f"{ticker} Stock Price Forecast & Target | {name_en} AI Analysis - NASPICK"
-        desc_en = f"[{today}] {name_en} ({ticker}) stock price target and AI analysis. Check {name_en}'s investment rating and real-time tier score."
-        
-        meta_en = {
-            "title": title_en,
-            "description": desc_en,
-            "og_title": title_en,
-            "url": url_en,
-            "url_ko": url_ko,
-            "url_en": url_en,
-            "image": f"https://financialmodelingprep.com/image-stock/{ticker.replace('.', '-')}.png"
-        }
-        
-        html_en = replace_meta_tags(template_en, meta_en)
-        
-        with open(os.path.join(output_dir_en, "index.html"), "w", encoding="utf-8") as f:
-            f.write(html_en)
+        rels = [os.path.relpath(path, OUTPUT_DIR).replace(os.sep, "/") for _, path, _ in page_specs(item)]
+        tasks.append((item, {rel: pages.get(rel) for rel in rels}))
+
+    if workers == 1 or len(tasks) < 20:
+        _init_worker(compiled)
+        results = [_build_ticker(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(compiled,)) as pool:
+            results = list(pool.map(_build_ticker, tasks, chunksize=16))
+
+    rendered, written = {}, 0
+    for ticker_results in results:
+        for path, digest, was_written in ticker_results:
+            pages[os.path.relpath(path, OUTPUT_DIR).replace(os.sep, "/")] = digest
+            rendered[path] = digest
+            written += was_written
 
-def main():
+    manifest["templates"] = template_hashes
+    manifest["pages"] = pages
+    save_manifest(manifest)
+    print(f"   {written} pages written, {len(rendered) - written} unchanged.")
+    return rendered
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Static stock page builder")
+    parser.add_argument("--changed-only", nargs="?", const="", default=None, metavar="TICKERS",
+                        help="Only rebuild these tickers (comma separated). Without a value, "
+                             "uses the tickers whose data changed in the last engine run.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
     print("Starting Static Site Generation...")
     try:
         data = load_data()
-        generate_stock_pages(data)
+
+        tickers = None
+        if args.changed_only is not None:
+            if args.changed_only:
+                tickers = [t.strip().upper() for t in args.changed_only.split(",") if t.strip()]
+            else:
+                tickers = load_changed_tickers()
+                if tickers is None:
+                    print("   No changed-ticker list from the engine, doing a full build.")
+
+        pages = generate_stock_pages(data, tickers=tickers, workers=args.workers)
         print("Successfully generated static pages.")
+        
+        # .gz / .br siblings for pages + data JSON (unchanged sources are skipped)
+        Precompressor().run(list(pages) + data_json_files(), digests=pages)
+    except TemplateError as e:
+        print(f"❌ Template error: {e}")
+        sys.exit(1)
     except Exception as e:
         print(f"Error during SSG: {e}")
 
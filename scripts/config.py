@@ -10,11 +10,32 @@ PATHS = {
     "FINANCIAL_INFO": os.path.join(DATA_DIR, 'financials.csv'),
     "RANKING_HISTORY": os.path.join(DATA_DIR, 'ranking_history.csv'),
     "OUTPUT_JSON": os.path.join(DATA_DIR, 'data.json'),
+    "INDEX_JSON": os.path.join(DATA_DIR, 'index.json'),        # slim ranking list
+    "STOCK_SHARD_DIR": os.path.join(DATA_DIR, 'stock'),        # per-ticker detail shards
     "RANKS_JSON": os.path.join(DATA_DIR, 'yesterday_ranks.json'),
     "CONSENSUS_JSON": os.path.join(DATA_DIR, 'consensus_data.json'),
     "PORTFOLIO_STATE": os.path.join(DATA_DIR, 'portfolio_state.json'),
     "CHART_DATA": os.path.join(DATA_DIR, 'chart_data.json'),
     "SIGNALS_JSON": os.path.join(DATA_DIR, 'signals.json'),
+    "PRICE_STORE": os.path.join(DATA_DIR, 'price_store'),
+    "CACHE_DIR": os.path.join(DATA_DIR, 'cache'),
+    "INDICATOR_STATE": os.path.join(DATA_DIR, 'indicator_state.json'),
+    "INDICATOR_PANEL": os.path.join(DATA_DIR, 'indicator_panel.json'),  # last-N-day RSI / MACD (social_gen)
+    "CALENDAR_JSON": os.path.join(DATA_DIR, 'calendar_data.json'),
+    "CALENDAR_STATE": os.path.join(DATA_DIR, 'calendar_state.json'),  # last refresh date per ticker
+    "SHARES_OUTSTANDING": os.path.join(DATA_DIR, 'shares_outstanding.json'),  # market cap = shares x close
+    "UNIVERSE": os.path.join(DATA_DIR, 'universe.json'),                  # cached S&P 500 / exchange listings
+    "UNIVERSE_CHANGES": os.path.join(DATA_DIR, 'universe_changes.json'),  # daily index additions / removals
+    "ONBOARDING_QUEUE": os.path.join(DATA_DIR, 'onboarding_queue.json'),  # new members' pending jobs
+    "CHECKPOINT_DIR": os.path.join(DATA_DIR, 'cache', 'checkpoints'),
+    "RUN_METRICS": os.path.join(DATA_DIR, 'run_metrics.jsonl'),
+    "PROFILE_DIR": os.path.join(DATA_DIR, 'cache', 'profiles'),
+    "PRECOMPRESS_MANIFEST": os.path.join(DATA_DIR, 'precompress_manifest.json'),
+    "BUILD_MANIFEST": os.path.join(DATA_DIR, 'build_manifest.json'),
+    "CHANGED_TICKERS": os.path.join(DATA_DIR, 'cache', 'changed_tickers.json'),
+    "CONSENSUS_JOURNAL": os.path.join(DATA_DIR, 'cache', 'consensus_journal.jsonl'),
+    "HTTP_CACHE": os.path.join(DATA_DIR, 'cache', 'http_cache.sqlite'),  # shared response cache
+    "RATE_LIMIT_DIR": os.path.join(DATA_DIR, 'cache', 'ratelimit'),      # cross-process token buckets
 }
 
 # --------------------------------------------------------------------------------
@@ -32,12 +53,87 @@ FETCH_MAP = {
 # Dual Class Shares & Special Handling
 REQUIRED_TICKERS = ['BRK.B', 'BF.B', 'GOOGL', 'GOOG', 'FOXA', 'FOX', 'NWSA', 'NWS']
 
+# Listing cache (core/universe.py)
+UNIVERSE_TTL_HOURS = 24      # SP500 membership / sectors / names
+EXCHANGE_TTL_DAYS = 7        # NASDAQ / NYSE / AMEX listings (exchange labels)
+UNIVERSE_DIFF_HISTORY = 90   # membership changes kept in universe_changes.json
+
 # Fallback S&P 500 List (if API fails)
 FALLBACK_TICKERS = [
     "AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META", "TSLA", "BRK.B", "UNH", "XOM",
     "JNJ", "JPM", "V", "PG", "MA", "HD", "CVX", "MRK", "ABBV", "PEP"
 ]
 
+# --------------------------------------------------------------------------------
+# FETCH SETTINGS
+# --------------------------------------------------------------------------------
+# Concurrent price download (FDR). 1 = sequential (legacy behaviour)
+PRICE_FETCH_WORKERS = int(os.environ.get('NASPICK_FETCH_WORKERS', 8))
+PRICE_FETCH_RETRIES = 3
+PRICE_FETCH_RETRY_DELAY = 1  # seconds between retry rounds
+PRICE_MIN_ROWS = 260         # Need ~1 year of bars for momentum factors
+SPLIT_DETECT_TOLERANCE = 0.02  # Stored vs fresh close mismatch -> full re-download
+INDICATOR_PANEL_DAYS = 60      # Trading days kept in indicator_panel.json
+
+# New index members (not in the price store yet): one deep backfill, then incremental
+NEW_TICKER_BACKFILL_DAYS = 1825  # ~5Y, same depth as the backtests
+NEW_TICKER_MIN_ROWS = 60         # Young listings (IPO / spin-off inside the window) kept from this many bars
+ONBOARDING_MAX_ATTEMPTS = 3      # Runs a queued financials / consensus / names job is retried
+
+# Consensus (yfinance .info) fetch: workers share the 'yahoo' upstream limiter (see HTTP LAYER)
+CONSENSUS_WORKERS = int(os.environ.get('NASPICK_CONSENSUS_WORKERS', 4))
+CONSENSUS_RETRIES = 4
+CONSENSUS_BACKOFF_BASE = 2   # seconds, doubled per attempt (jittered)
+CONSENSUS_BACKOFF_MAX = 60
+
+# Calendar (earnings / dividends) fetch: incremental, workers share the 'yahoo' upstream limiter
+CALENDAR_WORKERS = int(os.environ.get('NASPICK_CALENDAR_WORKERS', 4))
+CALENDAR_REFRESH_WINDOW_DAYS = 3  # re-check when an earnings / ex-div date is this close
+CALENDAR_EVENT_GRACE_DAYS = 2     # ... and until this many days after it passed
+CALENDAR_MAX_AGE_DAYS = 7         # re-check every ticker at least weekly
+CALENDAR_REFRESH_PER_RUN = 120    # stale entries re-checked per run (spreads the weekly refresh)
+
+# Shares outstanding cache (market cap = shares x latest close)
+SHARES_MAX_AGE_DAYS = 7        # refresh weekly (and immediately after a detected split)
+SHARES_REFRESH_PER_RUN = 120   # stale entries refreshed per run (spreads the weekly refresh)
+SHARES_WORKERS = 4
+
+# --------------------------------------------------------------------------------
+# HTTP LAYER (core/http_cache.py)
+# --------------------------------------------------------------------------------
+# Token buckets shared by every process on this machine: {upstream: (requests / second, burst)}
+UPSTREAM_RATES = {
+    'yahoo': (float(os.environ.get('NASPICK_YAHOO_RATE', 4.0)), 8),
+    'fdr': (float(os.environ.get('NASPICK_FDR_RATE', 10.0)), 16),
+    'naver': (2.0, 2),
+}
+# Response cache TTL (seconds) per endpoint; 0 = never cached (rate-limited only)
+HTTP_CACHE_TTLS = {
+    'yahoo.info': 20 * 3600,            # consensus, financials and shares read the same .info
+    'yahoo.calendar': 12 * 3600,
+    'yahoo.earnings_dates': 12 * 3600,
+    'yahoo.dividends': 20 * 3600,
+    'yahoo.download': 0,                # portfolio quotes (intraday)
+    'fdr.listing': 20 * 3600,
+    'fdr.price': 0,                     # incremental through the price store
+    'naver.basic': 30 * 86400,          # Korean names (revalidated with ETag / Last-Modified)
+}
+HTTP_CACHE_ENABLED = os.environ.get('NASPICK_HTTP_CACHE', '1') != '0'
+HTTP_CACHE_MAX_AGE_DAYS = 35   # rows older than this are purged (kept until then for revalidation)
+
+# --------------------------------------------------------------------------------
+# BUILD SETTINGS
+# --------------------------------------------------------------------------------
+# .gz / .br siblings for static artifacts (see core/compress.py)
+PRECOMPRESS_WORKERS = int(os.environ.get('NASPICK_BUILD_WORKERS', os.cpu_count() or 1))
+# Paths under data/ that are internal (never served) -> not precompressed
+PRECOMPRESS_EXCLUDE = {
+    'cache', 'price_store', 'price_store_div',
+    'indicator_state.json', 'indicator_panel.json', 'precompress_manifest.json',
+    'build_manifest.json', 'sitemap_ledger.json', 'calendar_state.json',
+    'shares_outstanding.json', 'universe.json', 'universe_changes.json', 'onboarding_queue.json',
+}
+
 # --------------------------------------------------------------------------------
 # SECTOR & EXCHANGE MAPPING
 # --------------------------------------------------------------------------------
@@ -1,5 +1,43 @@
 import pandas as pd
 import numpy as np
+from scripts.core.panel import BarPanel
+
+# Candlestick pattern metadata (checked in this order; first match wins)
+CANDLE_PATTERNS = {
+    "hammer": {
+        "signal": "bullish", "name_kr": "망치형", "desc": "하락 추세에서 바닥 반전 신호",
+        "name_en": "Hammer", "desc_en": "Bottom reversal signal in downtrend"
+    },
+    "shooting_star": {
+        "signal": "bearish", "name_kr": "유성형", "desc": "상승 추세에서 고점 반전 신호",
+        "name_en": "Shooting Star", "desc_en": "Top reversal signal in uptrend"
+    },
+    "bullish_engulfing": {
+        "signal": "bullish", "name_kr": "상승 장악형", "desc": "강력한 매수세로 추세 반전",
+        "name_en": "Bullish Engulfing", "desc_en": "Strong buying momentum reversal"
+    },
+    "bearish_engulfing": {
+        "signal": "bearish", "name_kr": "하락 장악형", "desc": "강력한 매도세로 추세 반전",
+        "name_en": "Bearish Engulfing", "desc_en": "Strong selling momentum reversal"
+    },
+    "morning_star": {
+        "signal": "bullish", "name_kr": "샛별형", "desc": "강력한 바닥 반전 3봉 패턴",
+        "name_en": "Morning Star", "desc_en": "Strong bottom reversal (3-bar)"
+    },
+    "evening_star": {
+        "signal": "bearish", "name_kr": "석별형", "desc": "강력한 고점 반전 3봉 패턴",
+        "name_en": "Evening Star", "desc_en": "Strong top reversal (3-bar)"
+    },
+}
+
+def candle_pattern_info(pattern, date_str):
+    """Pattern dict as published in technical_analysis.candle_pattern"""
+    meta = CANDLE_PATTERNS[pattern]
+    return {
+        "pattern": pattern, "signal": meta["signal"], "date": date_str,
+        "name_kr": meta["name_kr"], "desc": meta["desc"],
+        "name_en": meta["name_en"], "desc_en": meta["desc_en"]
+    }
 
 class TechnicalAnalyzer:
     """
@@ -106,53 +144,29 @@ class TechnicalAnalyzer:
             
             # 1. Hammer
             if body > 0 and lower_shadow > body * 2 and upper_shadow < body * 0.5 and c_prev < o_prev:
-                patterns_found.append({
-                    "pattern": "hammer", "signal": "bullish", "date": date_str,
-                    "name_kr": "망치형", "desc": "하락 추세에서 바닥 반전 신호",
-                    "name_en": "Hammer", "desc_en": "Bottom reversal signal in downtrend"
-                })
+                patterns_found.append(candle_pattern_info("hammer", date_str))
             
             # 2. Shooting Star
             elif body > 0 and upper_shadow > body * 2 and lower_shadow < body * 0.5 and c_prev > o_prev:
-                patterns_found.append({
-                    "pattern": "shooting_star", "signal": "bearish", "date": date_str,
-                    "name_kr": "유성형", "desc": "상승 추세에서 고점 반전 신호",
-                    "name_en": "Shooting Star", "desc_en": "Top reversal signal in uptrend"
-                })
+                patterns_found.append(candle_pattern_info("shooting_star", date_str))
             
             # 3. Bullish Engulfing
             elif c > o and c_prev < o_prev and o <= c_prev and c >= o_prev and body > body_prev:
-                patterns_found.append({
-                    "pattern": "bullish_engulfing", "signal": "bullish", "date": date_str,
-                    "name_kr": "상승 장악형", "desc": "강력한 매수세로 추세 반전",
-                    "name_en": "Bullish Engulfing", "desc_en": "Strong buying momentum reversal"
-                })
+                patterns_found.append(candle_pattern_info("bullish_engulfing", date_str))
             
             # 4. Bearish Engulfing
             elif c < o and c_prev > o_prev and o >= c_prev and c <= o_prev and body > body_prev:
-                patterns_found.append({
-                    "pattern": "bearish_engulfing", "signal": "bearish", "date": date_str,
-                    "name_kr": "하락 장악형", "desc": "강력한 매도세로 추세 반전",
-                    "name_en": "Bearish Engulfing", "desc_en": "Strong selling momentum reversal"
-                })
+                patterns_found.append(candle_pattern_info("bearish_engulfing", date_str))
             
             # 5. Morning Star
             elif (c_prev2 < o_prev2 and body_prev < abs(c_prev2 - o_prev2) * 0.3 and
                   c > o and c > (o_prev2 + c_prev2) / 2):
-                patterns_found.append({
-                    "pattern": "morning_star", "signal": "bullish", "date": date_str,
-                    "name_kr": "샛별형", "desc": "강력한 바닥 반전 3봉 패턴",
-                    "name_en": "Morning Star", "desc_en": "Strong bottom reversal (3-bar)"
-                })
+                patterns_found.append(candle_pattern_info("morning_star", date_str))
             
             # 6. Evening Star
             elif (c_prev2 > o_prev2 and body_prev < abs(c_prev2 - o_prev2) * 0.3 and
                   c < o and c < (o_prev2 + c_prev2) / 2):
-                patterns_found.append({
-                    "pattern": "evening_star", "signal": "bearish", "date": date_str,
-                    "name_kr": "석별형", "desc": "강력한 고점 반전 3봉 패턴",
-                    "name_en": "Evening Star", "desc_en": "Strong top reversal (3-bar)"
-                })
+                patterns_found.append(candle_pattern_info("evening_star", date_str))
                 
         except Exception:
             pass
@@ -177,3 +191,208 @@ class TechnicalAnalyzer:
             "rsi": rsi_data,
             "volume": volume_data
         }
+
+    # ------------------------------------------------------------------
+    # Batch (panel-wide) analysis
+    # ------------------------------------------------------------------
+    @staticmethod
+    def classify_candles(o, h, l, c, o_prev, c_prev, o_prev2, c_prev2):
+        """
+        Vectorized version of the detect_candle_patterns rules.
+        Inputs are equally shaped arrays (current, previous and 2-bars-ago candles).
+        Returns an object array of pattern keys (None where nothing matched).
+        """
+        with np.errstate(invalid='ignore'):
+            body = np.abs(c - o)
+            upper_shadow = h - np.maximum(o, c)
+            lower_shadow = np.minimum(o, c) - l
+            body_prev = np.abs(c_prev - o_prev)
+            body_prev2 = np.abs(c_prev2 - o_prev2)
+            mid_prev2 = (o_prev2 + c_prev2) / 2
+            
+            conditions = [
+                (body > 0) & (lower_shadow > body * 2) & (upper_shadow < body * 0.5) & (c_prev < o_prev),
+                (body > 0) & (upper_shadow > body * 2) & (lower_shadow < body * 0.5) & (c_prev > o_prev),
+                (c > o) & (c_prev < o_prev) & (o <= c_prev) & (c >= o_prev) & (body > body_prev),
+                (c < o) & (c_prev > o_prev) & (o >= c_prev) & (c <= o_prev) & (body > body_prev),
+                (c_prev2 < o_prev2) & (body_prev < body_prev2 * 0.3) & (c > o) & (c > mid_prev2),
+                (c_prev2 > o_prev2) & (body_prev < body_prev2 * 0.3) & (c < o) & (c < mid_prev2),
+            ]
+        return np.select(conditions, list(CANDLE_PATTERNS.keys()), default=None)
+
+    @staticmethod
+    def indicator_panels(bp, rsi_period=14):
+        """Head-aligned (bar x ticker) RSI, MACD and MACD signal matrices for a BarPanel"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # RSI (simple rolling mean of gains / losses)
+            close = pd.DataFrame(bp.head('Close'))
+            delta = close.diff()
+            gain = delta.where(delta > 0, 0).rolling(window=rsi_period).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_period).mean()
+            rs = (gain / loss).fillna(0)
+            rsi = 100 - (100 / (1 + rs))
+            
+            # MACD (12/26/9 EWM)
+            exp12 = close.ewm(span=12, adjust=False).mean()
+            exp26 = close.ewm(span=26, adjust=False).mean()
+            macd = (exp12 - exp26)
+            signal = macd.ewm(span=9, adjust=False).mean()
+        return rsi.to_numpy(), macd.to_numpy(), signal.to_numpy()
+
+    INDICATOR_COLUMNS = ['rsi', 'macd', 'macd_signal', 'macd_golden', 'macd_dead']
+
+    @staticmethod
+    def latest_indicators(bp, rsi_period=14):
+        """Latest RSI / MACD values (+ MACD cross flags) per ticker of a BarPanel"""
+        rsi, macd, signal = TechnicalAnalyzer.indicator_panels(bp, rsi_period)
+        macd_now, macd_prev = bp.last(macd), bp.last(macd, 1)
+        sig_now, sig_prev = bp.last(signal), bp.last(signal, 1)
+        with np.errstate(invalid='ignore'):
+            return pd.DataFrame({
+                "rsi": bp.last(rsi),
+                "macd": macd_now,
+                "macd_signal": sig_now,
+                "macd_golden": (macd_prev < sig_prev) & (macd_now > sig_now),
+                "macd_dead": (macd_prev > sig_prev) & (macd_now < sig_now),
+            }, index=bp.tickers)
+
+    @staticmethod
+    def analyze_panel(price_df, rsi_period=14, indicators=None):
+        """
+        Batch technical analysis for every ticker in a long price frame
+        (Date, Ticker, Open, High, Low, Close, Volume).
+        Returns one row per ticker (index = Ticker) with the latest values of:
+        - bars, date, current_price, prev_close
+        - rsi, macd, macd_signal, macd_golden, macd_dead
+        - pivot, r1, r2, s1, s2 (from the previous completed candle)
+        - vol_prev, vol_avg_20 (analyze_volume inputs)
+        - candle_pattern (pattern key or None)
+        Matches the per-ticker calculate_rsi / MACD / analyze_volume / detect_candle_patterns logic.
+        `indicators`: precomputed rsi / macd / macd_signal / macd_golden / macd_dead
+        per ticker (e.g. IndicatorState); full-history RSI / MACD is only computed
+        for the tickers missing from it.
+        """
+        bp = BarPanel(price_df)
+        
+        if indicators is None:
+            ind = TechnicalAnalyzer.latest_indicators(bp, rsi_period)
+        else:
+            ind = indicators.reindex(bp.tickers)[TechnicalAnalyzer.INDICATOR_COLUMNS]
+            missing = bp.tickers.difference(indicators.index)
+            if len(missing):
+                sub = BarPanel(price_df[price_df['Ticker'].isin(missing)])
+                ind.loc[missing] = TechnicalAnalyzer.latest_indicators(sub, rsi_period)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Latest 22 bars (candles, pivots, volume)
+            t_open, t_high = bp.tail('Open', 22), bp.tail('High', 22)
+            t_low, t_close = bp.tail('Low', 22), bp.tail('Close', 22)
+            t_vol = bp.tail('Volume', 22)
+            
+            # Pivot from previous completed candle
+            p_high, p_low, p_close = t_high[1], t_low[1], t_close[1]
+            pivot = (p_high + p_low + p_close) / 3
+            
+            # Volume: previous day vs the 20 bars before it
+            vol_avg_20 = pd.DataFrame(t_vol[2:22]).mean().to_numpy()
+            
+            candles = TechnicalAnalyzer.classify_candles(
+                t_open[0], t_high[0], t_low[0], t_close[0],
+                t_open[1], t_close[1], t_open[2], t_close[2]
+            )
+        
+        bars = bp.lengths
+        candles = np.where(bars >= 3, candles, None)
+        
+        return pd.DataFrame({
+            "bars": bars,
+            "date": bp.tail_values('Date', 1)[0],
+            "current_price": t_close[0],
+            "prev_close": t_close[1],
+            "rsi": ind['rsi'].to_numpy(dtype=float),
+            "macd": ind['macd'].to_numpy(dtype=float),
+            "macd_signal": ind['macd_signal'].to_numpy(dtype=float),
+            "macd_golden": ind['macd_golden'].to_numpy(dtype=bool),
+            "macd_dead": ind['macd_dead'].to_numpy(dtype=bool),
+            "pivot": pivot,
+            "r1": (2 * pivot) - p_low,
+            "r2": pivot + (p_high - p_low),
+            "s1": (2 * pivot) - p_high,
+            "s2": pivot - (p_high - p_low),
+            "vol_prev": t_vol[1],
+            "vol_avg_20": vol_avg_20,
+            "candle_pattern": candles,
+        }, index=bp.tickers)
+
+    @staticmethod
+    def scan_candle_patterns(price_df, horizons=None):
+        """
+        Evaluate the candlestick rules on every bar of every ticker in one pass.
+        Returns a sparse event table: Date, Ticker, Pattern, Signal
+        (+ Fwd_Ret_{h}D close-to-close forward returns for each h in `horizons`,
+        for measuring the hit rate of published candle signals).
+        """
+        bp = BarPanel(price_df)
+        o, h, l, c = (bp.head(col) for col in ('Open', 'High', 'Low', 'Close'))
+        
+        def shifted(panel, k):
+            out = np.full(panel.shape, np.nan)
+            out[k:] = panel[:len(panel) - k]
+            return out
+        
+        patterns = TechnicalAnalyzer.classify_candles(
+            o, h, l, c, shifted(o, 1), shifted(c, 1), shifted(o, 2), shifted(c, 2)
+        )
+        patterns = bp.to_long(patterns)
+        
+        # Same as detect_candle_patterns: a pattern needs 2 prior bars
+        hit = (patterns != None) & (bp.pos >= 2)  # noqa: E711 (element-wise)
+        events = bp.df.loc[hit, ['Date', 'Ticker']].copy()
+        events['Pattern'] = patterns[hit]
+        events['Signal'] = events['Pattern'].map({k: v['signal'] for k, v in CANDLE_PATTERNS.items()})
+        
+        for horizon in horizons or []:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fwd = np.full(c.shape, np.nan)
+                fwd[:len(c) - horizon] = c[horizon:] / c[:len(c) - horizon] - 1
+            events[f'Fwd_Ret_{horizon}D'] = bp.to_long(fwd)[hit]
+        
+        return events.sort_values(['Date', 'Ticker']).reset_index(drop=True)
+
+    @staticmethod
+    def levels_from_row(row):
+        """Pivot levels dict (same shape as calculate_pivot_points) from an analyze_panel row"""
+        return {k: round(row[k], 2) for k in ("pivot", "r1", "r2", "s1", "s2")}
+
+    @staticmethod
+    def context_from_row(row):
+        """technical_analysis context (same shape as generate_detailed_context) from an analyze_panel row"""
+        rsi_value = row['rsi']
+        if rsi_value >= 70: rsi_status = "overbought"
+        elif rsi_value <= 30: rsi_status = "oversold"
+        elif rsi_value >= 50: rsi_status = "bullish"
+        else: rsi_status = "bearish"
+        
+        # Volume vs 20-day Average (see analyze_volume)
+        if row['bars'] < 21:
+            volume_data = None
+        elif row['vol_avg_20'] == 0:
+            volume_data = 0
+        elif pd.isna(row['vol_prev']) or pd.isna(row['vol_avg_20']):
+            volume_data = None
+        else:
+            pct_change = round(((row['vol_prev'] / row['vol_avg_20']) - 1) * 100)
+            volume_data = {
+                "pct_change": pct_change,
+                "status": "above_avg" if pct_change > 0 else "below_avg"
+            }
+        
+        candle = None
+        if pd.notna(row['candle_pattern']):
+            candle = candle_pattern_info(row['candle_pattern'], str(row['date'])[:10])
+        
+        return {
+            "candle_pattern": candle,
+            "rsi": {"value": round(rsi_value, 1), "status": rsi_status},
+            "volume": volume_data
+        }
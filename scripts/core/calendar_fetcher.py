@@ -0,0 +1,282 @@
+import os
+import json
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from scripts.config import (
+    PATHS, CALENDAR_WORKERS, CALENDAR_REFRESH_WINDOW_DAYS, CALENDAR_EVENT_GRACE_DAYS, CALENDAR_MAX_AGE_DAYS,
+    CALENDAR_REFRESH_PER_RUN
+)
+from scripts.core.http_cache import YahooTicker, upstream_bucket
+
+class TickerEndpoints:
+    """
+    Per-ticker memo of the yfinance endpoints used for calendar data.
+    Each property (calendar, dividends, earnings_dates, info) may trigger its
+    own HTTP request; here each one is requested at most once per run.
+    """
+
+    def __init__(self, ticker_obj):
+        self._obj = ticker_obj
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name):
+        with self._lock:
+            if name not in self._memo:
+                try:
+                    self._memo[name] = (getattr(self._obj, name), None)
+                except Exception as e:
+                    self._memo[name] = (None, e)
+            value, error = self._memo[name]
+        if error is not None:
+            raise error
+        return value
+
+    @property
+    def calendar(self):
+        return self._get('calendar')
+
+    @property
+    def dividends(self):
+        return self._get('dividends')
+
+    @property
+    def earnings_dates(self):
+        return self._get('earnings_dates')
+
+    @property
+    def info(self):
+        return self._get('info')
+
+def build_calendar_entry(ep):
+    """Calendar item {next_earnings, ex_dividend_date, dividend_*...} from memoized endpoints"""
+    data = {}
+
+    # 1. Earnings (Improved with earnings_dates)
+    try:
+        # Try to get strictly future earnings from earnings_dates (DataFrame)
+        # This is more reliable than ticker.calendar which sometimes shows past dates
+        e_dates = ep.earnings_dates
+        found_future_earnings = False
+
+        if e_dates is not None and not e_dates.empty:
+            try:
+                # Normalize timezone to match earnings_dates index
+                now = pd.Timestamp.now().tz_localize(e_dates.index.dtype.tz)
+                future_earnings = e_dates[e_dates.index >= now].sort_index()
+
+                if not future_earnings.empty:
+                    # The first one is the nearest future earnings
+                    data['next_earnings'] = future_earnings.index[0].strftime('%Y-%m-%d')
+                    found_future_earnings = True
+
+                # Also capture past earnings for 'Recent Results'
+                past_earnings = e_dates[e_dates.index < now].sort_index(ascending=False)
+                if not past_earnings.empty:
+                    last = past_earnings.iloc[0]
+                    if pd.notna(last['Reported EPS']):
+                        data['last_earnings_date'] = past_earnings.index[0].strftime('%Y-%m-%d')
+                        data['last_eps_est'] = float(last['EPS Estimate']) if pd.notna(last['EPS Estimate']) else None
+                        data['last_eps_act'] = float(last['Reported EPS'])
+                        data['last_surprise'] = float(last['Surprise(%)']) if pd.notna(last['Surprise(%)']) else None
+            except Exception:
+                pass
+
+        # Fallback to .calendar if no future earnings found in dataframe
+        if not found_future_earnings:
+            cal = ep.calendar
+            if cal and 'Earnings Date' in cal:
+                dates = cal['Earnings Date']
+                if dates:
+                    data['next_earnings'] = dates[0].strftime('%Y-%m-%d')
+    except Exception:
+        pass
+
+    # 2. Dividend Dates (Calendar + History fallback)
+    try:
+        cal = ep.calendar
+        # Ex-Dividend Date
+        if cal and 'Ex-Dividend Date' in cal:
+            d_date = cal['Ex-Dividend Date']
+            if hasattr(d_date, 'strftime'):
+                data['ex_dividend_date'] = d_date.strftime('%Y-%m-%d')
+
+        # Payment Date
+        if cal and 'Dividend Date' in cal:
+            p_date = cal['Dividend Date']
+            if hasattr(p_date, 'strftime'):
+                data['dividend_payment_date'] = p_date.strftime('%Y-%m-%d')
+
+        # If no ex-dividend date from calendar (often empty if not declared),
+        # get the LAST ex-dividend date from history to show "Recent Div"
+        if 'ex_dividend_date' not in data:
+            divs = ep.dividends
+            if not divs.empty:
+                data['ex_dividend_date'] = divs.index[-1].strftime('%Y-%m-%d')
+    except Exception:
+        pass
+
+    # 3. Dividend Amount (Per Share) & Annualized TTM
+    try:
+        divs = ep.dividends
+        if not divs.empty:
+            data['dividend_amount'] = float(divs.iloc[-1])
+
+            # TTM Dividends (Last 365 days sum): handles any payout frequency
+            ttm_start = pd.Timestamp.now().tz_localize(divs.index.dtype.tz) - pd.Timedelta(days=365)
+            ttm_divs = divs[divs.index >= ttm_start]
+            if not ttm_divs.empty:
+                data['dividend_ttm'] = float(ttm_divs.sum())
+    except Exception:
+        pass
+
+    # 4. Dividend Yield (Priority: info > TTM calculation)
+    try:
+        info = ep.info
+        if info and 'dividendYield' in info and info['dividendYield']:
+            raw_yield = info['dividendYield']
+            # [Fix] If yield > 0.5 (50%), it's likely already a percentage.
+            if raw_yield > 0.5:
+                data['dividend_yield'] = round(raw_yield, 2)
+            else:
+                data['dividend_yield'] = round(raw_yield * 100, 2)
+
+        # Fallback: Calculate from TTM
+        elif 'dividend_ttm' in data and 'previousClose' in info:
+            price = info['previousClose']
+            if price and price > 0:
+                data['dividend_yield'] = round((data['dividend_ttm'] / price) * 100, 2)
+    except Exception:
+        pass
+
+    return data
+
+def refresh_priority(entry, last_checked, today):
+    """
+    Whether a ticker's calendar entry is due:
+    - 'urgent': never fetched, or its next_earnings / ex_dividend_date is within
+      CALENDAR_REFRESH_WINDOW_DAYS, or has passed and was not re-checked at least
+      CALENDAR_EVENT_GRACE_DAYS after it
+    - 'stale': never checked (no state yet) or older than CALENDAR_MAX_AGE_DAYS
+    - None: fresh
+    """
+    if not entry:
+        return 'urgent'
+    checked = datetime.strptime(last_checked, '%Y-%m-%d').date() if last_checked else None
+    if checked is not None and checked >= today:
+        return None
+    for field in ('next_earnings', 'ex_dividend_date'):
+        if not entry.get(field):
+            continue
+        event = datetime.strptime(entry[field], '%Y-%m-%d').date()
+        due = event - timedelta(days=CALENDAR_REFRESH_WINDOW_DAYS) <= today
+        settle_date = event + timedelta(days=CALENDAR_EVENT_GRACE_DAYS)
+        # Without a check date only events in their window count (not long-past ones)
+        settled = checked >= settle_date if checked is not None else today > settle_date
+        if due and not settled:
+            return 'urgent'
+    if checked is None or (today - checked).days >= CALENDAR_MAX_AGE_DAYS:
+        return 'stale'
+    return None
+
+class CalendarFetcher:
+    """
+    Earnings / dividend calendar for many tickers.
+    Tickers are fetched concurrently through the shared HTTP layer (cached
+    endpoints, cross-process 'yahoo' token bucket), with every yfinance
+    endpoint memoized per ticker (TickerEndpoints). update() refreshes
+    only tickers whose cached entry is due (refresh_priority) and merges them
+    into calendar_data.json; check dates live in calendar_state.json.
+    Stale entries are re-checked oldest first, at most CALENDAR_REFRESH_PER_RUN
+    per run, which spreads the weekly refresh over several days.
+    """
+
+    def __init__(self, ticker_factory=None, workers=None, output_path=None, state_path=None):
+        # Ticker provider: callable(yahoo symbol) -> object with calendar / dividends /
+        # earnings_dates / info attributes. Tests can inject a local stub.
+        self.ticker_factory = ticker_factory or YahooTicker
+        self.workers = max(1, workers or CALENDAR_WORKERS)
+        self.bucket = upstream_bucket('yahoo')
+        self.output_path = output_path or PATHS['CALENDAR_JSON']
+        self.state_path = state_path or PATHS['CALENDAR_STATE']
+
+    def _fetch_one(self, symbol):
+        return build_calendar_entry(TickerEndpoints(self.ticker_factory(symbol)))
+
+    def fetch(self, tickers):
+        """{yahoo symbol: entry} for tickers (symbols with no data are left out)"""
+        symbols = [t.replace('.', '-') for t in tickers]
+        print(f"📅 Fetching Calendar Data for {len(symbols)} tickers "
+              f"({self.workers} workers, {self.bucket.rate:g} req/s)...")
+        calendar_data = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._fetch_one, s): s for s in symbols}
+            for n, future in enumerate(as_completed(futures), 1):
+                symbol = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    print(f"   ⚠️ {symbol}: {e}")
+                    continue
+                if data:
+                    calendar_data[symbol] = data
+                if n % 50 == 0:
+                    print(f"   [{n}/{len(symbols)}] calendar entries fetched")
+        return calendar_data
+
+    def _load(self, path):
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"⚠️ Failed to load {path} ({e}), refreshing all.")
+        return {}
+
+    def _save(self, path, obj, indent=None):
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, indent=indent)
+        os.replace(tmp, path)
+
+    def due(self, symbols, existing, state, today):
+        """Symbols to refetch: urgent always, stale ones oldest first (capped)"""
+        priority = {s: refresh_priority(existing.get(s), state.get(s), today) for s in symbols}
+        urgent = [s for s in symbols if priority[s] == 'urgent']
+        # Never-checked entries ('' sorts first), then by check date
+        stale = sorted((s for s in symbols if priority[s] == 'stale'), key=lambda s: state.get(s) or '')
+        return urgent + stale[:CALENDAR_REFRESH_PER_RUN]
+
+    def update(self, tickers, full=False):
+        """
+        Incremental refresh of calendar_data.json for tickers.
+        full=True re-fetches every ticker. Returns the merged calendar dict.
+        """
+        today = datetime.now().date()
+        existing = self._load(self.output_path)
+        state = self._load(self.state_path)  # {symbol: last checked YYYY-MM-DD}
+
+        symbols = [t.replace('.', '-') for t in tickers]
+        due = symbols if full else self.due(symbols, existing, state, today)
+        print(f"📅 Calendar: {len(due)}/{len(symbols)} tickers due for refresh.")
+
+        fresh = self.fetch(due) if due else {}
+        today_str = today.strftime('%Y-%m-%d')
+        calendar_data, new_state = {}, {}
+        for s in symbols:
+            if s in fresh:
+                calendar_data[s] = fresh[s]
+                new_state[s] = today_str
+            elif s in existing:
+                # Not due, or the fetch came back empty: keep the cached entry
+                calendar_data[s] = existing[s]
+                if state.get(s):
+                    new_state[s] = state[s]
+
+        self._save(self.output_path, calendar_data, indent=4)
+        self._save(self.state_path, new_state)
+        print(f"✅ Calendar data saved to {self.output_path} "
+              f"({len(calendar_data)} items, {len(fresh)} refreshed)")
+        return calendar_data
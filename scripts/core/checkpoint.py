@@ -0,0 +1,96 @@
+import os
+import json
+import hashlib
+import pandas as pd
+from datetime import datetime
+from scripts.config import PATHS
+
+def fingerprint(*parts):
+    """Stable content hash of stage inputs (DataFrames, JSON-able objects, bytes)"""
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            h.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+            h.update('|'.join(map(str, part.columns)).encode())
+        elif isinstance(part, bytes):
+            h.update(part)
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode())
+        h.update(b'\x00')
+    return h.hexdigest()
+
+def file_fingerprint(path):
+    """Content hash of a file ('' if missing)"""
+    if not os.path.exists(path):
+        return ''
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+class StageCheckpoint:
+    """
+    Persists each engine stage's artifact together with a fingerprint of its inputs.
+    Fingerprints are chained (each stage includes the previous stage's), so a
+    change anywhere upstream invalidates everything downstream.
+    - resume=True: a stage whose fingerprint matches its checkpoint is loaded, not run
+    - from_stage=X: stages before X are loaded from their checkpoints (if any),
+      X and everything after it are re-run
+    """
+
+    def __init__(self, stages, resume=False, from_stage=None, root=None):
+        if from_stage is not None and from_stage not in stages:
+            raise ValueError(f"Unknown stage '{from_stage}'. Choose from: {', '.join(stages)}")
+        self.stages = stages
+        self.resume = resume
+        self.from_stage = from_stage
+        self.root = root or PATHS['CHECKPOINT_DIR']
+        self.last_fp = ''
+        self.loaded = False  # whether the last run() came from a checkpoint
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, stage):
+        return os.path.join(self.root, f"{stage}.pkl")
+
+    def _before_from_stage(self, stage):
+        return self.from_stage is not None and \
+            self.stages.index(stage) < self.stages.index(self.from_stage)
+
+    def load(self, stage):
+        path = self.path(stage)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_pickle(path)
+        except Exception as e:
+            print(f"   ⚠️ Checkpoint for '{stage}' unreadable ({e}), re-running.")
+            return None
+
+    def save(self, stage, fp, artifact):
+        path = self.path(stage)
+        tmp = path + '.tmp'
+        pd.to_pickle({
+            "fingerprint": fp,
+            "saved_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "artifact": artifact
+        }, tmp)
+        os.replace(tmp, path)
+
+    def run(self, stage, inputs, fn):
+        """Return the stage artifact, from checkpoint when allowed, else fn() (then saved)"""
+        fp = fingerprint(self.last_fp, stage, *inputs)
+
+        if self.resume or self._before_from_stage(stage):
+            cached = self.load(stage)
+            if cached is not None:
+                if cached['fingerprint'] == fp or self._before_from_stage(stage):
+                    if cached['fingerprint'] != fp:
+                        print(f"   ⚠️ '{stage}' inputs changed since checkpoint, loading anyway (--from-stage)")
+                    print(f"⏭️ [{stage}] Loaded checkpoint from {cached['saved_at']}")
+                    self.last_fp = cached['fingerprint']
+                    self.loaded = True
+                    return cached['artifact']
+
+        self.loaded = False
+        artifact = fn()
+        self.save(stage, fp, artifact)
+        self.last_fp = fp
+        return artifact
@@ -0,0 +1,125 @@
+import os
+import gzip
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from scripts.config import PATHS, BASE_DIR, DATA_DIR, PRECOMPRESS_EXCLUDE, PRECOMPRESS_WORKERS
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+SIBLING_EXTS = ('.gz', '.br')
+INLINE_LIMIT = 16  # fewer changed files than this -> compress in-process (no pool startup)
+
+def _atomic_write_bytes(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _compress_file(path):
+    """Write path.gz (and path.br if brotli is installed) next to path"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    # mtime=0 -> byte-identical output for identical input (no git churn)
+    _atomic_write_bytes(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    if HAS_BROTLI:
+        _atomic_write_bytes(path + '.br', brotli.compress(data, quality=11))
+    elif os.path.exists(path + '.br'):
+        os.remove(path + '.br')  # would be stale
+    return path
+
+def _digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def remove_siblings(path):
+    """Delete the .gz / .br siblings of a removed artifact"""
+    for ext in SIBLING_EXTS:
+        if os.path.exists(path + ext):
+            os.remove(path + ext)
+
+def data_json_files(data_dir=None):
+    """Public JSON artifacts under data/ (internal state / caches excluded)"""
+    data_dir = data_dir or DATA_DIR
+    out = []
+    for root, dirs, files in os.walk(data_dir):
+        dirs[:] = [d for d in dirs if os.path.relpath(os.path.join(root, d), data_dir) not in PRECOMPRESS_EXCLUDE]
+        for fname in files:
+            rel = os.path.relpath(os.path.join(root, fname), data_dir)
+            if fname.endswith('.json') and rel not in PRECOMPRESS_EXCLUDE:
+                out.append(os.path.join(root, fname))
+    return sorted(out)
+
+class Precompressor:
+    """
+    Writes .gz / .br siblings for static artifacts.
+    A manifest (path -> sha1 of the source) is kept next to the data, so a
+    sibling is only rewritten when its source content changed. The update
+    job commits the manifest and siblings with the artifacts; until its
+    first run neither is in the tree and everything is compressed once.
+    Changed files are compressed across a process pool (brotli q11 is CPU-bound).
+    brotli is optional: without it only .gz siblings are written.
+    """
+
+    def __init__(self, manifest_path=None, workers=None):
+        self.manifest_path = manifest_path or PATHS['PRECOMPRESS_MANIFEST']
+        self.workers = workers or PRECOMPRESS_WORKERS
+        self.base = BASE_DIR
+        self.manifest = self._load()
+
+    def _load(self):
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"⚠️ Failed to load precompress manifest ({e}), recompressing all.")
+        return {}
+
+    def _save(self):
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=0, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def _key(self, path):
+        # Project-relative, '/' separated (stable across machines / OS)
+        return os.path.relpath(os.path.abspath(path), self.base).replace(os.sep, '/')
+
+    def _is_fresh(self, path, digest):
+        if self.manifest.get(self._key(path)) != digest:
+            return False
+        exts = SIBLING_EXTS if HAS_BROTLI else ('.gz',)
+        return all(os.path.exists(path + ext) for ext in exts)
+
+    def run(self, paths, digests=None):
+        """
+        Compress every changed file in paths. Returns the number rewritten.
+        digests: already-known {path: sha1} (skips re-reading those files)
+        """
+        known = digests or {}
+        digests = {p: known.get(p) or _digest(p) for p in paths if os.path.exists(p)}
+        changed = [p for p, d in digests.items() if not self._is_fresh(p, d)]
+
+        if changed:
+            if len(changed) < INLINE_LIMIT or self.workers <= 1:
+                for p in changed:
+                    _compress_file(p)
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    list(pool.map(_compress_file, changed, chunksize=16))
+            for p in changed:
+                self.manifest[self._key(p)] = digests[p]
+
+        # Forget artifacts that no longer exist
+        for key in [k for k in self.manifest if not os.path.exists(os.path.join(self.base, k))]:
+            del self.manifest[key]
+        self._save()
+
+        print(f"🗜️ Precompressed {len(changed)}/{len(digests)} changed artifacts"
+              f" ({'gzip + brotli' if HAS_BROTLI else 'gzip only, brotli not installed'})")
+        return len(changed)
@@ -1,29 +1,172 @@
-import yfinance as yf
 import json
 import time
 import os
 import socket
 import gc
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from scripts.config import PATHS
-from scripts.core.fetcher import StockDataFetcher
+from scripts.config import (
+    PATHS, CONSENSUS_WORKERS, CONSENSUS_RETRIES, CONSENSUS_BACKOFF_BASE, CONSENSUS_BACKOFF_MAX
+)
+from scripts.core.universe import universe as default_universe
+from scripts.core.metrics import metrics
+from scripts.core.ratelimit import backoff_delay, is_rate_limit_error
+from scripts.core.http_cache import yahoo_info, upstream_bucket
+
+def build_consensus_entry(info):
+    """Consensus item from a yfinance .info dict (None if it holds no usable data)"""
+    rec_mean_yahoo = info.get('recommendationMean')
+    now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    # Financial Health Data
+    financial_health = {
+        "per": round(info.get('trailingPE') or 0, 2),
+        "pbr": round(info.get('priceToBook') or 0, 2),
+        "revenue_growth": round((info.get('revenueGrowth') or 0) * 100, 1),
+        "eps_growth": round((info.get('earningsGrowth') or 0) * 100, 1),
+        "roe": round((info.get('returnOnEquity') or 0) * 100, 1),
+        "operating_margin": round((info.get('operatingMargins') or 0) * 100, 1),
+        "debt_ratio": round(info.get('debtToEquity') or 0, 1),
+        "current_ratio": round(info.get('currentRatio') or 0, 2)
+    }
+
+    if rec_mean_yahoo:
+        # Invert Score: NewScore = 6 - YahooScore
+        score = round(6 - rec_mean_yahoo, 1)
+
+        # Status
+        if score >= 4.5: status = "Strong Buy"
+        elif score >= 3.5: status = "Buy"
+        elif score >= 2.5: status = "Hold"
+        elif score >= 1.5: status = "Sell"
+        else: status = "Strong Sell"
+
+        return {
+            "target_price": {
+                "low": info.get('targetLowPrice'),
+                "mean": info.get('targetMeanPrice'),
+                "high": info.get('targetHighPrice')
+            },
+            "recommendation": {
+                "score": score,
+                "status": status,
+                "yahoo_mean": rec_mean_yahoo,
+                "key": info.get('recommendationKey')
+            },
+            "financial_health": financial_health,
+            "last_updated": now_str
+        }
+
+    # Partial Data: target price and/or financials without a rating
+    target_mean = info.get('targetMeanPrice')
+    has_financial = any(v != 0 for v in financial_health.values())
+    if not (target_mean or has_financial):
+        return None
+    return {
+        "target_price": {
+            "low": info.get('targetLowPrice'),
+            "mean": target_mean,
+            "high": info.get('targetHighPrice')
+        } if target_mean else None,
+        "recommendation": None,
+        "financial_health": financial_health if has_financial else None,
+        "last_updated": now_str
+    }
+
+class ConsensusJournal:
+    """
+    Append-only log of per-ticker results for today's run (one JSON line each,
+    flushed as it is written). An interrupted run replays it and resumes with
+    the tickers that have no entry yet. Removed after the final save.
+    """
+
+    def __init__(self, path, run_date):
+        self.path = path
+        self.run_date = run_date
+        self.lock = threading.Lock()
+
+    def load(self):
+        """{ticker: {"status", "data"}} recorded today (a truncated last line is ignored)"""
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get('run_date') == self.run_date:
+                    done[rec['ticker']] = rec
+        return done
+
+    def append(self, ticker, status, data):
+        line = json.dumps({"run_date": self.run_date, "ticker": ticker, "status": status, "data": data},
+                          ensure_ascii=False)
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
 
 class ConsensusManager:
     """
     Manages fetching and storing Wall St. Consensus data
     from Yahoo Finance (Recommendation Mean, Target Price, etc.)
+    Tickers are fetched concurrently through the shared HTTP layer (cached
+    .info, cross-process 'yahoo' token bucket); a 429 pauses the whole bucket
+    (jittered exponential backoff).
     """
-    
-    def __init__(self):
-        self.fetcher = StockDataFetcher()
-        self.output_path = PATHS['CONSENSUS_JSON']
+
+    def __init__(self, info_reader=None, universe=None, output_path=None, journal_path=None,
+                 workers=None):
+        # Info provider: callable(yahoo symbol) -> .info dict. Tests can inject a local stub.
+        self.info_reader = info_reader or yahoo_info
+        self.universe = universe or default_universe
+        self.output_path = output_path or PATHS['CONSENSUS_JSON']
+        self.journal_path = journal_path or PATHS['CONSENSUS_JOURNAL']
+        self.workers = max(1, workers or CONSENSUS_WORKERS)
+        self.bucket = upstream_bucket('yahoo')
+        self.retries = CONSENSUS_RETRIES
         # Set global timeout for yfinance downloads (30 seconds)
         socket.setdefaulttimeout(30)
-        
-    def fetch_all_consensus(self):
-        """Fetch consensus data for all S&P 500 tickers"""
-        tickers = self.fetcher.get_sp500_tickers()
-        
+
+    def _fetch_one(self, ticker):
+        """(status, entry, error) for one ticker: status is ok / empty / failed"""
+        # Convert to Yahoo format (Dot to Hyphen)
+        yf_ticker = ticker.replace('.', '-')
+        for attempt in range(self.retries):
+            try:
+                info = self.info_reader(yf_ticker)
+            except Exception as e:
+                if attempt == self.retries - 1:
+                    return "failed", None, str(e)
+                delay = backoff_delay(attempt, CONSENSUS_BACKOFF_BASE, CONSENSUS_BACKOFF_MAX)
+                if is_rate_limit_error(e):
+                    self.bucket.pause(delay)  # every worker backs off, not just this one
+                metrics.count_retry()
+                print(f" ⚠️ {ticker}: {e} (Attempt {attempt+1}/{self.retries}). Retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                continue
+            entry = build_consensus_entry(info or {})
+            return ("ok" if entry else "empty"), entry, None
+        return "failed", None, "no attempts"
+
+    def _save(self, consensus_map):
+        tmp = self.output_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(consensus_map, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.output_path)
+
+    def fetch_all_consensus(self, tickers=None):
+        """Fetch consensus data for all S&P 500 tickers (resumes an interrupted run)"""
+        tickers = tickers or self.universe.tickers()
+        today_str = datetime.now().strftime('%Y-%m-%d')
+
         # 1. Load existing data to prevent data loss (Merge logic)
         consensus_map = {}
         if os.path.exists(self.output_path):
@@ -34,165 +177,58 @@ class ConsensusManager:
             except Exception as e:
                 print(f"⚠️ Failed to load existing data: {e}. Starting fresh.")
                 consensus_map = {}
-        
-        success_count = 0
+
+        # 2. [RESUME LOGIC] Replay today's journal, skip tickers already updated today
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        journal = ConsensusJournal(self.journal_path, today_str)
+        done = {t: rec for t, rec in journal.load().items() if rec['status'] != 'failed'}
+        for ticker, rec in done.items():
+            if rec.get('data'):
+                consensus_map[ticker] = rec['data']
+        if done:
+            print(f"↩️ Resuming: {len(done)} tickers already in today's journal.")
+
+        pending = [t for t in tickers if t not in done and
+                   not consensus_map.get(t, {}).get('last_updated', '').startswith(today_str)]
+        success_count = len(tickers) - len(pending)  # already fresh counts as success
         fail_count = 0
-        
-        print(f"🚀 Starting Consensus Fetch for {len(tickers)} stocks...")
-        print("⏳ This process will take time (approx 30 mins) to avoid rate limits.")
-        
-        for idx, ticker in enumerate(tickers):
-            # Explicit GC every 50 stocks to prevent memory leaks in GitHub Actions
-            if idx % 50 == 0:
-                gc.collect()
-
-            # [RESUME LOGIC] Check if we already have fresh data for this ticker
-            today_str = datetime.now().strftime('%Y-%m-%d')
-            if ticker in consensus_map:
-                last_updated = consensus_map[ticker].get('last_updated', '')
-                # If last_updated starts with today's date, skip it
-                if last_updated.startswith(today_str):
-                    print(f"[{idx+1}/{len(tickers)}] Skipping {ticker} (Already updated today: {last_updated})")
-                    success_count += 1 # Count as success to keep stats happy
+
+        print(f"🚀 Starting Consensus Fetch for {len(pending)}/{len(tickers)} stocks "
+              f"({self.workers} workers, {self.bucket.rate:g} req/s)...")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._fetch_one, t): t for t in pending}
+            for n, future in enumerate(as_completed(futures), 1):
+                ticker = futures[future]
+                status, entry, error = future.result()
+                journal.append(ticker, status, entry)
+
+                if status == "failed":
+                    fail_count += 1
+                    print(f"[{n}/{len(pending)}] ❌ CRITICAL ERROR fetching {ticker}: {error}")
                     continue
+                success_count += 1
+                if entry:
+                    consensus_map[ticker] = entry
+                    rec = entry.get('recommendation')
+                    label = f"{rec['status']} ({rec['score']})" if rec else "⚠️ partial (no rating)"
+                else:
+                    label = "⚠️ No data (Info empty)"
+                print(f"[{n}/{len(pending)}] {ticker}: {label}")
 
-            # Convert to Yahoo format (Dot to Hyphen)
-            yf_ticker = ticker.replace('.', '-')
-            
-            print(f"[{idx+1}/{len(tickers)}] Fetching {ticker} ({yf_ticker})...")
-            
-            # Retry Loop (Max 3 attempts)
-            max_retries = 3
-            fetched_success = False
-            
-            for attempt in range(max_retries):
-                try:
-                    stock = yf.Ticker(yf_ticker)
-                    info = stock.info
-                    
-                    # Check availability (Key check)
-                    # If this succeeds, we assume fetch worked
-                    rec_mean_yahoo = info.get('recommendationMean')
-                    
-                    # Financial Health Data
-                    financial_health = {
-                        "per": round(info.get('trailingPE') or 0, 2),
-                        "pbr": round(info.get('priceToBook') or 0, 2),
-                        "revenue_growth": round((info.get('revenueGrowth') or 0) * 100, 1),
-                        "eps_growth": round((info.get('earningsGrowth') or 0) * 100, 1),
-                        "roe": round((info.get('returnOnEquity') or 0) * 100, 1),
-                        "operating_margin": round((info.get('operatingMargins') or 0) * 100, 1),
-                        "debt_ratio": round(info.get('debtToEquity') or 0, 1),
-                        "current_ratio": round(info.get('currentRatio') or 0, 2)
-                    }
-                    
-                    # Process Data
-                    if rec_mean_yahoo:
-                        # Invert Score: NewScore = 6 - YahooScore
-                        score = round(6 - rec_mean_yahoo, 1)
-                        
-                        # Status
-                        if score >= 4.5: status = "Strong Buy"
-                        elif score >= 3.5: status = "Buy"
-                        elif score >= 2.5: status = "Hold"
-                        elif score >= 1.5: status = "Sell"
-                        else: status = "Strong Sell"
-                        
-                        consensus_data = {
-                            "target_price": {
-                                "low": info.get('targetLowPrice'),
-                                "mean": info.get('targetMeanPrice'),
-                                "high": info.get('targetHighPrice')
-                            },
-                            "recommendation": {
-                                "score": score,
-                                "status": status,
-                                "yahoo_mean": rec_mean_yahoo,
-                                "key": info.get('recommendationKey')
-                            },
-                            "financial_health": financial_health,
-                            "last_updated": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        }
-                        
-                        consensus_map[ticker] = consensus_data
-                        print(f"   ✅ {status} ({score})")
-                        
-                    else:
-                        # Partial Data Logic
-                        target_mean = info.get('targetMeanPrice')
-                        has_financial = any(v != 0 for v in financial_health.values())
-                        
-                        if target_mean or has_financial:
-                            # Keep existing Recommendation if we fail to get a new one? 
-                            # For now, just save what we got, but careful not to overwrite good data with bad?
-                            # Decision: Overwrite with what we found, assuming it's fresher.
-                            
-                            consensus_map[ticker] = {
-                                "target_price": {
-                                    "low": info.get('targetLowPrice'),
-                                    "mean": target_mean,
-                                    "high": info.get('targetHighPrice')
-                                } if target_mean else None,
-                                "recommendation": None,
-                                "financial_health": financial_health if has_financial else None,
-                                "last_updated": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                            }
-                            if target_mean:
-                                print(f"   ⚠️ No rating, but saved target price ${target_mean}")
-                            else:
-                                print(f"   ⚠️ No consensus, but saved financials")
-                        else:
-                            print(f"   ⚠️ No data (Info empty)")
-                            # Do NOT increment success/fail here yet, continue to logic end
-                            pass
-                    
-                    fetched_success = True
-                    success_count += 1
-                    break # Break retry loop
-                    
-                except Exception as e:
-                    # Check for Rate Limit specifically if possible, though 'e' might be generic
-                    error_msg = str(e).lower()
-                    import traceback
-                    
-                    is_rate_limit = "too many requests" in error_msg or "rate limit" in error_msg or "429" in error_msg
-                    
-                    if attempt < max_retries - 1:
-                        wait_time = 10 if is_rate_limit else 2
-                        print(f" ⚠️ Error (Attempt {attempt+1}/{max_retries}): {e}. Retrying in {wait_time}s...")
-                        time.sleep(wait_time)
-                    else:
-                        print(f" ❌ CRITICAL ERROR fetching {ticker}: {e}")
-                        # traceback.print_exc() # detailed trace only on final fail
-                        fail_count += 1
-            
-            # End of Retry Loop
-            
-            # Rate Limiting: 2 seconds per stock (Standard)
-            time.sleep(2)
-            
-            # Incremental Save (Every 20 stocks)
-            if (idx + 1) % 20 == 0:
-                print(f"   💾 [Auto-Save] Saving progress for {len(consensus_map)} stocks...")
-                try:
-                    with open(self.output_path, 'w', encoding='utf-8') as f:
-                        json.dump(consensus_map, f, indent=2, ensure_ascii=False)
-                    # Force flush to disk
-                    f.flush()
-                    os.fsync(f.fileno()) 
-                except: pass
-
-        print(f"\n✅ Loop Finished. processed {len(tickers)} items.")
-        
-        # Final Save
+                # Explicit GC every 50 stocks to prevent memory leaks in GitHub Actions
+                if n % 50 == 0:
+                    gc.collect()
+
+        # Final Save (journal no longer needed once the merged file is on disk)
         try:
             print(f"💾 Saving final data to {self.output_path}...")
-            with open(self.output_path, 'w', encoding='utf-8') as f:
-                json.dump(consensus_map, f, indent=2, ensure_ascii=False)
-                
+            self._save(consensus_map)
+            journal.clear()
             print(f"💾 Saved consensus + financial data for {len(consensus_map)} stocks to {self.output_path}")
             print(f"📊 Summary: Success {success_count}, Fail {fail_count} (Total {len(tickers)})")
         except Exception as e:
             print(f"❌ FAILED TO SAVE JSON: {e}")
             import traceback
             traceback.print_exc()
+        return consensus_map
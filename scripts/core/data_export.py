@@ -0,0 +1,82 @@
+import os
+import json
+from scripts.config import PATHS
+from scripts.core.compress import remove_siblings
+
+# Fields rendered by the ranking table / header search (index.html, en/index.html)
+INDEX_FIELDS = [
+    'ticker', 'name', 'name_en', 'exchange', 'sector', 'current_price', 'change_pct',
+    'market_cap', 'final_score', 'rank', 'rank_change', 'sector_rank', 'sector_rank_change',
+    'tier', 'related_peers',
+]
+
+def atomic_write_text(path, text):
+    """Write via temp file + rename so readers never see a partial file"""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def write_if_changed(path, text):
+    """Atomic write, skipped when the file already has this content. Returns True if written."""
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    atomic_write_text(path, text)
+    return True
+
+def slim_item(item):
+    return {k: item[k] for k in INDEX_FIELDS if k in item}
+
+def detail_item(item, names):
+    """Full per-ticker item; peer lists carry names so the page needs no other file"""
+    detail = dict(item)
+    for key in ('related_peers', 'similar_score_peers'):
+        detail[key] = [
+            {**p, "name": names.get(p['ticker'], {}).get('name', p['ticker']),
+             "name_en": names.get(p['ticker'], {}).get('name_en', p['ticker'])}
+            for p in item.get(key) or []
+        ]
+    return detail
+
+def save_data_files(final_results, out_path=None, index_path=None, stock_dir=None):
+    """
+    Write data.json together with the slim data/index.json and one
+    data/stock/<TICKER>.json detail shard per ticker.
+    Order keeps readers consistent: shards first, then index.json, then
+    data.json (every file replaced atomically), so any ticker listed in the
+    index already has its shard. Shards of tickers no longer listed are removed.
+    Returns the tickers whose shard was rewritten.
+    """
+    out_path = out_path or PATHS['OUTPUT_JSON']
+    index_path = index_path or PATHS['INDEX_JSON']
+    stock_dir = stock_dir or PATHS['STOCK_SHARD_DIR']
+    os.makedirs(stock_dir, exist_ok=True)
+
+    names = {item['ticker']: item for item in final_results}
+    changed = []
+    for item in final_results:
+        shard = os.path.join(stock_dir, f"{item['ticker']}.json")
+        text = json.dumps(detail_item(item, names), ensure_ascii=False, separators=(',', ':'))
+        if write_if_changed(shard, text):
+            changed.append(item['ticker'])
+
+    atomic_write_text(index_path, json.dumps([slim_item(i) for i in final_results],
+                                             ensure_ascii=False, separators=(',', ':')))
+    atomic_write_text(out_path, json.dumps(final_results, indent=2, ensure_ascii=False))
+
+    # Drop shards for tickers that left the universe (after the index no longer lists them)
+    for fname in os.listdir(stock_dir):
+        if fname.endswith('.json') and fname[:-len('.json')] not in names:
+            os.remove(os.path.join(stock_dir, fname))
+            remove_siblings(os.path.join(stock_dir, fname))
+
+    return changed
+
+if __name__ == "__main__":
+    # Rebuild index.json + shards from the current data.json (no engine run)
+    with open(PATHS['OUTPUT_JSON'], 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    changed = save_data_files(data)
+    print(f"📦 Wrote index.json + {len(changed)} changed shards for {len(data)} stocks")
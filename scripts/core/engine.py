@@ -5,8 +5,25 @@ from datetime import datetime
 from scripts.core.fetcher import StockDataFetcher
 from scripts.core.analyzer import TechnicalAnalyzer
 from scripts.core.scorer import MarketScorer
+from scripts.core.price_store import PriceStore
+from scripts.core.indicator_state import IndicatorState
+from scripts.core.indicator_panel import save_indicator_panel
+from scripts.core.shares import SharesCache
+from scripts.core.onboarding import OnboardingQueue
+from scripts.core.checkpoint import StageCheckpoint, file_fingerprint
+from scripts.core.metrics import metrics
+from scripts.core.data_export import save_data_files
+from scripts.core.compress import Precompressor
 from scripts.config import PATHS, SECTOR_TRANS_MAP
 
+def _count_rows(artifact):
+    """Rows processed by a stage (first element for tuple artifacts)"""
+    if isinstance(artifact, tuple) and artifact:
+        artifact = artifact[0]
+    if isinstance(artifact, (pd.DataFrame, list, dict)):
+        return len(artifact)
+    return None
+
 # Try import sitemap generator
 try:
     from tools.generate_sitemap import generate_sitemap
@@ -24,8 +41,13 @@ class NaspickEngine:
     
     def __init__(self):
         self.fetcher = StockDataFetcher()
+        self.universe = self.fetcher.universe
         self.scorer = MarketScorer()
         self.analyzer = TechnicalAnalyzer()
+        self.price_store = PriceStore()
+        self.indicator_state = IndicatorState()
+        self.shares = SharesCache()
+        self.onboarding = OnboardingQueue()
         
         # Paths from Config
         self.paths = PATHS
@@ -40,7 +62,7 @@ class NaspickEngine:
 
     def load_calendar_data(self):
         """Load cached calendar data"""
-        path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'calendar_data.json')
+        path = self.paths['CALENDAR_JSON']
         if os.path.exists(path):
             try:
                 with open(path, 'r', encoding='utf-8') as f:
@@ -48,9 +70,39 @@ class NaspickEngine:
             except: pass
         return {}
 
-    def run(self):
+    # Pipeline stages in execution order (see run / StageCheckpoint)
+    STAGES = ['fetch', 'technicals', 'score', 'market_caps', 'context',
+              'save', 'history', 'sitemap', 'signals']
+
+    def run(self, resume=False, from_stage=None):
+        """
+        Run the full pipeline as named, checkpointed stages.
+        resume: skip stages whose inputs are unchanged since the last run
+        from_stage: reuse checkpoints before this stage and re-run it and everything after
+        """
         print("🚀 Naspick Engine Started (Facade Pattern Implementation)")
         print(f"⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        cp = StageCheckpoint(self.STAGES, resume=resume, from_stage=from_stage)
+        try:
+            self._run_stages(cp)
+        finally:
+            metrics.flush()
+
+    def _stage(self, cp, stage, inputs, fn, component=None):
+        """cp.run() wrapped in a timing / memory / HTTP metrics record"""
+        with metrics.stage(stage, component) as rec:
+            artifact = cp.run(stage, inputs, fn)
+            rec['rows'] = _count_rows(artifact)
+            rec['checkpoint'] = cp.loaded
+        return artifact
+
+    def _run_stages(self, cp):
+        tickers = self.universe.tickers()
+
+        # 0. New index members: deep price backfill + queued financials / consensus / names
+        with metrics.stage('onboarding', 'OnboardingQueue') as rec:
+            rec['rows'] = len(self.stage_onboarding(tickers))
 
         # 1. Load Financials
         fin_path = self.paths['FINANCIAL_INFO']
@@ -62,40 +114,126 @@ class NaspickEngine:
         print(f"✓ Loaded {len(df_fin)} financial records")
 
         # 2. Fetch Data
-        tickers = self.fetcher.get_sp500_tickers()
-        print(f"📊 Fetching Price Data for {len(tickers)} tickers...")
-        
-        df_all_price = self.fetcher.fetch_price_history_bulk(tickers)
+        today = datetime.now().strftime('%Y-%m-%d')
+        df_all_price, split_tickers = self._stage(cp, 'fetch', [tickers, today], lambda: self.stage_fetch(tickers),
+                                                  component='StockDataFetcher')
+        # Restored from the checkpoint too, so a resumed run still force-refreshes
+        # shares and rebuilds indicator state for split tickers
+        self.fetcher.split_tickers = set(split_tickers)
         if df_all_price.empty:
             print("❌ No price data fetched. Aborting.")
             return
             
         print(f"✓ Fetched {len(df_all_price)} total rows.")
 
+        # 2.5 Carried-over indicator state: RSI / MACD / volume / volatility in O(1)
+        #     per ticker (rebuilt / split tickers are recomputed from full history)
+        with metrics.stage('indicator_state', 'IndicatorState') as rec:
+            inc_df = self.stage_indicator_state(df_all_price)
+            rec['rows'] = len(inc_df)
+            rec['rebuilt'] = len(self.indicator_state.rebuilt)
+
         # 3. Calculate Technical Factors (Bulk)
-        df_all_price = self.scorer.calculate_technical_factors_bulk(df_all_price)
+        df_all_price = self._stage(cp, 'technicals', [],
+                                   lambda: self.scorer.calculate_technical_factors_bulk(
+                                       df_all_price, latest=inc_df[['Vol_3M_Avg', 'Vol_Spike', 'Volatility_60D']]),
+                                   component='MarketScorer')
 
         # 3.5 Load Consensus (needed for scoring)
         consensus_data = self.load_consensus()
 
         # 4. Score Logic (Sector Relative)
+        latest_date = df_all_price['Date'].max()
+        ranked_df = self._stage(cp, 'score', [df_fin, consensus_data],
+                                lambda: self.stage_score(df_all_price, df_fin, consensus_data),
+                                component='MarketScorer')
+
+        # 5. Market Caps (cached shares outstanding x latest close)
+        market_caps = self._stage(cp, 'market_caps', [],
+                                  lambda: self.stage_market_caps(df_all_price, ranked_df['Ticker'].tolist()),
+                                  component='SharesCache')
+
+        # 6-7. Generate Context & JSON
+        context_inputs = [
+            file_fingerprint(self.paths['CALENDAR_JSON']),
+            file_fingerprint(self.paths['RANKS_JSON']),
+        ]
+        final_results, yesterday_ranks = self._stage(cp, 'context', context_inputs,
+            lambda: self.build_results(df_all_price, ranked_df, market_caps, consensus_data, inc_df))
+
+        # 8. Save
+        self._stage(cp, 'save', [], lambda: self.save_results(final_results))
+
+        # Save History
+        self._stage(cp, 'history', [], lambda: self.save_history(ranked_df, latest_date))
+        
+        # Sitemap
+        def run_sitemap():
+            print("Running Sitemap generator...")
+            generate_sitemap()
+        self._stage(cp, 'sitemap', [], run_sitemap)
+        
+        # 9. Aggregate Signals (For Bot)
+        self._stage(cp, 'signals', [], lambda: self.aggregate_signals(final_results, yesterday_ranks))
+
+    def stage_onboarding(self, tickers):
+        """
+        Detect tickers missing from the price store, backfill their history
+        once and run their queued follow-up jobs (before financials are
+        loaded, so they are scored in this run). Returns the new tickers.
+        """
+        new = self.fetcher.new_tickers(tickers, self.price_store)
+        if new:
+            backfilled = self.fetcher.backfill_new_tickers(new, self.price_store)
+            self.onboarding.enqueue(backfilled)
+        self.onboarding.run()
+        return new
+
+    def stage_fetch(self, tickers):
+        """Price panel for tickers (incremental through the local price store) and the split tickers"""
+        # Incremental: only bars after the last stored bar are downloaded
+        df = self.fetcher.fetch_price_history_bulk(tickers, store=self.price_store)
+        return df, sorted(self.fetcher.split_tickers)
+
+    def stage_indicator_state(self, df_all_price):
+        """
+        Advance the indicator state and save it. Returns the state-derived
+        indicators for tickers whose state was valid (not rebuilt, no split);
+        the others are left to the full-history computations.
+        """
+        inc_df = self.indicator_state.update(df_all_price, force=self.fetcher.split_tickers)
+        self.indicator_state.save()
+        return inc_df.drop(index=self.indicator_state.rebuilt, errors='ignore')
+
+    def stage_market_caps(self, df_all_price, tickers):
+        """
+        Market cap = shares outstanding x the latest close in the price panel
+        (same close as current_price). Shares are refreshed weekly, or right
+        away for tickers whose history changed (split) in this run.
+        """
+        self.shares.refresh(tickers, force=self.fetcher.split_tickers)
+        latest = df_all_price.sort_values('Date').groupby('Ticker')['Close'].last()
+        return self.shares.market_caps(latest.reindex(tickers).to_dict())
+
+    def stage_score(self, df_all_price, df_fin, consensus_data):
+        """Sector-relative scores for the latest date"""
         print("🏆 Calculating Scores (Sector Ranking)...")
         latest_date = df_all_price['Date'].max()
         print(f"   Target Date: {latest_date.date()}")
 
         df_latest = df_all_price[df_all_price['Date'] == latest_date].copy()
-        ranked_df = self.scorer.apply_sector_scoring(df_latest, df_fin, consensus_data)
+        return self.scorer.apply_sector_scoring(df_latest, df_fin, consensus_data)
 
-        # 5. Fetch Market Caps
-        market_caps = self.fetcher.get_market_caps_bulk(ranked_df['Ticker'].tolist())
+    def build_results(self, df_all_price, ranked_df, market_caps, consensus_data, indicators=None):
+        """
+        Build the final per-stock items (context, signals, peers), merged with existing data.json.
+        Returns (final_results, yesterday_ranks)
+        """
+        print("📝 Generating Final JSON...")
         
-        # 5.5 Load Calendar Data (From Cache)
+        # Load Calendar Data (From Cache)
         # calendar_data = self.fetcher.fetch_calendar_data_bulk(ranked_df['Ticker'].tolist()) # OLD Live Fetch
         calendar_data = self.load_calendar_data()
-
-
-        # 6. Generate Context & JSON
-        print("📝 Generating Final JSON...")
         
         # Load Aux Data
         yesterday_ranks = {}
@@ -118,7 +256,7 @@ class NaspickEngine:
         except ImportError:
             stock_names_en = {}
             
-        exchange_map = self.fetcher.get_exchange_data()
+        exchange_map = self.universe.exchanges()
         
         # [Strategy Change] Merge with existing data instead of overwrite
         # If we fail to fetch some stocks, we keep their old data (stale)
@@ -131,35 +269,33 @@ class NaspickEngine:
         # Create a map for upsert {ticker: item}
         final_map = {item['ticker']: item for item in existing_data}
         
-        # New results list for this run (for partial tracking)
-        ticker_dfs = {x: y for x, y in df_all_price.groupby('Ticker')}
+        # Batch technicals for every ticker (pivots, volume, candles); RSI / MACD
+        # come from the indicator state, full history only for tickers without it
+        with metrics.stage('context.analyze_panel', 'TechnicalAnalyzer') as rec:
+            tech_df = self.analyzer.analyze_panel(df_all_price, indicators=indicators)
+            rec['rows'] = len(tech_df)
+        
+        # Last-N-day RSI / MACD panel for the social generator (no yfinance calls there)
+        with metrics.stage('context.indicator_panel', 'IndicatorPanel') as rec:
+            panel = save_indicator_panel(df_all_price, self.paths['INDICATOR_PANEL'])
+            rec['rows'] = len(panel['tickers'])
         
         for idx, row in ranked_df.iterrows():
             ticker = row['Ticker']
-            hist = ticker_dfs.get(ticker)
-            if hist is None: continue
+            if ticker not in tech_df.index: continue
+            tech = tech_df.loc[ticker]
             
-            # Generate Basic Context using Analyzer
-            ctx = self.analyzer.generate_detailed_context(hist, self.analyzer.calculate_rsi(hist))
+            # Basic Context (RSI status, Candle pattern, Volume)
+            ctx = self.analyzer.context_from_row(tech)
             
-            # Expanded Analysis (from original Main logic)
-            # Pivot
-            levels = self.analyzer.calculate_pivot_points(hist['High'].iloc[-2], hist['Low'].iloc[-2], hist['Close'].iloc[-2])
+            # Pivot (previous completed candle)
+            levels = self.analyzer.levels_from_row(tech)
             
             # Context Variables
-            current_price = hist['Close'].iloc[-1]
-            prev_close = hist['Close'].iloc[-2]
-            
-            # BB, MACD logic (Inline for now to maintain identical logic to Phase 2)
-            # RSI
-            rsi = self.analyzer.calculate_rsi(hist)
-            
-            # MACD
-            exp12 = hist['Close'].ewm(span=12, adjust=False).mean()
-            exp26 = hist['Close'].ewm(span=26, adjust=False).mean()
-            macd = exp12 - exp26
-            signal = macd.ewm(span=9, adjust=False).mean()
-            macd_golden = (macd.iloc[-2] < signal.iloc[-2]) and (macd.iloc[-1] > signal.iloc[-1])
+            current_price = tech['current_price']
+            prev_close = tech['prev_close']
+            rsi = tech['rsi']
+            macd_golden = bool(tech['macd_golden'])
             
             # Signals List
             signals = []
@@ -211,7 +347,7 @@ class NaspickEngine:
             item = {
                 "ticker": ticker,
                 "name": stock_names.get(ticker, ticker),
-                "name_en": stock_names_en.get(ticker, ticker),
+                "name_en": stock_names_en.get(ticker) or self.universe.name(ticker) or ticker,
                 "exchange": exchange_map.get(ticker, "NASDAQ"),
                 "sector": sector_kr,
                 "current_price": round(current_price, 2),
@@ -298,25 +434,29 @@ class NaspickEngine:
                     similar_peers.append({"ticker": p['ticker'], "change_pct": p['change_pct']})
             
             item['similar_score_peers'] = similar_peers[:3]  # 최대 3개
-        
-        # 8. Save
+
+        return final_results, yesterday_ranks
+
+    def save_results(self, final_results):
+        """Write data.json + slim index.json + per-ticker detail shards"""
         out_path = self.paths['OUTPUT_JSON']
-        with open(out_path, 'w', encoding='utf-8') as f:
-            json.dump(final_results, f, indent=2, ensure_ascii=False)
+        changed = save_data_files(final_results, out_path)
             
         print(f"\n✅ Success! Saved {len(final_results)} stocks to {out_path}")
-        
+        print(f"   📦 index.json + {len(changed)} changed shards in {self.paths['STOCK_SHARD_DIR']}")
+
+        # Tickers whose data changed (consumed by build_static.py --changed-only)
+        changed_path = self.paths['CHANGED_TICKERS']
+        os.makedirs(os.path.dirname(changed_path), exist_ok=True)
+        with open(changed_path, 'w', encoding='utf-8') as f:
+            json.dump({"updated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'), "tickers": changed}, f)
+
+        # .gz / .br siblings (only for artifacts whose content changed)
+        shard_dir = self.paths['STOCK_SHARD_DIR']
+        artifacts = [out_path, self.paths['INDEX_JSON']] + \
+            [os.path.join(shard_dir, f"{item['ticker']}.json") for item in final_results]
+        Precompressor().run(artifacts)
 
-        # Save History
-        self.save_history(ranked_df, latest_date)
-        
-        # Sitemap
-        print("Running Sitemap generator...")
-        generate_sitemap()
-        
-        # 9. Aggregate Signals (For Bot)
-        self.aggregate_signals(final_results, yesterday_ranks)
-        
     def aggregate_signals(self, final_results, yesterday_ranks):
         """
         Aggregate useful signals (Technical, Ranking, Calendar) for notification bots
@@ -487,6 +627,16 @@ class NaspickEngine:
         except Exception as e:
             print(f"❌ Error saving history: {e}")
 
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Naspick core engine")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip stages whose inputs are unchanged since the last checkpoint")
+    parser.add_argument('--from-stage', choices=NaspickEngine.STAGES, default=None,
+                        help="Reuse checkpoints before this stage, re-run it and all later stages")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
     eng = NaspickEngine()
-    eng.run()
+    eng.run(resume=args.resume, from_stage=args.from_stage)
@@ -1,9 +1,17 @@
-import FinanceDataReader as fdr
 import pandas as pd
 import numpy as np
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from scripts.config import FETCH_MAP, REQUIRED_TICKERS, FALLBACK_TICKERS, SECTOR_OVERRIDES, EXCHANGE_OVERRIDES
+from scripts.config import (
+    FETCH_MAP,
+    PRICE_FETCH_WORKERS, PRICE_FETCH_RETRIES, PRICE_FETCH_RETRY_DELAY, PRICE_MIN_ROWS,
+    SPLIT_DETECT_TOLERANCE, NEW_TICKER_BACKFILL_DAYS, NEW_TICKER_MIN_ROWS
+)
+from scripts.core.metrics import metrics
+from scripts.core.http_cache import fdr_price
+from scripts.core.calendar_fetcher import CalendarFetcher
+from scripts.core.universe import universe as default_universe
 
 class StockDataFetcher:
     """
@@ -11,307 +19,217 @@ class StockDataFetcher:
     - S&P 500 Ticker List
     - Sector & Exchange Info
     - Price History (OHLCV)
-    - Market Caps
     """
     
-    def __init__(self):
+    def __init__(self, price_reader=None, universe=None):
         self.fetch_map = FETCH_MAP
+        # Price provider: callable(symbol, start, end) -> OHLCV DataFrame indexed by Date.
+        # Defaults to FDR (shared 'fdr' rate limit); tests can inject a local stub.
+        self.price_reader = price_reader or fdr_price
+        self.min_rows = PRICE_MIN_ROWS
+        self.universe = universe or default_universe
+        # Tickers whose stored history changed (split / corporate action) in this run
+        self.split_tickers = set()
     
     def get_sp500_tickers(self):
-        """Fetch latest S&P 500 list from FinanceDataReader"""
-        try:
-            sp500 = fdr.StockListing('SP500')
-            tickers = sp500['Symbol'].tolist()
-        except:
-            # Fallback
-            tickers = FALLBACK_TICKERS[:]
-            
-        # Ensure dual class shares logic
-        # FDR may return tickers as BRKB or BRK-B, we normalize to BRK.B format
-        for t in REQUIRED_TICKERS:
-            t_hyphen = t.replace('.', '-')  # BRK.B -> BRK-B
-            t_concat = t.replace('.', '')   # BRK.B -> BRKB
-            
-            # Remove any variant formats
-            if t_hyphen in tickers:
-                tickers.remove(t_hyphen)
-            if t_concat in tickers:
-                tickers.remove(t_concat)
-            
-            # Add the canonical dot format
-            if t not in tickers:
-                tickers.append(t)
-                
-        return sorted(list(set(tickers)))
+        """S&P 500 tickers (cached listing, see UniverseService)"""
+        return self.universe.tickers()
 
     def get_sector_data(self):
-        """Fetch sector data mapping"""
-        try:
-            sp500 = fdr.StockListing('SP500')
-            sectors = dict(zip(sp500['Symbol'], sp500['Sector']))
-            # Manual overrides
-            for t, sec in SECTOR_OVERRIDES.items():
-                sectors[t] = sec
-            return sectors
-        except:
-            return {}
+        """Sector data mapping (cached listing, manual overrides applied)"""
+        return self.universe.sectors()
 
     def get_exchange_data(self):
-        """Fetch exchange listings (NASDAQ, NYSE, AMEX)"""
-        exchanges = {}
-        try:
-            # Try catch blocks for each to survive individual failures
-            try:
-                nasdaq = fdr.StockListing('NASDAQ')
-                for t in nasdaq['Symbol']: exchanges[t] = 'NASDAQ'
-            except: pass
-            
-            try:
-                nyse = fdr.StockListing('NYSE')
-                for t in nyse['Symbol']: exchanges[t] = 'NYSE'
-            except: pass
-            
-            try:
-                amex = fdr.StockListing('AMEX')
-                for t in amex['Symbol']: exchanges[t] = 'AMEX'
-            except: pass
-            
-            # Manual overrides
-            for t, exc in EXCHANGE_OVERRIDES.items():
-                exchanges[t] = exc
-            
-            return exchanges
-        except:
-            return {}
-
-    def fetch_price_history_bulk(self, tickers, days=400):
-        """Fetch OHLCV data for multiple tickers"""
+        """Exchange labels (NASDAQ, NYSE, AMEX) for S&P 500 members (cached listings)"""
+        return self.universe.exchanges()
+
+    def _read_price(self, ticker, start_date, end_date):
+        """
+        Download OHLCV for one ticker and normalize to the long format
+        (Date, Ticker, Open, High, Low, Close, Volume).
+        Raises on provider errors (handled by the caller's retry queue).
+        """
+        fetch_ticker = self.fetch_map.get(ticker, ticker)
+        hist = self.price_reader(fetch_ticker, start_date, end_date)
+
+        if hist is None or hist.empty:
+            return pd.DataFrame()
+
+        hist = hist.copy()
+        hist['Ticker'] = ticker
+        hist = hist[['Ticker', 'Open', 'High', 'Low', 'Close', 'Volume']]
+        hist.index.name = 'Date'
+        return hist.reset_index()
+
+    def _update_store(self, ticker, start_date, end_date, store):
+        """
+        Bring the stored history for ticker up to end_date and return the
+        [start_date, end_date] window.
+        - Unknown ticker / window older than stored history -> full download
+        - Otherwise only bars from the last completed stored bar onwards
+        - If that overlap bar no longer matches (split / corporate action),
+          the whole stored range is re-downloaded
+        """
+        stored = store.load(ticker)
+        known_start = store.history_start(ticker)
+
+        if stored.empty or known_start is None or known_start > pd.Timestamp(start_date):
+            fresh = self._read_price(ticker, start_date, end_date)
+            if fresh.empty:
+                return None
+            store.write(ticker, fresh, history_start=start_date)
+            return store.window(ticker, start_date, end_date)
+
+        # Anchor on the previous bar: the last one may be an intraday partial
+        anchor_idx = -2 if len(stored) >= 2 else -1
+        anchor_date = stored['Date'].iloc[anchor_idx]
+        anchor_close = stored['Close'].iloc[anchor_idx]
+
+        fresh = self._read_price(ticker, anchor_date, end_date)
+        if fresh.empty:
+            return store.window(ticker, start_date, end_date)
+
+        overlap = fresh.loc[fresh['Date'] == anchor_date, 'Close']
+        if not overlap.empty and anchor_close > 0 and \
+                abs(overlap.iloc[0] / anchor_close - 1) > SPLIT_DETECT_TOLERANCE:
+            print(f"   ✂️ {ticker}: history changed at {anchor_date.date()} (split?), re-downloading...")
+            self.split_tickers.add(ticker)
+            full = self._read_price(ticker, known_start, end_date)
+            if full.empty:
+                return None
+            store.write(ticker, full)
+        else:
+            store.append(ticker, fresh)
+
+        return store.window(ticker, start_date, end_date)
+
+    def _fetch_single_price(self, ticker, start_date, end_date, store=None, min_rows=None):
+        """
+        Fetch OHLCV for one ticker (through the local store when given).
+        Returns the normalized frame, or None if the result is too short.
+        """
+        if store is None:
+            hist = self._read_price(ticker, start_date, end_date)
+        else:
+            hist = self._update_store(ticker, start_date, end_date, store)
+
+        min_rows = self.min_rows if min_rows is None else min_rows
+        if hist is not None and len(hist) < min_rows and store is not None and \
+                self._listed_within(ticker, start_date, store):
+            # Young listing: its whole history is shorter than the window
+            min_rows = min(min_rows, NEW_TICKER_MIN_ROWS)
+        if hist is None or hist.empty or len(hist) < min_rows:
+            return None
+        return hist
+
+    @staticmethod
+    def _listed_within(ticker, start_date, store, slack_days=7):
+        """True if history was requested before start_date but the first stored bar is well after it"""
+        known_start = store.history_start(ticker)
+        first = store.first_date(ticker)
+        return known_start is not None and first is not None and known_start <= pd.Timestamp(start_date) \
+            and first > pd.Timestamp(start_date) + timedelta(days=slack_days)
+
+    def new_tickers(self, tickers, store):
+        """
+        Tickers with no stored history yet (new index members), plus members
+        re-added since the last universe refresh. An empty store is a first
+        build (regular full fetch), not a list of new members.
+        """
+        if not store.meta:
+            return []
+        added = set((self.universe.last_diff or {}).get('added', []))
+        return [t for t in tickers if t in added or store.history_start(t) is None]
+
+    def backfill_new_tickers(self, tickers, store):
+        """
+        One targeted deep-history download (NEW_TICKER_BACKFILL_DAYS) into the
+        store for new members, so the daily window fetch is incremental for
+        them from day one. Returns the tickers that got history.
+        """
+        if not tickers:
+            return []
+        print(f"🆕 Backfilling {len(tickers)} new tickers ({NEW_TICKER_BACKFILL_DAYS} days): {tickers[:10]}")
+        df = self.fetch_price_history_bulk(tickers, days=NEW_TICKER_BACKFILL_DAYS, store=store, min_rows=1)
+        done = [] if df.empty else df['Ticker'].unique().tolist()
+        missing = [t for t in tickers if t not in done]
+        if missing:
+            print(f"   ⚠️ No history for {missing} (retried on the next run)")
+        return done
+
+    def fetch_price_history_bulk(self, tickers, days=400, max_workers=None, store=None, min_rows=None, start_date=None):
+        """
+        Fetch OHLCV data for multiple tickers.
+
+        Tickers are downloaded by a bounded thread pool (`max_workers`, default
+        PRICE_FETCH_WORKERS). Failed / short responses go into a shared retry
+        queue that is re-submitted after PRICE_FETCH_RETRY_DELAY, up to
+        PRICE_FETCH_RETRIES attempts per ticker. The result keeps the input
+        ticker order, so the concatenated frame is identical to a sequential run.
+
+        With `store` (PriceStore), only bars after each ticker's last stored
+        bar are downloaded and the window is rebuilt from disk.
+        `start_date` overrides `days` (used by backtests for a fixed start).
+        """
         end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        
-        all_hist_list = []
-        print(f"📊 Fetching Price Data for {len(tickers)} tickers...")
-        
-        for idx, ticker in enumerate(tickers, 1):
-            if idx % 50 == 0: print(f"   [{idx}/{len(tickers)}] Fetched...")
-                
-            for attempt in range(3):
-                try:
-                    fetch_ticker = self.fetch_map.get(ticker, ticker)
-                    hist = fdr.DataReader(fetch_ticker, start_date, end_date)
-                    
-                    if hist.empty or len(hist) < 260: # Need ~1 year
-                        if attempt < 2: 
-                            time.sleep(1)
-                            continue
-                        else:
-                            break # Fail after 3 attempts
-                        
-                    hist['Ticker'] = ticker
-                    hist = hist[['Ticker', 'Open', 'High', 'Low', 'Close', 'Volume']]
-                    hist.index.name = 'Date'
-                    hist = hist.reset_index()
-                    
-                    all_hist_list.append(hist)
-                    break # Success
-                    
-                except Exception as e:
-                    if attempt < 2:
-                        time.sleep(1)
-                    else:
-                        print(f"   ❌ Failed to fetch {ticker}: {e}")
-                
+        if start_date is None:
+            start_date = end_date - timedelta(days=days)
+        start_date = pd.Timestamp(start_date).normalize()
+        workers = max(1, max_workers or PRICE_FETCH_WORKERS)
+
+        print(f"📊 Fetching Price Data for {len(tickers)} tickers ({workers} workers)...")
+
+        results = {}
+        errors = {}
+        pending = list(tickers)
+        done_count = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for attempt in range(PRICE_FETCH_RETRIES):
+                if not pending:
+                    break
+                if attempt > 0:
+                    print(f"   🔁 Retry round {attempt} for {len(pending)} tickers...")
+                    metrics.count_retry(len(pending))
+                    time.sleep(PRICE_FETCH_RETRY_DELAY)
+
+                futures = {
+                    pool.submit(self._fetch_single_price, t, start_date, end_date, store, min_rows): t
+                    for t in pending
+                }
+                retry_queue = []
+                for future in as_completed(futures):
+                    ticker = futures[future]
+                    try:
+                        hist = future.result()
+                    except Exception as e:
+                        errors[ticker] = e
+                        hist = None
+
+                    if hist is None:
+                        retry_queue.append(ticker)
+                        continue
+
+                    results[ticker] = hist
+                    errors.pop(ticker, None)
+                    done_count += 1
+                    if done_count % 50 == 0: print(f"   [{done_count}/{len(tickers)}] Fetched...")
+
+                pending = retry_queue
+
+        if store is not None:
+            store.save_meta()
+
+        for ticker in pending:
+            if ticker in errors:
+                print(f"   ❌ Failed to fetch {ticker}: {errors[ticker]}")
+
+        all_hist_list = [results[t] for t in tickers if t in results]
         if not all_hist_list:
             return pd.DataFrame()
-            
-        return pd.concat(all_hist_list)
 
-    def get_market_caps_bulk(self, tickers):
-        """Fetch market cap for tickers using yfinance (Batch)"""
-        print(f"💰 Fetching Market Caps for {len(tickers)} tickers via yfinance...")
-        import yfinance as yf
-        mcaps = {}
-        
-        chunk_size = 100
-        for i in range(0, len(tickers), chunk_size):
-            chunk = tickers[i:i+chunk_size]
-            # Sanitize for yfinance
-            yf_chunk = [t.replace('.', '-') for t in chunk]
-            print(f"   Fetching market cap chunk {i//chunk_size + 1} ({len(yf_chunk)} stocks)...")
-            
-            try:
-                batch = yf.Tickers(" ".join(yf_chunk))
-                # Iterate through response
-                for t_sym, ticker_obj in batch.tickers.items():
-                    try:
-                        # Map back to original ticker (hyphenated from yf)
-                        # We need to match precise original ticker key
-                        # The key in batch.tickers is usually the sanitized one (e.g. BRK-B)
-                        
-                        original_ticker = t_sym
-                        # Reverse lookup if needed (simple Replace)
-                        if '-' in t_sym and t_sym.replace('-', '.') in tickers:
-                             original_ticker = t_sym.replace('-', '.')
-
-                        info = ticker_obj.info
-                        if info and 'marketCap' in info and info['marketCap']:
-                             mcaps[original_ticker] = int(info['marketCap'])
-                        else:
-                             # Fallback fast exit
-                             mcaps[original_ticker] = 0
-                             
-                    except Exception:
-                        pass
-            except Exception as e:
-                print(f"❌ Error fetching market cap chunk: {e}")
-                
-        return mcaps
+        return pd.concat(all_hist_list)
 
     def fetch_calendar_data_bulk(self, tickers):
-        """Fetch Calendar (Earnings, Divs) for tickers using yfinance"""
-        import yfinance as yf
-        print(f"📅 Fetching Calendar Data for {len(tickers)} tickers...")
-        
-        chunk_size = 50
-        calendar_data = {} # {ticker: {next_earnings, next_dividend_date, div_rate, div_yield}}
-        
-        # We need to act carefully as calling .calendar on Ticker object might trigger requests.
-        # yf.Tickers might optimizes some access.
-        
-        for i in range(0, len(tickers), chunk_size):
-            chunk = tickers[i:i+chunk_size]
-            # [Fix] Sanitize tickers for yfinance (BRK.B -> BRK-B)
-            yf_chunk = [t.replace('.', '-') for t in chunk]
-            
-            print(f"   Fetching extra info chunk {i//chunk_size + 1} ({len(yf_chunk)} stocks)...")
-            
-            try:
-                tickers_obj = yf.Tickers(" ".join(yf_chunk))
-                
-                # yf.Tickers.tickers is a dict of Ticker objects
-                for t_sym, ticker_obj in tickers_obj.tickers.items():
-                    try:
-                        data = {}
-                        
-                        # 1. Earnings (Improved with earnings_dates)
-                        try:
-                            # Try to get strictly future earnings from earnings_dates (DataFrame)
-                            # This is more reliable than ticker.calendar which sometimes shows past dates
-                            e_dates = ticker_obj.earnings_dates
-                            found_future_earnings = False
-                            
-                            if e_dates is not None and not e_dates.empty:
-                                try:
-                                    # Normalize timezone to match earnings_dates index
-                                    now = pd.Timestamp.now().tz_localize(e_dates.index.dtype.tz)
-                                    # specific future earnings
-                                    future_earnings = e_dates[e_dates.index >= now].sort_index()
-                                    
-                                    if not future_earnings.empty:
-                                        # The first one is the nearest future earnings
-                                        next_date = future_earnings.index[0]
-                                        data['next_earnings'] = next_date.strftime('%Y-%m-%d')
-                                        found_future_earnings = True
-                                    
-                                    # Also capture past earnings for 'Recent Results'
-                                    past_earnings = e_dates[e_dates.index < now].sort_index(ascending=False)
-                                    if not past_earnings.empty:
-                                        last = past_earnings.iloc[0]
-                                        if pd.notna(last['Reported EPS']):
-                                            data['last_earnings_date'] = past_earnings.index[0].strftime('%Y-%m-%d')
-                                            data['last_eps_est'] = float(last['EPS Estimate']) if pd.notna(last['EPS Estimate']) else None
-                                            data['last_eps_act'] = float(last['Reported EPS'])
-                                            data['last_surprise'] = float(last['Surprise(%)']) if pd.notna(last['Surprise(%)']) else None
-                                except Exception as e:
-                                    pass
-
-                            # Fallback to .calendar if no future earnings found in dataframe
-                            if not found_future_earnings:
-                                cal = ticker_obj.calendar
-                                if cal and 'Earnings Date' in cal:
-                                    dates = cal['Earnings Date']
-                                    if dates:
-                                        data['next_earnings'] = dates[0].strftime('%Y-%m-%d')
-                                        
-                        except Exception:
-                            pass
-                        
-                        # 2. Dividend Dates (Calendar + History fallback)
-                        try:
-                            cal = ticker_obj.calendar
-                            # Ex-Dividend Date
-                            if cal and 'Ex-Dividend Date' in cal:
-                                d_date = cal['Ex-Dividend Date']
-                                if hasattr(d_date, 'strftime'):
-                                    data['ex_dividend_date'] = d_date.strftime('%Y-%m-%d')
-                            
-                            # Payment Date
-                            if cal and 'Dividend Date' in cal:
-                                p_date = cal['Dividend Date']
-                                if hasattr(p_date, 'strftime'):
-                                    data['dividend_payment_date'] = p_date.strftime('%Y-%m-%d')
-                                    
-                            # If no ex-dividend date from calendar (often empty if not declared),
-                            # get the LAST ex-dividend date from history to show "Recent Div"
-                            if 'ex_dividend_date' not in data:
-                                divs = ticker_obj.dividends
-                                if not divs.empty:
-                                    # Last one
-                                    last_div_date = divs.index[-1]
-                                    data['ex_dividend_date'] = last_div_date.strftime('%Y-%m-%d')
-                                    # Mark this as 'past' implicitly by date check in frontend, 
-                                    # or we could add a flag, but date comparison is enough.
-                                    
-                        except Exception:
-                            pass
-                        
-                        # 3. Dividend Amount (Per Share) & Annualized TTM
-                        try:
-                            divs = ticker_obj.dividends
-                            if not divs.empty:
-                                last_div = divs.iloc[-1]
-                                data['dividend_amount'] = float(last_div)
-                                
-                                # [New] Calculate TTM Dividends (Last 365 days sum)
-                                # This handles Monthly, Quarterly, Semi-Annual, Annual automatically
-                                ttm_start = pd.Timestamp.now().tz_localize(divs.index.dtype.tz) - pd.Timedelta(days=365)
-                                ttm_divs = divs[divs.index >= ttm_start]
-                                if not ttm_divs.empty:
-                                    data['dividend_ttm'] = float(ttm_divs.sum())
-                                else:
-                                    # Fallback if no divs in last year but has history (rare)
-                                    # Just use frequency * last_div? Unsafe.
-                                    # Just use last_div * 4 as very rough estimate if logic fails
-                                    pass
-
-                        except: pass
-                        
-                        # 4. Dividend Yield (Priority: info > TTM calculation)
-                        try:
-                            info = ticker_obj.info
-                            if info and 'dividendYield' in info and info['dividendYield']:
-                                raw_yield = info['dividendYield']
-                                # [Fix] If yield > 0.5 (50%), it's likely already a percentage.
-                                # Normally yields are 0.05 (5%), but sometimes 5.0 (5%).
-                                if raw_yield > 0.5:
-                                    data['dividend_yield'] = round(raw_yield, 2)
-                                else:
-                                    data['dividend_yield'] = round(raw_yield * 100, 2)
-                            
-                            # Fallback: Calculate from TTM
-                            elif 'dividend_ttm' in data and 'previousClose' in info:
-                                price = info['previousClose']
-                                if price and price > 0:
-                                     yield_val = (data['dividend_ttm'] / price) * 100
-                                     data['dividend_yield'] = round(yield_val, 2)
-                                     # data['is_ttm_yield'] = True
-                        except: pass
-                        
-                        if data:
-                            calendar_data[t_sym] = data
-                            
-                    except Exception as e:
-                        pass
-            except: pass
-            
-        return calendar_data
+        """Fetch Calendar (Earnings, Divs) for tickers using yfinance (full re-fetch)"""
+        return CalendarFetcher().fetch(tickers)
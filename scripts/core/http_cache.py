@@ -0,0 +1,219 @@
+import os
+import time
+import pickle
+import sqlite3
+import threading
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from scripts.config import (
+    PATHS, UPSTREAM_RATES, HTTP_CACHE_TTLS, HTTP_CACHE_ENABLED, HTTP_CACHE_MAX_AGE_DAYS
+)
+from scripts.core.metrics import metrics
+from scripts.core.ratelimit import SharedTokenBucket
+
+class ResponseCache:
+    """
+    SQLite response cache shared by all fetch scripts (data/cache/http_cache.sqlite).
+    One row per request key: pickled value, ETag / Last-Modified validators,
+    fetch and expiry time. Expired rows are kept (for conditional revalidation)
+    until HTTP_CACHE_MAX_AGE_DAYS. WAL mode lets several processes read while
+    one writes; each thread uses its own connection.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or PATHS['HTTP_CACHE']
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY, endpoint TEXT, value BLOB,
+            etag TEXT, last_modified TEXT, fetched_at REAL, expires_at REAL)""")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value, etag, last_modified, fetched_at, expires_at FROM responses WHERE key = ?",
+            (key,)).fetchone()
+        if row is None:
+            return None
+        return {"value": pickle.loads(row[0]), "etag": row[1], "last_modified": row[2],
+                "fetched_at": row[3], "expires_at": row[4]}
+
+    def put(self, key, endpoint, value, ttl, etag=None, last_modified=None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (key, endpoint, pickle.dumps(value), etag, last_modified, now, now + ttl))
+        conn.commit()
+
+    def touch(self, key, ttl):
+        """Extend a revalidated (304) row"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("UPDATE responses SET fetched_at = ?, expires_at = ? WHERE key = ?", (now, now + ttl, key))
+        conn.commit()
+
+    def purge(self):
+        """Delete rows older than HTTP_CACHE_MAX_AGE_DAYS. Returns the number removed."""
+        conn = self._conn()
+        cur = conn.execute("DELETE FROM responses WHERE fetched_at < ?",
+                           (time.time() - HTTP_CACHE_MAX_AGE_DAYS * 86400,))
+        conn.commit()
+        return cur.rowcount
+
+_cache = None
+_buckets = {}
+_session = None
+_init_lock = threading.Lock()
+
+def response_cache():
+    global _cache
+    with _init_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+            _cache.purge()
+        return _cache
+
+def upstream_bucket(upstream):
+    """Cross-process token bucket for an upstream ('yahoo', 'fdr', 'naver')"""
+    with _init_lock:
+        if upstream not in _buckets:
+            rate, burst = UPSTREAM_RATES[upstream]
+            _buckets[upstream] = SharedTokenBucket(upstream, rate, burst, PATHS['RATE_LIMIT_DIR'])
+        return _buckets[upstream]
+
+def ttl_for(endpoint):
+    return HTTP_CACHE_TTLS.get(endpoint, 0) if HTTP_CACHE_ENABLED else 0
+
+def _send(endpoint):
+    """Wait for the endpoint's upstream bucket and count the request"""
+    upstream_bucket(endpoint.split('.')[0]).acquire()
+    metrics.count_http()
+
+def cached_call(endpoint, key, fn, refresh=False):
+    """
+    Library call (yfinance / FDR hide their HTTP responses) through the shared
+    limiter and cache: a fresh cached value is returned without a request,
+    otherwise fn() is called and its result stored for the endpoint's TTL.
+    refresh=True always calls fn() and overwrites the cached value.
+    """
+    ttl = ttl_for(endpoint)
+    cache_key = f"{endpoint}:{key}"
+    if ttl and not refresh:
+        hit = response_cache().get(cache_key)
+        if hit and hit['expires_at'] > time.time():
+            metrics.count_cache_hit()
+            return hit['value']
+    _send(endpoint)
+    value = fn()
+    if ttl and value is not None:
+        response_cache().put(cache_key, endpoint, value, ttl)
+    return value
+
+def _cached_response(url, entry):
+    resp = requests.Response()
+    resp.status_code, headers, resp._content = entry['value']
+    resp.headers = CaseInsensitiveDict(headers)
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    resp.url = url
+    resp.from_cache = True
+    return resp
+
+def http_get(endpoint, url, **kwargs):
+    """
+    requests.get through the shared limiter and cache. Within the TTL the
+    stored response is returned; after it, the request is sent with
+    If-None-Match / If-Modified-Since and a 304 reuses the stored body.
+    Only 200 responses are cached.
+    """
+    global _session
+    ttl = ttl_for(endpoint)
+    cache_key = f"{endpoint}:{url}:{sorted((kwargs.get('params') or {}).items())}"
+    hit = response_cache().get(cache_key) if ttl else None
+    if hit and hit['expires_at'] > time.time():
+        metrics.count_cache_hit()
+        return _cached_response(url, hit)
+
+    headers = dict(kwargs.pop('headers', None) or {})
+    if hit and hit['etag']:
+        headers['If-None-Match'] = hit['etag']
+    if hit and hit['last_modified']:
+        headers['If-Modified-Since'] = hit['last_modified']
+
+    with _init_lock:
+        if _session is None:
+            _session = requests.Session()
+    _send(endpoint)
+    resp = _session.get(url, headers=headers, **kwargs)
+
+    if resp.status_code == 304 and hit:
+        response_cache().touch(cache_key, ttl)
+        metrics.count_cache_hit()
+        return _cached_response(url, hit)
+    if ttl and resp.status_code == 200:
+        response_cache().put(cache_key, endpoint, (resp.status_code, dict(resp.headers), resp.content), ttl,
+                             etag=resp.headers.get('ETag'), last_modified=resp.headers.get('Last-Modified'))
+    return resp
+
+# ----------------------------------------------------------------------
+# Upstream adapters (default providers of the fetch modules)
+# ----------------------------------------------------------------------
+def yahoo_info(symbol, refresh=False):
+    """yfinance .info (shared by consensus, financials and shares outstanding)"""
+    import yfinance as yf
+    return cached_call('yahoo.info', symbol, lambda: yf.Ticker(symbol).info, refresh=refresh)
+
+class YahooTicker:
+    """yf.Ticker stand-in whose calendar endpoints go through cached_call"""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self._ticker = None
+
+    def _get(self, name):
+        def fetch():
+            import yfinance as yf
+            if self._ticker is None:
+                self._ticker = yf.Ticker(self.symbol)
+            return getattr(self._ticker, name)
+        return cached_call(f'yahoo.{name}', self.symbol, fetch)
+
+    @property
+    def calendar(self):
+        return self._get('calendar')
+
+    @property
+    def dividends(self):
+        return self._get('dividends')
+
+    @property
+    def earnings_dates(self):
+        return self._get('earnings_dates')
+
+    @property
+    def info(self):
+        return yahoo_info(self.symbol)
+
+def yahoo_download(key, *args, **kwargs):
+    """yf.download (portfolio quotes)"""
+    import yfinance as yf
+    return cached_call('yahoo.download', key, lambda: yf.download(*args, **kwargs))
+
+def fdr_price(symbol, start, end):
+    """FDR OHLCV (price reader of StockDataFetcher)"""
+    import FinanceDataReader as fdr
+    return cached_call('fdr.price', f"{symbol}:{start}:{end}", lambda: fdr.DataReader(symbol, start, end))
+
+def fdr_listing(market):
+    """FDR exchange / index listing (listing reader of UniverseService)"""
+    import FinanceDataReader as fdr
+    return cached_call('fdr.listing', market, lambda: fdr.StockListing(market))
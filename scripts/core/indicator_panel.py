@@ -0,0 +1,58 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from scripts.config import PATHS, INDICATOR_PANEL_DAYS
+from scripts.core.panel import BarPanel
+from scripts.core.analyzer import TechnicalAnalyzer
+
+# Field -> decimals kept in the JSON
+PANEL_FIELDS = {"close": 4, "rsi": 2, "macd": 4, "signal": 4}
+
+def build_indicator_panel(price_df, days=INDICATOR_PANEL_DAYS):
+    """
+    Last `days` trading days of Close / RSI / MACD / MACD signal per ticker,
+    columnar and aligned on a shared date axis (null where a ticker has no bar):
+    {"updated_at", "dates": [...], "tickers": {ticker: {field: [...]}}}
+    Same formulas as TechnicalAnalyzer.analyze_panel (computed on full history).
+    """
+    bp = BarPanel(price_df[['Date', 'Ticker', 'Close']])
+    rsi, macd, signal = TechnicalAnalyzer.indicator_panels(bp)
+    columns = {"close": bp.head('Close'), "rsi": rsi, "macd": macd, "signal": signal}
+
+    dates = sorted(pd.to_datetime(price_df['Date'].unique()))[-days:]
+    date_pos = {d: i for i, d in enumerate(dates)}
+    t_date = bp.tail_values('Date', days)
+
+    # (days x ticker) matrices on the shared date axis
+    out = {f: np.full((len(dates), len(bp.tickers)), np.nan) for f in columns}
+    for k in range(days):
+        rows = np.array([date_pos.get(pd.Timestamp(d), -1) if d is not None else -1 for d in t_date[k]])
+        ok = rows >= 0
+        cols = np.arange(len(bp.tickers))[ok]
+        for f, panel in columns.items():
+            out[f][rows[ok], cols] = bp.last(panel, k)[ok]
+
+    tickers = {}
+    for j, ticker in enumerate(bp.tickers):
+        tickers[ticker] = {
+            f: [None if np.isnan(v) else round(float(v), PANEL_FIELDS[f]) for v in out[f][:, j]]
+            for f in columns
+        }
+    return {
+        "updated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "dates": [d.strftime('%Y-%m-%d') for d in dates],
+        "tickers": tickers,
+    }
+
+def save_indicator_panel(price_df, path=None, days=INDICATOR_PANEL_DAYS):
+    path = path or PATHS['INDICATOR_PANEL']
+    panel = build_indicator_panel(price_df, days)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(panel, f, separators=(',', ':'))
+    os.replace(tmp, path)
+    print(f"💾 Saved {len(panel['dates'])}-day indicator panel for {len(panel['tickers'])} tickers to {path}")
+    return panel
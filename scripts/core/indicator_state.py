@@ -0,0 +1,215 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from scripts.config import PATHS, SPLIT_DETECT_TOLERANCE
+from scripts.core.panel import BarPanel
+
+class IndicatorState:
+    """
+    Carried-over per-ticker indicator state for O(1) daily updates.
+    - RSI(14): last close + ring buffers of the last 14 gains / losses
+    - MACD(12/26/9): last EMA12 / EMA26 / signal values
+    - 63D volume average: ring buffer of the last 63 volumes
+    - 60D volatility: ring buffer of the last 60 daily returns
+
+    The state is committed through each ticker's last *completed* bar (the bar
+    before the latest one), so intraday re-runs can re-evaluate today's partial
+    bar any number of times. A ticker is rebuilt from full history when its state
+    is missing, its committed bar is no longer in the panel, or the stored close
+    no longer matches (split / corporate action).
+    """
+
+    RSI_PERIOD = 14
+    EMA_FAST, EMA_SLOW, EMA_SIGNAL = 12, 26, 9
+    VOLUME_WINDOW = 63
+    VOLATILITY_WINDOW = 60
+    MAX_CATCHUP_BARS = 10  # more missing bars than this -> full rebuild
+
+    def __init__(self, path=None):
+        self.path = path or PATHS['INDICATOR_STATE']
+        self.states = self._load()
+        self.rebuilt = []
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"⚠️ Failed to load indicator state ({e}), rebuilding.")
+        return {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.states, f, separators=(',', ':'))
+        os.replace(tmp, self.path)
+        print(f"💾 Saved indicator state for {len(self.states)} tickers to {self.path}")
+
+    # ------------------------------------------------------------------
+    # O(1) state transitions
+    # ------------------------------------------------------------------
+    @classmethod
+    def advance(cls, st, date, close, volume):
+        """Return the state after appending one bar (st=None starts a new ticker)"""
+        date = pd.Timestamp(date).strftime('%Y-%m-%d')
+        close, volume = float(close), float(volume)
+        if st is None:
+            return {
+                "date": date, "close": close, "bars": 1,
+                "ema_fast": close, "ema_slow": close, "signal": 0.0,
+                # First delta counts as 0 (same as delta.where(...) in calculate_rsi)
+                "gains": [0.0], "losses": [0.0],
+                "volumes": [volume], "returns": [],
+            }
+
+        def ema(prev, value, span):
+            alpha = 2 / (span + 1)
+            return alpha * value + (1 - alpha) * prev
+
+        delta = close - st['close']
+        ema_fast = ema(st['ema_fast'], close, cls.EMA_FAST)
+        ema_slow = ema(st['ema_slow'], close, cls.EMA_SLOW)
+        ret = close / st['close'] - 1 if st['close'] else float('nan')
+        return {
+            "date": date, "close": close, "bars": st['bars'] + 1,
+            "ema_fast": ema_fast, "ema_slow": ema_slow,
+            "signal": ema(st['signal'], ema_fast - ema_slow, cls.EMA_SIGNAL),
+            "gains": (st['gains'] + [max(delta, 0.0)])[-cls.RSI_PERIOD:],
+            "losses": (st['losses'] + [max(-delta, 0.0)])[-cls.RSI_PERIOD:],
+            "volumes": (st['volumes'] + [volume])[-cls.VOLUME_WINDOW:],
+            "returns": (st['returns'] + [ret])[-cls.VOLATILITY_WINDOW:],
+        }
+
+    @classmethod
+    def indicators(cls, prev, cur):
+        """Indicator values at `cur` (prev = state one bar earlier, for cross detection)"""
+        # RSI (insufficient history / 0 loss & 0 gain -> 0, as in calculate_rsi)
+        rsi = 0.0
+        if len(cur['gains']) == cls.RSI_PERIOD:
+            gain = sum(cur['gains']) / cls.RSI_PERIOD
+            loss = sum(cur['losses']) / cls.RSI_PERIOD
+            if loss > 0:
+                rsi = 100 - (100 / (1 + gain / loss))
+            elif gain > 0:
+                rsi = 100.0
+
+        macd = cur['ema_fast'] - cur['ema_slow']
+        signal = cur['signal']
+        prev_macd = prev['ema_fast'] - prev['ema_slow'] if prev else np.nan
+        prev_signal = prev['signal'] if prev else np.nan
+
+        vol_avg = np.mean(cur['volumes']) if len(cur['volumes']) == cls.VOLUME_WINDOW else np.nan
+        volatility = np.nan
+        if len(cur['returns']) == cls.VOLATILITY_WINDOW:
+            volatility = np.std(cur['returns'], ddof=1) * np.sqrt(252)  # Annualized
+
+        return {
+            "rsi": rsi,
+            "macd": macd,
+            "macd_signal": signal,
+            "macd_golden": bool(prev_macd < prev_signal and macd > signal),
+            "macd_dead": bool(prev_macd > prev_signal and macd < signal),
+            "Vol_3M_Avg": vol_avg,
+            "Vol_Spike": cur['volumes'][-1] / vol_avg if vol_avg else np.nan,
+            "Volatility_60D": volatility,
+        }
+
+    # ------------------------------------------------------------------
+    # Full rebuild (vectorized over all tickers that need it)
+    # ------------------------------------------------------------------
+    def _rebuild(self, price_df):
+        """Committed state (through the second-to-last bar) from full history"""
+        bp = BarPanel(price_df)
+        close = pd.DataFrame(bp.head('Close'))
+        ema_fast = close.ewm(span=self.EMA_FAST, adjust=False).mean()
+        ema_slow = close.ewm(span=self.EMA_SLOW, adjust=False).mean()
+        signal = (ema_fast - ema_slow).ewm(span=self.EMA_SIGNAL, adjust=False).mean()
+        ema_fast, ema_slow, signal = (bp.last(x.to_numpy(), 1) for x in (ema_fast, ema_slow, signal))
+
+        window = self.VOLUME_WINDOW + 2
+        t_close = bp.tail('Close', window)
+        t_vol = bp.tail('Volume', window)
+        t_date = bp.tail_values('Date', window)
+
+        states = {}
+        for j, ticker in enumerate(bp.tickers):
+            committed = bp.lengths[j] - 1
+            if committed < 1:
+                continue
+            # Chronological committed bars (tail row 0 is the latest, uncommitted bar)
+            rows = slice(min(committed, window - 1), 0, -1)
+            closes = t_close[rows, j]
+            deltas = np.diff(closes)
+            if committed <= window - 1:
+                deltas = np.concatenate([[0.0], deltas])  # includes the ticker's first bar
+            states[ticker] = {
+                "date": pd.Timestamp(t_date[1, j]).strftime('%Y-%m-%d'),
+                "close": float(closes[-1]), "bars": int(committed),
+                "ema_fast": float(ema_fast[j]), "ema_slow": float(ema_slow[j]),
+                "signal": float(signal[j]),
+                "gains": [float(max(d, 0.0)) for d in deltas[-self.RSI_PERIOD:]],
+                "losses": [float(max(-d, 0.0)) for d in deltas[-self.RSI_PERIOD:]],
+                "volumes": [float(v) for v in t_vol[rows, j][-self.VOLUME_WINDOW:]],
+                "returns": [float(r) for r in (closes[1:] / closes[:-1] - 1)[-self.VOLATILITY_WINDOW:]],
+            }
+        return states
+
+    # ------------------------------------------------------------------
+    # Daily update
+    # ------------------------------------------------------------------
+    def update(self, price_df, force=()):
+        """
+        Advance every ticker's state to its latest completed bar and evaluate the
+        latest bar on top of it. Tickers in `force` (e.g. detected splits) are
+        rebuilt from full history.
+        Returns a ticker-indexed frame: rsi, macd, macd_signal, macd_golden,
+        macd_dead, Vol_3M_Avg, Vol_Spike, Volatility_60D.
+        """
+        bp = BarPanel(price_df[['Date', 'Ticker', 'Close', 'Volume']])
+        k_max = self.MAX_CATCHUP_BARS + 2
+        t_close = bp.tail('Close', k_max)
+        t_vol = bp.tail('Volume', k_max)
+        t_date = bp.tail_values('Date', k_max)
+
+        latest = {}     # ticker -> (committed state, latest bar)
+        rebuild = []
+        for j, ticker in enumerate(bp.tickers):
+            st = self.states.get(ticker)
+            bar = (t_date[0, j], t_close[0, j], t_vol[0, j])
+            if st is None or ticker in force:
+                rebuild.append(ticker)
+                continue
+
+            # Locate the committed bar among the latest bars
+            st_date = pd.Timestamp(st['date'])
+            k = next((k for k in range(1, k_max)
+                      if t_date[k, j] is not None and pd.Timestamp(t_date[k, j]) == st_date), None)
+            if k is None or not st['close'] or \
+                    abs(t_close[k, j] / st['close'] - 1) > SPLIT_DETECT_TOLERANCE:
+                rebuild.append(ticker)
+                continue
+
+            # Commit completed bars after the stored one (O(1) each)
+            for kk in range(k - 1, 0, -1):
+                st = self.advance(st, t_date[kk, j], t_close[kk, j], t_vol[kk, j])
+            latest[ticker] = (st, bar)
+
+        if rebuild:
+            print(f"🔁 Rebuilding indicator state from full history for {len(rebuild)} tickers...")
+            sub = price_df[price_df['Ticker'].isin(rebuild)]
+            rebuilt = self._rebuild(sub)
+            for ticker in rebuild:
+                j = bp.tickers.get_loc(ticker)
+                latest[ticker] = (rebuilt.get(ticker), (t_date[0, j], t_close[0, j], t_vol[0, j]))
+        self.rebuilt = rebuild
+
+        rows = {}
+        for ticker, (st, (date, close, volume)) in latest.items():
+            if st is not None:
+                self.states[ticker] = st
+            rows[ticker] = self.indicators(st, self.advance(st, date, close, volume))
+
+        return pd.DataFrame.from_dict(rows, orient='index').rename_axis('Ticker')
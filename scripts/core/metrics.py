@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import time
+import threading
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime
+from scripts.config import PATHS
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+def peak_rss_mb(who='self'):
+    """Peak resident set size in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if who == 'children' else resource.RUSAGE_SELF)
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(usage.ru_maxrss / scale, 1)
+
+def children_cpu_s():
+    """CPU time (user + sys) of finished child processes"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def append_metrics(records, path=None):
+    """Append metric records (dicts) to the run metrics JSONL log"""
+    path = path or PATHS['RUN_METRICS']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False, default=str) + '\n')
+
+class RunMetrics:
+    """
+    Per-stage instrumentation for engine runs.
+    - wall / CPU time, peak RSS, HTTP calls + retries + cache hits, rows processed
+    - records are appended to data/run_metrics.jsonl by flush()
+    - NASPICK_PROFILE=1 (or a comma list of stage names) dumps a cProfile
+      file per stage to data/cache/profiles/
+    HTTP counters are thread-safe (fetchers call count_http from worker threads).
+    """
+
+    def __init__(self, source='engine'):
+        self.source = source
+        self.run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.records = []
+        self.http_calls = 0
+        self.http_retries = 0
+        self.cache_hits = 0
+        self._lock = threading.Lock()
+        profile_env = os.environ.get('NASPICK_PROFILE', '').strip()
+        self.profile_stages = None if profile_env in ('', '0') else \
+            ('*' if profile_env in ('1', 'all') else set(profile_env.split(',')))
+
+    def count_http(self, n=1):
+        with self._lock:
+            self.http_calls += n
+
+    def count_retry(self, n=1):
+        with self._lock:
+            self.http_retries += n
+
+    def count_cache_hit(self, n=1):
+        with self._lock:
+            self.cache_hits += n
+
+    def _should_profile(self, name):
+        if self.profile_stages is None:
+            return False
+        return self.profile_stages == '*' or name in self.profile_stages
+
+    @contextmanager
+    def stage(self, name, component=None):
+        """
+        Measure a block. Yields the record dict so the caller can add
+        'rows' (or any other field) before it is closed.
+        """
+        rec = {
+            "run_id": self.run_id, "source": self.source, "stage": name,
+            "component": component, "started_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "rows": None, "status": "ok",
+        }
+        http0, retry0, hit0 = self.http_calls, self.http_retries, self.cache_hits
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        profiler = cProfile.Profile() if self._should_profile(name) else None
+        if profiler:
+            profiler.enable()
+        try:
+            yield rec
+        except BaseException as e:
+            rec['status'] = f"error: {type(e).__name__}"
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+                prof_dir = PATHS['PROFILE_DIR']
+                os.makedirs(prof_dir, exist_ok=True)
+                prof_path = os.path.join(prof_dir, f"{self.run_id}_{name}.prof")
+                profiler.dump_stats(prof_path)
+                rec['profile'] = prof_path
+            rec.update({
+                "wall_s": round(time.perf_counter() - wall0, 3),
+                "cpu_s": round(time.process_time() - cpu0, 3),
+                "peak_rss_mb": peak_rss_mb(),
+                "http_calls": self.http_calls - http0,
+                "http_retries": self.http_retries - retry0,
+                "http_cache_hits": self.cache_hits - hit0,
+            })
+            self.records.append(rec)
+            print(f"⏱️ [{name}] {rec['wall_s']:.1f}s wall, {rec['cpu_s']:.1f}s cpu, "
+                  f"{rec['http_calls']} http ({rec['http_retries']} retries, {rec['http_cache_hits']} cached)")
+
+    def flush(self, path=None):
+        """Append collected records to the metrics log"""
+        if not self.records:
+            return
+        try:
+            append_metrics(self.records, path)
+            print(f"📈 Saved {len(self.records)} stage metrics to {path or PATHS['RUN_METRICS']}")
+        except Exception as e:
+            print(f"⚠️ Failed to save run metrics: {e}")
+        self.records = []
+
+# Shared instance used by fetchers / engine within one process
+metrics = RunMetrics()
@@ -0,0 +1,138 @@
+import os
+import json
+import pandas as pd
+from datetime import datetime
+from scripts.config import BASE_DIR, PATHS, ONBOARDING_MAX_ATTEMPTS
+from scripts.core.universe import universe
+
+JOBS = ('financials', 'consensus', 'names')
+
+NAME_FILES = {
+    'SP500_ENGLISH_NAMES': os.path.join(BASE_DIR, 'scripts', 'data', 'sp500_english_names.py'),
+    'SP500_KOREAN_NAMES': os.path.join(BASE_DIR, 'scripts', 'data', 'sp500_korean_names.py'),
+}
+
+def _load_names(var_name):
+    names = {}
+    try:
+        with open(NAME_FILES[var_name], 'r', encoding='utf-8') as f:
+            exec(f.read(), {}, names)
+    except Exception:
+        pass
+    return names.get(var_name, {})
+
+def _save_names(var_name, data):
+    """Same layout as tools/sync_stock_names.py"""
+    lines = [f"# S&P 500 Complete {var_name.replace('SP500_', '').replace('_', ' ').title()}"]
+    lines.append(f"{var_name} = {{")
+    sorted_items = sorted(data.items())
+    for i, (k, v) in enumerate(sorted_items):
+        v_escaped = v.replace('"', '\\"').replace("'", "\\'")
+        comma = "," if i < len(sorted_items) - 1 else ""
+        lines.append(f'    "{k}": "{v_escaped}"{comma}')
+    lines.append("}")
+    with open(NAME_FILES[var_name], 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+def run_financials(tickers):
+    from scripts.mining.fetch_financials import update_financials
+    update_financials(tickers=tickers)
+    df_fin = pd.read_csv(PATHS['FINANCIAL_INFO'])
+    have = set(df_fin.loc[df_fin['Sector'].notna(), 'Ticker'].astype(str))
+    return [t for t in tickers if t in have]
+
+def run_consensus(tickers):
+    from scripts.core.consensus import ConsensusManager
+    ConsensusManager().fetch_all_consensus(tickers)
+    with open(PATHS['CONSENSUS_JSON'], 'r', encoding='utf-8') as f:
+        consensus = json.load(f)
+    return [t for t in tickers if t in consensus]
+
+def run_names(tickers):
+    """English name from the universe listing, Korean from Naver (English as fallback)"""
+    from scripts.fetch_korean_names import fetch_korean_name
+    names_en = _load_names('SP500_ENGLISH_NAMES')
+    names_ko = _load_names('SP500_KOREAN_NAMES')
+    done = []
+    for t in tickers:
+        name_en = names_en.get(t) or universe.name(t)
+        name_ko = names_ko.get(t) or fetch_korean_name(t) or name_en
+        if name_en:
+            names_en[t] = name_en
+        if name_ko:
+            names_ko[t] = name_ko
+            done.append(t)
+    if done:
+        _save_names('SP500_ENGLISH_NAMES', names_en)
+        _save_names('SP500_KOREAN_NAMES', names_ko)
+    return done
+
+class OnboardingQueue:
+    """
+    Follow-up jobs for new index members (data/onboarding_queue.json):
+    financials, consensus and names, run right after the price backfill so
+    the ticker is ranked on the same day. A job that fails stays queued and
+    is retried on the next runs (up to ONBOARDING_MAX_ATTEMPTS).
+    """
+
+    def __init__(self, path=None, runners=None):
+        self.path = path or PATHS['ONBOARDING_QUEUE']
+        # Job runners: {job: callable(tickers) -> tickers done}. Tests can inject stubs.
+        self.runners = runners or {
+            'financials': run_financials, 'consensus': run_consensus, 'names': run_names,
+        }
+        self.entries = self._load()  # {ticker: {"added", "pending": [jobs], "attempts"}}
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"⚠️ Failed to load onboarding queue ({e}), starting empty.")
+        return {}
+
+    def save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def enqueue(self, tickers):
+        today = datetime.now().strftime('%Y-%m-%d')
+        for t in tickers:
+            self.entries.setdefault(t, {"added": today, "pending": list(JOBS), "attempts": 0})
+        self.save()
+
+    def pending(self, job):
+        return sorted(t for t, e in self.entries.items() if job in e['pending'])
+
+    def run(self):
+        """Run every queued job once. Returns {job: tickers done}."""
+        if not self.entries:
+            return {}
+        results = {}
+        for job in JOBS:
+            tickers = self.pending(job)
+            if not tickers:
+                continue
+            print(f"🧾 Onboarding {job} for {len(tickers)} new tickers...")
+            try:
+                done = set(self.runners[job](tickers) or [])
+            except Exception as e:
+                print(f"   ⚠️ Onboarding {job} failed: {e}")
+                done = set()
+            for t in done:
+                self.entries[t]['pending'].remove(job)
+            results[job] = sorted(done)
+
+        for t in list(self.entries):
+            e = self.entries[t]
+            e['attempts'] += 1
+            if not e['pending']:
+                del self.entries[t]
+            elif e['attempts'] >= ONBOARDING_MAX_ATTEMPTS:
+                print(f"   ⚠️ Giving up on {t} onboarding ({', '.join(e['pending'])}) after {e['attempts']} runs")
+                del self.entries[t]
+        self.save()
+        return results
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+class BarPanel:
+    """
+    Long price frame (Date, Ticker, ...) scattered into (bar x ticker) NumPy matrices.
+
+    Rows are aligned by each ticker's own bar position, so shifts and rolling
+    windows count trading bars exactly like per-ticker groupby operations, even
+    when a ticker has missing days or a shorter history.
+    - head-aligned: row 0 = each ticker's first bar (for rolling / EWM history)
+    - tail-aligned: row 0 = each ticker's last bar (for "latest N bars" lookups)
+    """
+
+    def __init__(self, df):
+        self.df = df.sort_values(['Ticker', 'Date'])
+        codes, uniques = pd.factorize(self.df['Ticker'], sort=True)
+        self.codes = codes
+        self.tickers = pd.Index(uniques, name='Ticker')
+        grouped = self.df.groupby('Ticker', sort=False)
+        self.pos = grouped.cumcount().to_numpy()
+        self.rpos = grouped.cumcount(ascending=False).to_numpy()
+        self.lengths = np.bincount(codes, minlength=len(uniques)) if len(codes) else np.zeros(0, dtype=int)
+        self.n_bars = int(self.lengths.max()) if len(self.lengths) else 0
+
+    def head(self, col, dtype=float):
+        """(bar x ticker) matrix of `col`, row i = i-th bar of each ticker"""
+        panel = np.full((self.n_bars, len(self.tickers)), np.nan, dtype=dtype)
+        panel[self.pos, self.codes] = self.df[col].to_numpy(dtype=dtype)
+        return panel
+
+    def tail(self, col, bars, dtype=float):
+        """(bars x ticker) matrix of `col`, row k = k-th bar from the end (0 = last)"""
+        panel = np.full((bars, len(self.tickers)), np.nan, dtype=dtype)
+        mask = self.rpos < bars
+        panel[self.rpos[mask], self.codes[mask]] = self.df[col].to_numpy(dtype=dtype)[mask]
+        return panel
+
+    def tail_values(self, col, bars):
+        """Like tail() for non-numeric columns (object array, None where missing)"""
+        panel = np.full((bars, len(self.tickers)), None, dtype=object)
+        mask = self.rpos < bars
+        panel[self.rpos[mask], self.codes[mask]] = self.df[col].to_numpy()[mask]
+        return panel
+
+    def last(self, panel, offset=0):
+        """Value at each ticker's (last - offset) bar from a head-aligned panel"""
+        idx = self.lengths - 1 - offset
+        out = np.full(len(self.tickers), np.nan)
+        ok = idx >= 0
+        out[ok] = panel[idx[ok], np.arange(len(self.tickers))[ok]]
+        return out
+
+    def to_long(self, panel):
+        """Head-aligned panel back to a vector aligned with self.df rows"""
+        return panel[self.pos, self.codes]
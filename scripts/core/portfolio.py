@@ -1,8 +1,8 @@
 import json
 import os
-import yfinance as yf
 from datetime import datetime
 from scripts.config import PATHS
+from scripts.core.http_cache import yahoo_download
 
 # SB1 Strategy Configuration
 TOP_N = 10          # Buy stocks ranked <= 10
@@ -31,7 +31,7 @@ class PortfolioManager:
     def get_spy_value(self, start_value, start_date, current_date):
         """Calculate SPY benchmark value normalized to start_value"""
         try:
-            spy = yf.download('SPY', start=start_date, end=current_date, progress=False, auto_adjust=True)
+            spy = yahoo_download('SPY', 'SPY', start=start_date, end=current_date, progress=False, auto_adjust=True)
             if spy.empty:
                 return None
             start_price = spy['Close'].iloc[0].item()
@@ -50,7 +50,7 @@ class PortfolioManager:
         tickers = list(holdings.keys())
         try:
             # Fetch 5 days (actions=True returns "Dividends" and "Stock Splits")
-            df = yf.download(tickers, period='5d', actions=True, auto_adjust=False, progress=False, group_by='ticker')
+            df = yahoo_download(','.join(tickers), tickers, period='5d', actions=True, auto_adjust=False, progress=False, group_by='ticker')
             
             total_div_added = 0
             if 'action_history' not in portfolio:
@@ -235,7 +235,7 @@ class PortfolioManager:
             spy_value = chart_data[-1].get('spy', 100000) if chart_data else 100000
             
             try:
-                spy = yf.download('SPY', period='2d', progress=False, auto_adjust=True)
+                spy = yahoo_download('SPY', 'SPY', period='2d', progress=False, auto_adjust=True)
                 if not spy.empty and len(spy) >= 2:
                     prev_spy = chart_data[-1].get('spy', 100000)
                     prev_close = spy['Close'].iloc[-2].item()
@@ -0,0 +1,157 @@
+import os
+import json
+import threading
+import pandas as pd
+from scripts.config import PATHS
+
+try:
+    import pyarrow  # noqa: F401 (Parquet engine)
+    STORE_EXT = '.parquet'
+except ImportError:
+    STORE_EXT = '.csv'
+
+class PriceStore:
+    """
+    Persistent per-ticker OHLCV store (one columnar file per ticker).
+    - Parquet when pyarrow is installed, CSV otherwise
+    - `_meta.json` records how far back each ticker's history was requested,
+      so a longer backfill (e.g. 5Y backtest) is only downloaded once
+    - Writes go through a temp file + os.replace (safe against interrupted runs)
+    """
+
+    META_FILE = '_meta.json'
+
+    def __init__(self, root=None):
+        self.root = root or PATHS['PRICE_STORE']
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self.meta = self._load_meta()
+
+    # ------------------------------------------------------------------
+    # Paths & Metadata
+    # ------------------------------------------------------------------
+    def path(self, ticker, ext=STORE_EXT):
+        return os.path.join(self.root, ticker.replace('/', '_') + ext)
+
+    def _load_meta(self):
+        path = os.path.join(self.root, self.META_FILE)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {}
+
+    def save_meta(self):
+        path = os.path.join(self.root, self.META_FILE)
+        with self._lock:
+            tmp = path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.meta, f, indent=2, sort_keys=True)
+            os.replace(tmp, path)
+
+    def history_start(self, ticker):
+        """Earliest date ever requested for this ticker (None if unknown)"""
+        start = self.meta.get(ticker, {}).get('history_start')
+        return pd.Timestamp(start) if start else None
+
+    def first_date(self, ticker):
+        """First stored bar (None if unknown)"""
+        first = self.meta.get(ticker, {}).get('first_date')
+        if first:
+            return pd.Timestamp(first)
+        df = self.load(ticker)
+        return None if df.empty else df['Date'].iloc[0]
+
+    # ------------------------------------------------------------------
+    # Read / Write
+    # ------------------------------------------------------------------
+    def load(self, ticker):
+        """Return the stored frame for ticker (Date column, sorted) or empty DataFrame"""
+        for ext in (STORE_EXT, '.parquet', '.csv'):
+            path = self.path(ticker, ext)
+            if not os.path.exists(path):
+                continue
+            try:
+                if ext == '.parquet':
+                    df = pd.read_parquet(path)
+                else:
+                    df = pd.read_csv(path, parse_dates=['Date'])
+                return df.sort_values('Date').reset_index(drop=True)
+            except Exception as e:
+                print(f"   ⚠️ Corrupt price store file for {ticker} ({e}), ignoring.")
+                break
+        return pd.DataFrame()
+
+    def last_date(self, ticker):
+        df = self.load(ticker)
+        if df.empty:
+            return None
+        return df['Date'].iloc[-1]
+
+    @staticmethod
+    def _normalize(df):
+        return df.sort_values('Date').drop_duplicates('Date', keep='last').reset_index(drop=True)
+
+    def write(self, ticker, df, history_start=None):
+        """Replace stored history for ticker"""
+        df = self._normalize(df)
+        path = self.path(ticker)
+        tmp = path + '.tmp'
+        if STORE_EXT == '.parquet':
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+        self._update_meta(ticker, df, history_start)
+        return df
+
+    def _update_meta(self, ticker, df, history_start=None):
+        with self._lock:
+            entry = self.meta.setdefault(ticker, {})
+            if history_start is not None:
+                prev = entry.get('history_start')
+                start = pd.Timestamp(history_start)
+                if prev is None or start < pd.Timestamp(prev):
+                    entry['history_start'] = start.strftime('%Y-%m-%d')
+            entry['first_date'] = pd.Timestamp(df['Date'].iloc[0]).strftime('%Y-%m-%d') if not df.empty else None
+            entry['last_date'] = pd.Timestamp(df['Date'].iloc[-1]).strftime('%Y-%m-%d') if not df.empty else None
+
+    def append(self, ticker, new_df, history_start=None):
+        """
+        Merge new bars into the stored history (new rows win on duplicate dates).
+        The file is only rewritten when the merged history differs from the stored one.
+        """
+        old = self.load(ticker)
+        if old.empty:
+            merged = new_df
+        elif new_df is None or new_df.empty:
+            merged = old
+        else:
+            merged = pd.concat([old, new_df], ignore_index=True)
+        if not old.empty:
+            merged = self._normalize(merged)
+            if merged.equals(old):
+                self._update_meta(ticker, old, history_start)
+                return old
+        return self.write(ticker, merged, history_start)
+
+    def window(self, ticker, start_date, end_date=None):
+        """Stored bars in [start_date, end_date]"""
+        df = self.load(ticker)
+        if df.empty:
+            return df
+        mask = df['Date'] >= pd.Timestamp(start_date)
+        if end_date is not None:
+            mask &= df['Date'] <= pd.Timestamp(end_date)
+        return df[mask].reset_index(drop=True)
+
+    def tickers(self):
+        """All tickers currently in the store"""
+        names = set()
+        for fname in os.listdir(self.root):
+            base, ext = os.path.splitext(fname)
+            if ext in ('.parquet', '.csv'):
+                names.add(base)
+        return sorted(names)
@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import random
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+@contextmanager
+def file_lock(path):
+    """Exclusive advisory lock on path (held across processes and threads)"""
+    with open(path, 'a+') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class SharedTokenBucket:
+    """
+    Token bucket whose state lives in a file (state_dir/<name>.json) guarded by
+    a file lock, so every process hitting the same upstream (engine, consensus,
+    calendar, financials...) draws from one budget. `rate` requests per second
+    on average, bursts of up to `capacity`. pause() after a 429 stalls every
+    worker in every process.
+    """
+
+    def __init__(self, name, rate, capacity=None, state_dir='.'):
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_path = os.path.join(state_dir, f"{name}.json")
+        self.lock_path = self.state_path + '.lock'
+
+    def _read(self, now):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        return {"tokens": min(self.capacity, state.get('tokens', self.capacity)),
+                "updated": min(now, state.get('updated', now)),
+                "paused_until": state.get('paused_until', 0.0)}
+
+    def _write(self, state):
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with file_lock(self.lock_path):
+                now = time.time()  # wall clock: shared between processes
+                state = self._read(now)
+                if now < state['paused_until']:
+                    wait = state['paused_until'] - now
+                else:
+                    state['tokens'] = min(self.capacity, state['tokens'] + (now - state['updated']) * self.rate)
+                    state['updated'] = now
+                    if state['tokens'] >= 1:
+                        state['tokens'] -= 1
+                        self._write(state)
+                        return
+                    wait = (1 - state['tokens']) / self.rate
+                    self._write(state)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with file_lock(self.lock_path):
+            now = time.time()
+            state = self._read(now)
+            state['paused_until'] = max(state['paused_until'], now + seconds)
+            self._write(state)
+
+def backoff_delay(attempt, base=2.0, cap=60.0):
+    """Exponential backoff with jitter: uniform in [d/2, d], d = min(cap, base * 2^attempt)"""
+    d = min(cap, base * (2 ** attempt))
+    return d / 2 + random.uniform(0, d / 2)
+
+def is_rate_limit_error(e):
+    msg = str(e).lower()
+    return "too many requests" in msg or "rate limit" in msg or "429" in msg
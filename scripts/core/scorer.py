@@ -1,5 +1,8 @@
+import os
+import hashlib
 import pandas as pd
 import numpy as np
+from scripts.core.panel import BarPanel
 
 class MarketScorer:
     """
@@ -22,140 +25,375 @@ class MarketScorer:
     - Sentiment: 5 pts (Volume Spike)
     """
 
-    def calculate_technical_factors_bulk(self, df):
-        """Bulk calculation of technical factors used for scoring"""
-        print("📈 Calculating Technical Factors (Momentum, Vol, Risk)...")
+    # Technical factor implementation: 'panel' (vectorized NumPy) or 'long' (groupby fallback)
+    FACTOR_METHOD = 'panel'
+
+    # Lookbacks (trading days)
+    MOMENTUM_LAG = 21
+    MOMENTUM_WINDOWS = {'Return_12M': 252, 'Return_6M': 126, 'Return_3M': 63}
+    VOLUME_WINDOW = 63
+    VOLATILITY_WINDOW = 60
+
+    def calculate_technical_factors_bulk(self, df, method=None, latest=None):
+        """
+        Bulk calculation of technical factors used for scoring.
+        method: 'panel' (default, vectorized) or 'long' (per-ticker groupby transforms).
+        Both return the same columns with numerically matching values.
+        latest (panel only): ticker-indexed Vol_3M_Avg / Vol_Spike / Volatility_60D
+        at each ticker's last bar (e.g. IndicatorState). Those tickers skip the
+        rolling volume / volatility windows; their earlier rows stay NaN.
+        """
+        method = method or self.FACTOR_METHOD
+        print(f"📈 Calculating Technical Factors (Momentum, Vol, Risk) [{method}]...")
         
+        if method == 'long':
+            return self._technical_factors_long(df)
+        if method == 'panel':
+            return self._technical_factors_panel(df, latest)
+        raise ValueError(f"Unknown technical factor method: {method}")
+
+    def _technical_factors_long(self, df):
+        """Long-format implementation (one groupby pass per factor)"""
         # Ensure sorted
         df = df.sort_values(['Ticker', 'Date'])
+        lag = self.MOMENTUM_LAG
         
         # Momentum with 1-month lag (exclude last 21 trading days)
         # 12-1M: from 252 days ago to 21 days ago
-        df['Return_12M'] = df.groupby('Ticker')['Close'].transform(
-            lambda x: x.shift(21).pct_change(periods=252-21)
-        )
-        df['Return_6M'] = df.groupby('Ticker')['Close'].transform(
-            lambda x: x.shift(21).pct_change(periods=126-21)
-        )
-        df['Return_3M'] = df.groupby('Ticker')['Close'].transform(
-            lambda x: x.shift(21).pct_change(periods=63-21)
-        )
+        for col, window in self.MOMENTUM_WINDOWS.items():
+            df[col] = df.groupby('Ticker')['Close'].transform(
+                lambda x, w=window: x.shift(lag).pct_change(periods=w-lag)
+            )
         
         # Volume Spike: Current Vol / 3M Avg Vol
-        df['Vol_3M_Avg'] = df.groupby('Ticker')['Volume'].transform(lambda x: x.rolling(window=63).mean())
+        df['Vol_3M_Avg'] = df.groupby('Ticker')['Volume'].transform(lambda x: x.rolling(window=self.VOLUME_WINDOW).mean())
         df['Vol_Spike'] = df['Volume'] / df['Vol_3M_Avg']
         
         # Risk: 60-day volatility (standard deviation of daily returns)
         df['Daily_Return'] = df.groupby('Ticker')['Close'].pct_change()
         df['Volatility_60D'] = df.groupby('Ticker')['Daily_Return'].transform(
-            lambda x: x.rolling(window=60).std() * np.sqrt(252)  # Annualized
+            lambda x: x.rolling(window=self.VOLATILITY_WINDOW).std() * np.sqrt(252)  # Annualized
         )
         
         return df
 
-    def apply_sector_scoring(self, daily_df, financial_map, consensus_data=None):
+    def _technical_factors_panel(self, df, latest=None):
         """
-        Apply Sector Relative Scoring (v2.0 with new factors)
-        Returns scored and ranked DataFrame with 'Total_Score' and 'Rank'
+        Panel implementation: pivot into a (bar x ticker) NumPy matrix (BarPanel)
+        and compute every factor with strided / cumulative-sum operations over all
+        tickers at once.
+        """
+        if df.empty:
+            return self._technical_factors_long(df)
+        
+        bp = BarPanel(df)
+        df = bp.df
+        close = bp.head('Close')
+        volume = bp.head('Volume')
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Momentum with 1-month lag: Close[t-lag] / Close[t-window] - 1
+            lag = self.MOMENTUM_LAG
+            for col, window in self.MOMENTUM_WINDOWS.items():
+                df[col] = bp.to_long(self._panel_ratio(close, lag, window))
+            
+            # Rolling windows only for tickers without precomputed latest values
+            given = bp.tickers.isin(latest.index) if latest is not None else np.zeros(len(bp.tickers), bool)
+            full = ~given
+            daily_ret = self._panel_ratio(close, 0, 1)
+            vol_avg = np.full(volume.shape, np.nan)
+            volatility = np.full(close.shape, np.nan)
+            if full.any():
+                vol_avg[:, full] = self._rolling_mean(volume[:, full], self.VOLUME_WINDOW)
+                volatility[:, full] = self._rolling_std(daily_ret[:, full], self.VOLATILITY_WINDOW) * np.sqrt(252)
+            if given.any():
+                cols = np.flatnonzero(given)
+                rows = bp.lengths[cols] - 1
+                vals = latest.reindex(bp.tickers[cols])
+                vol_avg[rows, cols] = vals['Vol_3M_Avg'].to_numpy(dtype=float)
+                volatility[rows, cols] = vals['Volatility_60D'].to_numpy(dtype=float)
+            
+            # Volume Spike: Current Vol / 3M Avg Vol
+            df['Vol_3M_Avg'] = bp.to_long(vol_avg)
+            df['Vol_Spike'] = df['Volume'] / df['Vol_3M_Avg']
+            
+            # Risk: 60-day annualized volatility of daily returns
+            df['Daily_Return'] = bp.to_long(daily_ret)
+            df['Volatility_60D'] = bp.to_long(volatility)
+        
+        return df
+
+    @staticmethod
+    def _panel_ratio(panel, near, far):
+        """panel[t-near] / panel[t-far] - 1 along the bar axis (NaN where undefined)"""
+        out = np.full(panel.shape, np.nan)
+        if far < panel.shape[0]:
+            out[far:] = panel[far - near:panel.shape[0] - near] / panel[:panel.shape[0] - far] - 1
+        return out
+
+    @staticmethod
+    def _rolling_sums(panel, window):
+        """Rolling (sum, sum of squares, valid count) over `window` bars via cumulative sums"""
+        valid = ~np.isnan(panel)
+        filled = np.where(valid, panel, 0.0)
+        zero = np.zeros((1, panel.shape[1]))
+        
+        def windowed(x):
+            c = np.concatenate([zero, np.cumsum(x, axis=0)])
+            return c[window:] - c[:-window]
+        
+        return windowed(filled), windowed(filled * filled), windowed(valid.astype(float))
+
+    @classmethod
+    def _rolling_mean(cls, panel, window):
+        """Equivalent of rolling(window).mean() (min_periods=window) per column"""
+        out = np.full(panel.shape, np.nan)
+        if window > panel.shape[0]:
+            return out
+        s, _, n = cls._rolling_sums(panel, window)
+        out[window - 1:] = np.where(n == window, s / window, np.nan)
+        return out
+
+    @classmethod
+    def _rolling_std(cls, panel, window):
+        """Equivalent of rolling(window).std() (ddof=1, min_periods=window) per column"""
+        out = np.full(panel.shape, np.nan)
+        if window > panel.shape[0]:
+            return out
+        # Center each column first to limit cancellation in sum(x^2) - sum(x)^2/n
+        centered = panel - np.nanmean(panel, axis=0)
+        s, sq, n = cls._rolling_sums(centered, window)
+        var = (sq - s * s / window) / (window - 1)
+        out[window - 1:] = np.where(n == window, np.sqrt(np.clip(var, 0, None)), np.nan)
+        return out
+
+    def consensus_frame(self, consensus_data):
+        """
+        Flatten consensus JSON ({ticker: {target_price, financial_health, ...}})
+        into a columnar frame: Ticker, Target_Mean, Target_Low, Target_High,
+        Rec_Score, Debt_Ratio.
+        Accepts an already flattened DataFrame as-is. The last flattened dict is
+        memoized, so per-day backtest calls with the same dict flatten only once.
         """
+        if isinstance(consensus_data, pd.DataFrame):
+            return consensus_data
         if consensus_data is None:
             consensus_data = {}
-            
-        # Merge financials
-        merged = daily_df.merge(financial_map, on='Ticker', how='left')
         
-        # Filter unknown sectors
-        merged = merged.dropna(subset=['Sector'])
+        cached = getattr(self, '_consensus_cache', None)
+        if cached is not None and cached[0] is consensus_data:
+            return cached[1]
         
-        # Add consensus upside from consensus_data
-        def get_upside(ticker):
-            cons = consensus_data.get(ticker, {})
-            if not cons:
-                return np.nan
-            target = cons.get('target_price', {})
-            if not target:
-                return np.nan
-            mean_target = target.get('mean')
-            if not mean_target:
-                return np.nan
-            # Get current price from merged df
-            current = merged.loc[merged['Ticker'] == ticker, 'Close'].values
-            if len(current) == 0 or current[0] <= 0:
-                return np.nan
-            return ((mean_target - current[0]) / current[0]) * 100
-        
-        merged['Consensus_Upside'] = merged['Ticker'].apply(get_upside)
-        
-        # Add debt ratio from consensus financial_health
-        def get_debt_ratio(ticker):
-            cons = consensus_data.get(ticker, {})
-            fh = cons.get('financial_health', {})
-            if not fh:
-                return np.nan
-            return fh.get('debt_ratio', np.nan)
-        
-        merged['Debt_Ratio'] = merged['Ticker'].apply(get_debt_ratio)
-        
-        # 1. Mask Negative Valuations (Give them NaN so they rank poorly)
-        val_cols = ['PER', 'PBR', 'EV_EBITDA', 'PSR']
-        for col in val_cols:
-            if col in merged.columns:
-                merged[col] = merged[col].apply(lambda x: x if x > 0 else np.nan)
+        rows = []
+        for ticker, cons in consensus_data.items():
+            cons = cons or {}
+            target = cons.get('target_price') or {}
+            rec = cons.get('recommendation') or {}
+            fh = cons.get('financial_health') or {}
+            rows.append((
+                ticker,
+                target.get('mean') or np.nan,  # 0 / None -> no target
+                target.get('low'),
+                target.get('high'),
+                rec.get('score'),
+                fh.get('debt_ratio'),
+            ))
         
-        # 2. Sector Relative Ranking (0.0 to 1.0)
+        cols = ['Ticker', 'Target_Mean', 'Target_Low', 'Target_High', 'Rec_Score', 'Debt_Ratio']
+        frame = pd.DataFrame(rows, columns=cols)
+        for col in cols[1:]:
+            frame[col] = pd.to_numeric(frame[col], errors='coerce')
         
+        self._consensus_cache = (consensus_data, frame)
+        return frame
+
+    # Scoring factors: (score column, source column, points, scope, low_is_good)
+    # scope 'sector' = percentile within sector, 'market' = percentile across the universe
+    FACTOR_SPECS = [
         # A. Value (20 pts) - Low is Good
-        merged['Score_PER'] = (1 - merged.groupby('Sector')['PER'].rank(pct=True, ascending=True)) * 8
-        merged['Score_PBR'] = (1 - merged.groupby('Sector')['PBR'].rank(pct=True, ascending=True)) * 4
-        merged['Score_PSR'] = (1 - merged.groupby('Sector')['PSR'].rank(pct=True, ascending=True)) * 4
-        merged['Score_EVEB'] = (1 - merged.groupby('Sector')['EV_EBITDA'].rank(pct=True, ascending=True)) * 4
-        
+        ('Score_PER', 'PER', 8, 'sector', True),
+        ('Score_PBR', 'PBR', 4, 'sector', True),
+        ('Score_PSR', 'PSR', 4, 'sector', True),
+        ('Score_EVEB', 'EV_EBITDA', 4, 'sector', True),
         # B. Growth (20 pts) - High is Good
-        merged['Score_RevG'] = merged.groupby('Sector')['Rev_Growth'].rank(pct=True, ascending=True) * 8
-        merged['Score_EPSG'] = merged.groupby('Sector')['EPS_Growth'].rank(pct=True, ascending=True) * 12
-        
+        ('Score_RevG', 'Rev_Growth', 8, 'sector', False),
+        ('Score_EPSG', 'EPS_Growth', 12, 'sector', False),
         # C. Profitability (15 pts) - High is Good
-        merged['Score_ROE'] = merged.groupby('Sector')['ROE'].rank(pct=True, ascending=True) * 8
-        
-        if 'Profit_Margin' in merged.columns:
-            merged['Score_NM'] = merged.groupby('Sector')['Profit_Margin'].rank(pct=True, ascending=True) * 3
-        else:
-            merged['Score_NM'] = 0
-            
-        if 'Oper_Margin' in merged.columns:
-            merged['Score_OM'] = merged.groupby('Sector')['Oper_Margin'].rank(pct=True, ascending=True) * 4
-        else:
-            merged['Score_OM'] = 0
-            
+        ('Score_ROE', 'ROE', 8, 'sector', False),
+        ('Score_NM', 'Profit_Margin', 3, 'sector', False),
+        ('Score_OM', 'Oper_Margin', 4, 'sector', False),
         # D. Momentum (20 pts) - High is Good (with 1M lag) -> [CHANGED] Market Relative (Absolute)
-        merged['Score_Mom1Y'] = merged['Return_12M'].rank(pct=True, ascending=True) * 10
-        merged['Score_Mom6M'] = merged['Return_6M'].rank(pct=True, ascending=True) * 5
-        merged['Score_Mom3M'] = merged['Return_3M'].rank(pct=True, ascending=True) * 5
-        
+        ('Score_Mom1Y', 'Return_12M', 10, 'market', False),
+        ('Score_Mom6M', 'Return_6M', 5, 'market', False),
+        ('Score_Mom3M', 'Return_3M', 5, 'market', False),
         # E. Stability (5 pts) - Low Debt is Good
-        merged['Score_Stability'] = (1 - merged.groupby('Sector')['Debt_Ratio'].rank(pct=True, ascending=True)) * 5
-        
+        ('Score_Stability', 'Debt_Ratio', 5, 'sector', True),
         # F. Risk (5 pts) - Low Volatility is Good
-        merged['Score_Risk'] = (1 - merged.groupby('Sector')['Volatility_60D'].rank(pct=True, ascending=True)) * 5
-        
+        ('Score_Risk', 'Volatility_60D', 5, 'sector', True),
         # G. Consensus (10 pts) - High Upside is Good -> [CHANGED] Market Relative (Absolute)
-        merged['Score_Consensus'] = merged['Consensus_Upside'].rank(pct=True, ascending=True) * 10
-        
+        ('Score_Consensus', 'Consensus_Upside', 10, 'market', False),
         # H. Sentiment (5 pts) - High is Good (Volume Spike) -> [CHANGED] Market Relative (Absolute)
-        merged['Score_Vol'] = merged['Vol_Spike'].rank(pct=True, ascending=True) * 5
+        ('Score_Vol', 'Vol_Spike', 5, 'market', False),
+    ]
+
+    # Optional source columns scored as 0 when missing from financials
+    OPTIONAL_FACTORS = ('Profit_Margin', 'Oper_Margin')
+
+    # Price-panel columns needed for scoring
+    PANEL_COLUMNS = ['Date', 'Ticker', 'Close', 'Return_12M', 'Return_6M', 'Return_3M',
+                     'Vol_Spike', 'Volatility_60D']
+
+    # Bump when scoring logic changes (invalidates cached score cubes)
+    SCORING_VERSION = 2
+
+    def _prepare_scoring_frame(self, price_df, financial_map, consensus_data):
+        """Merge financials + consensus into price rows and mask invalid valuations"""
+        # Merge financials
+        merged = price_df.merge(financial_map, on='Ticker', how='left')
+        
+        # Filter unknown sectors
+        merged = merged.dropna(subset=['Sector'])
+        
+        # Consensus columns (target mean, debt ratio) joined in one vectorized merge
+        cons_df = self.consensus_frame(consensus_data)
+        merged = merged.merge(cons_df[['Ticker', 'Target_Mean', 'Debt_Ratio']], on='Ticker', how='left')
+        
+        close = merged['Close'].where(merged['Close'] > 0)
+        merged['Consensus_Upside'] = (merged['Target_Mean'] - close) / close * 100
+        merged = merged.drop(columns=['Target_Mean'])
+        merged['Debt_Ratio'] = merged.pop('Debt_Ratio')  # keep column order (Upside, Debt_Ratio)
+        
+        # Mask Negative Valuations (Give them NaN so they rank poorly)
+        val_cols = ['PER', 'PBR', 'EV_EBITDA', 'PSR']
+        for col in val_cols:
+            if col in merged.columns:
+                merged[col] = merged[col].where(merged[col] > 0)
+        
+        return merged
+
+    def _score_factors(self, merged, sector_keys, market_keys):
+        """
+        Percentile-rank every factor (0.0 to 1.0) and scale to its points.
+        All sector-scope factors are ranked in one grouped pass (and likewise for
+        market scope). Keys of None rank across the whole frame.
+        """
+        def rank_block(cols, keys):
+            cols = [c for c in cols if c in merged.columns]
+            if not cols:
+                return pd.DataFrame(index=merged.index)
+            if keys:
+                return merged.groupby(keys)[cols].rank(pct=True, ascending=True)
+            return merged[cols].rank(pct=True, ascending=True)
         
-        # 3. Fill NaNs with 0
+        specs = self.FACTOR_SPECS
+        pct = pd.concat([
+            rank_block([src for _, src, _, scope, _ in specs if scope == 'sector'], sector_keys),
+            rank_block([src for _, src, _, scope, _ in specs if scope == 'market'], market_keys),
+        ], axis=1)
+        
+        for score_col, src, points, _, low_is_good in specs:
+            if src not in pct.columns:
+                if src not in self.OPTIONAL_FACTORS:
+                    raise KeyError(src)
+                merged[score_col] = 0
+                continue
+            merged[score_col] = ((1 - pct[src]) if low_is_good else pct[src]) * points
+        
+        # Fill NaNs with 0
         score_cols = [c for c in merged.columns if c.startswith('Score_')]
         merged[score_cols] = merged[score_cols].fillna(0)
         
-        # 4. Total Score
+        # Total Score
         merged['Total_Score'] = merged[score_cols].sum(axis=1)
+        return merged
+
+    def apply_sector_scoring(self, daily_df, financial_map, consensus_data=None):
+        """
+        Apply Sector Relative Scoring (v2.0 with new factors)
+        consensus_data: consensus JSON dict or a frame from consensus_frame()
+        Returns scored and ranked DataFrame with 'Total_Score' and 'Rank'
+        """
+        merged = self._prepare_scoring_frame(daily_df, financial_map, consensus_data)
+        merged = self._score_factors(merged, ['Sector'], None)
         
         # Final Rank
         merged['Rank'] = merged['Total_Score'].rank(ascending=False, method='min')
         
         return merged
 
+    def score_panel(self, price_panel, financial_map, consensus_data=None, dates=None,
+                    include_factors=False, cache_path=None):
+        """
+        Batch scoring for many dates at once (score cube).
+        Equivalent to calling apply_sector_scoring on each date's slice, but the
+        merges and percentile ranks run once, grouped by (Date, Sector) / Date.
+        
+        price_panel: long price frame with technical factors (calculate_technical_factors_bulk)
+        dates: optional subset of dates to score (e.g. rebalance days)
+        include_factors: also return each Score_* factor matrix
+        cache_path: pickle file; reused when the input fingerprint matches
+        
+        Returns {'Total_Score': DF, 'Rank': DF, 'Close': DF, [Score_*: DF]}
+        with dates as index and tickers as columns.
+        """
+        panel = price_panel[self.PANEL_COLUMNS]
+        if dates is not None:
+            panel = panel[panel['Date'].isin(pd.to_datetime(pd.Index(dates)))]
+        
+        cons_df = self.consensus_frame(consensus_data)
+        fingerprint = None
+        if cache_path:
+            fingerprint = self._cube_fingerprint(panel, financial_map, cons_df, include_factors)
+            cube = self.load_score_cube(cache_path, fingerprint)
+            if cube is not None:
+                print(f"♻️ Loaded cached score cube ({len(cube['Rank'])} dates) from {cache_path}")
+                return cube
+        
+        print(f"🧮 Scoring {panel['Date'].nunique()} dates in one pass...")
+        merged = self._prepare_scoring_frame(panel, financial_map, cons_df)
+        merged = self._score_factors(merged, ['Date', 'Sector'], ['Date'])
+        merged['Rank'] = merged.groupby('Date')['Total_Score'].rank(ascending=False, method='min')
+        
+        matrix_cols = ['Total_Score', 'Rank', 'Close']
+        if include_factors:
+            matrix_cols += [spec[0] for spec in self.FACTOR_SPECS]
+        cube = {col: merged.pivot(index='Date', columns='Ticker', values=col) for col in matrix_cols}
+        
+        if cache_path:
+            self.save_score_cube(cube, cache_path, fingerprint)
+        return cube
+
+    def _cube_fingerprint(self, panel, financial_map, cons_df, include_factors):
+        """Content hash of all score_panel inputs"""
+        h = hashlib.sha1()
+        h.update(f"v{self.SCORING_VERSION}|{include_factors}".encode())
+        for frame in (panel, financial_map, cons_df):
+            h.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+            h.update('|'.join(map(str, frame.columns)).encode())
+        return h.hexdigest()
+
+    @staticmethod
+    def save_score_cube(cube, path, fingerprint=None):
+        """Persist a score cube (dict of date x ticker frames)"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp'
+        pd.to_pickle({'fingerprint': fingerprint, 'cube': cube}, tmp)
+        os.replace(tmp, path)
+        print(f"💾 Saved score cube to {path}")
+
+    @staticmethod
+    def load_score_cube(path, fingerprint=None):
+        """Load a cached score cube; None if missing or built from different inputs"""
+        if not os.path.exists(path):
+            return None
+        try:
+            payload = pd.read_pickle(path)
+        except Exception:
+            return None
+        if fingerprint is not None and payload.get('fingerprint') != fingerprint:
+            return None
+        return payload.get('cube')
+
     def assign_tier(self, rank, total_count):
         """Calculate Tier based on Rank percentile"""
         pct = rank / total_count
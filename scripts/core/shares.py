@@ -0,0 +1,99 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from scripts.config import (
+    PATHS, FETCH_MAP, SHARES_MAX_AGE_DAYS, SHARES_REFRESH_PER_RUN, SHARES_WORKERS
+)
+from scripts.core.http_cache import yahoo_info
+
+def _yahoo_shares(symbol, refresh=False):
+    # Same cached .info as consensus / financials; refresh=True skips the cache
+    # (a split makes the cached share count stale)
+    info = yahoo_info(symbol, refresh=refresh)
+    return info.get('sharesOutstanding') or info.get('impliedSharesOutstanding')
+
+class SharesCache:
+    """
+    Shares outstanding per ticker (data/shares_outstanding.json), so market cap
+    can be computed locally as shares x latest close instead of a daily .info
+    request per ticker.
+    An entry is refreshed when it is missing, older than SHARES_MAX_AGE_DAYS, or
+    the ticker had a split / corporate action (forced). Stale entries are
+    refreshed oldest first, at most SHARES_REFRESH_PER_RUN per run, which
+    spreads the weekly refresh over several days.
+    """
+
+    def __init__(self, path=None, shares_reader=None, workers=None):
+        self.path = path or PATHS['SHARES_OUTSTANDING']
+        # Shares provider: callable(yahoo symbol, refresh) -> shares. Tests can inject a local stub.
+        self.shares_reader = shares_reader or _yahoo_shares
+        self.workers = max(1, workers or SHARES_WORKERS)
+        self.entries = self._load()  # {ticker: {"shares": int, "updated": YYYY-MM-DD}}
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"⚠️ Failed to load shares cache ({e}), refetching.")
+        return {}
+
+    def save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=0, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def _age_days(self, ticker, today):
+        entry = self.entries.get(ticker)
+        if not entry or not entry.get('shares'):
+            return None
+        return (today - datetime.strptime(entry['updated'], '%Y-%m-%d').date()).days
+
+    def due(self, tickers, force=()):
+        """Tickers to refetch: missing / forced always, stale ones oldest first (capped)"""
+        today = datetime.now().date()
+        ages = {t: self._age_days(t, today) for t in tickers}
+        urgent = [t for t in tickers if ages[t] is None or t in force]
+        stale = sorted((t for t in tickers if t not in urgent and ages[t] >= SHARES_MAX_AGE_DAYS),
+                       key=lambda t: -ages[t])
+        return urgent + stale[:SHARES_REFRESH_PER_RUN]
+
+    def _fetch_one(self, ticker, refresh=False):
+        return self.shares_reader(FETCH_MAP.get(ticker, ticker.replace('.', '-')), refresh=refresh)
+
+    def refresh(self, tickers, force=()):
+        """Refetch due tickers and save. Returns the number updated."""
+        due = self.due(tickers, force)
+        if not due:
+            print(f"📦 Shares outstanding: all {len(tickers)} cached entries are fresh.")
+            return 0
+
+        print(f"📦 Refreshing shares outstanding for {len(due)}/{len(tickers)} tickers...")
+        today_str = datetime.now().strftime('%Y-%m-%d')
+        updated = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._fetch_one, t, t in force): t for t in due}
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    shares = future.result()
+                except Exception as e:
+                    print(f"   ⚠️ {ticker}: {e} (keeping cached shares)")
+                    continue
+                if shares:
+                    self.entries[ticker] = {"shares": int(shares), "updated": today_str}
+                    updated += 1
+        self.save()
+        print(f"   ✓ Updated {updated} entries.")
+        return updated
+
+    def market_caps(self, closes):
+        """{ticker: shares x close} for a ticker -> latest close mapping (0 if shares unknown)"""
+        caps = {}
+        for ticker, close in closes.items():
+            entry = self.entries.get(ticker)
+            caps[ticker] = int(entry['shares'] * close) if entry and entry.get('shares') and close == close else 0
+        return caps
@@ -0,0 +1,203 @@
+import os
+import json
+from datetime import datetime, timedelta
+from scripts.config import (
+    PATHS, REQUIRED_TICKERS, FALLBACK_TICKERS, SECTOR_OVERRIDES, EXCHANGE_OVERRIDES,
+    UNIVERSE_TTL_HOURS, EXCHANGE_TTL_DAYS, UNIVERSE_DIFF_HISTORY
+)
+from scripts.core.http_cache import fdr_listing
+
+TIME_FMT = '%Y-%m-%d %H:%M:%S'
+
+def normalize_tickers(symbols):
+    """
+    Canonical ticker list: dual class shares in dot format
+    (FDR may return BRKB or BRK-B, we normalize to BRK.B).
+    """
+    tickers = list(symbols)
+    for t in REQUIRED_TICKERS:
+        t_hyphen = t.replace('.', '-')  # BRK.B -> BRK-B
+        t_concat = t.replace('.', '')   # BRK.B -> BRKB
+
+        # Remove any variant formats
+        if t_hyphen in tickers:
+            tickers.remove(t_hyphen)
+        if t_concat in tickers:
+            tickers.remove(t_concat)
+
+        # Add the canonical dot format
+        if t not in tickers:
+            tickers.append(t)
+    return sorted(set(tickers))
+
+class UniverseService:
+    """
+    Single cached source for the S&P 500 universe, sectors, names and exchanges.
+    - SP500 listing: fetched at most once per UNIVERSE_TTL_HOURS
+    - NASDAQ / NYSE / AMEX listings: at most once per EXCHANGE_TTL_DAYS (or when
+      a new member has no exchange yet); only members' exchanges are kept
+    Stored compactly in data/universe.json and served from plain dicts (O(1)).
+    Every SP500 refresh that changes membership appends {date, added, removed}
+    to data/universe_changes.json (see last_diff).
+    If a fetch fails, the previous cache is used (FALLBACK_TICKERS if none).
+    """
+
+    def __init__(self, path=None, changes_path=None, listing_reader=None):
+        self.path = path or PATHS['UNIVERSE']
+        self.changes_path = changes_path or PATHS['UNIVERSE_CHANGES']
+        # Listing provider: callable(market) -> DataFrame with Symbol[, Name, Sector].
+        # Defaults to FDR through the shared HTTP cache; tests can inject a local stub.
+        self.listing_reader = listing_reader or fdr_listing
+        self.data = self._load()
+        self.last_diff = None
+        self._loaded = False
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"⚠️ Failed to load universe cache ({e}), refetching.")
+        return {}
+
+    def _save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=0, sort_keys=True, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def _expired(stamp, ttl):
+        if not stamp:
+            return True
+        return datetime.now() - datetime.strptime(stamp, TIME_FMT) >= ttl
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+    def refresh(self, force=False):
+        """Refetch expired listings (force=True refetches both). Called lazily by lookups."""
+        self._loaded = True
+        changed = False
+        added = []
+        if force or self._expired(self.data.get('sp500_fetched_at'), timedelta(hours=UNIVERSE_TTL_HOURS)):
+            added = self._refresh_sp500()
+            changed = True
+        members = self.data.get('sp500', {})
+        missing_exchange = [t for t in added if t not in self.data.get('exchanges', {})]
+        if members and (force or missing_exchange or
+                        self._expired(self.data.get('exchanges_fetched_at'), timedelta(days=EXCHANGE_TTL_DAYS))):
+            self._refresh_exchanges()
+            changed = True
+        if changed:
+            self._save()
+
+    def _refresh_sp500(self):
+        """Fetch the SP500 listing and record the membership diff. Returns added tickers."""
+        try:
+            sp500 = self.listing_reader('SP500')
+            symbols = sp500['Symbol'].tolist()
+        except Exception as e:
+            print(f"⚠️ SP500 listing fetch failed ({e}), using cached universe.")
+            return []
+
+        names = dict(zip(sp500['Symbol'], sp500['Name'])) if 'Name' in sp500 else {}
+        sectors = dict(zip(sp500['Symbol'], sp500['Sector'])) if 'Sector' in sp500 else {}
+        members = {}
+        for t in normalize_tickers(symbols):
+            raw = next((s for s in (t, t.replace('.', '-'), t.replace('.', '')) if s in sectors or s in names), t)
+            members[t] = [names.get(raw), SECTOR_OVERRIDES.get(t, sectors.get(raw))]
+
+        old = set(self.data.get('sp500', {}))
+        added = sorted(set(members) - old) if old else []
+        removed = sorted(old - set(members))
+        self.data['sp500'] = members
+        self.data['sp500_fetched_at'] = datetime.now().strftime(TIME_FMT)
+        if added or removed:
+            self._record_diff(added, removed)
+        print(f"🌐 Universe refreshed: {len(members)} S&P 500 members (+{len(added)} / -{len(removed)})")
+        return added
+
+    def _refresh_exchanges(self):
+        listed = {}
+        for market in ('NASDAQ', 'NYSE', 'AMEX'):
+            # Survive individual listing failures
+            try:
+                for t in self.listing_reader(market)['Symbol']:
+                    listed[t] = market
+            except Exception as e:
+                print(f"⚠️ {market} listing fetch failed ({e}).")
+        if not listed:
+            return
+
+        members = self.data.get('sp500', {})
+        exchanges = {}
+        for t in members:
+            for sym in (t, t.replace('.', '-'), t.replace('.', '')):
+                if sym in listed:
+                    exchanges[t] = listed[sym]
+                    break
+        exchanges.update({t: ex for t, ex in EXCHANGE_OVERRIDES.items() if t in members})  # Manual overrides
+        self.data['exchanges'] = exchanges
+        self.data['exchanges_fetched_at'] = datetime.now().strftime(TIME_FMT)
+
+    def _record_diff(self, added, removed):
+        self.last_diff = {"date": datetime.now().strftime('%Y-%m-%d'), "added": added, "removed": removed}
+        history = []
+        if os.path.exists(self.changes_path):
+            try:
+                with open(self.changes_path, 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+            except Exception:
+                history = []
+        history = (history + [self.last_diff])[-UNIVERSE_DIFF_HISTORY:]
+        tmp = self.changes_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=2)
+        os.replace(tmp, self.changes_path)
+        print(f"   ➕ Added: {added}  ➖ Removed: {removed}")
+
+    def _ensure(self):
+        if not self._loaded:
+            self.refresh()
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def tickers(self):
+        """Sorted S&P 500 tickers (canonical dot format)"""
+        self._ensure()
+        members = self.data.get('sp500')
+        if not members:
+            return normalize_tickers(FALLBACK_TICKERS)
+        return sorted(members)
+
+    def is_member(self, ticker):
+        self._ensure()
+        return ticker in self.data.get('sp500', {})
+
+    def name(self, ticker):
+        self._ensure()
+        return (self.data.get('sp500', {}).get(ticker) or [None, None])[0]
+
+    def sector(self, ticker):
+        self._ensure()
+        return (self.data.get('sp500', {}).get(ticker) or [None, None])[1]
+
+    def sectors(self):
+        """{ticker: sector} (manual overrides applied)"""
+        self._ensure()
+        return {t: v[1] for t, v in self.data.get('sp500', {}).items() if v[1]}
+
+    def exchange(self, ticker, default=None):
+        self._ensure()
+        return self.data.get('exchanges', {}).get(ticker, default)
+
+    def exchanges(self):
+        """{ticker: NASDAQ / NYSE / AMEX} for members (manual overrides applied)"""
+        self._ensure()
+        return dict(self.data.get('exchanges', {}))
+
+# Shared instance (one listing fetch per TTL for every caller in the process)
+universe = UniverseService()
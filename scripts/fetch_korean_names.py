@@ -9,12 +9,17 @@ Output:
     Creates/updates scripts/data/sp500_korean_names_naver.py
 """
 
-import requests
+import os
+import sys
 import json
-import time
 import re
 from pathlib import Path
 
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.core.http_cache import http_get
+
 # Naver Finance API for US stocks
 # Example: https://api.stock.naver.com/stock/TSLA/basic
 NAVER_API_URL = "https://api.stock.naver.com/stock/{ticker}/basic"
@@ -27,7 +32,13 @@ HEADERS = {
 }
 
 def get_sp500_tickers():
-    """Load S&P 500 tickers from existing file."""
+    """Load S&P 500 tickers (cached universe, existing names file as fallback)."""
+    try:
+        from scripts.core.universe import universe
+        return universe.tickers()
+    except Exception as e:
+        print(f"⚠️ Universe unavailable ({e}), using existing names file.")
+
     # Read from existing Korean names file to get ticker list
     names_path = Path(__file__).parent / "data" / "sp500_korean_names.py"
     
@@ -47,7 +58,7 @@ def fetch_korean_name(ticker: str) -> str | None:
         # Handle tickers with dots (BRK.B -> BRKB for some APIs)
         url = NAVER_API_URL.format(ticker=ticker.replace(".", ""))
         
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        response = http_get('naver.basic', url, headers=HEADERS, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -59,7 +70,7 @@ def fetch_korean_name(ticker: str) -> str | None:
         # Try with original ticker format
         if "." in ticker:
             url = NAVER_API_URL.format(ticker=ticker)
-            response = requests.get(url, headers=HEADERS, timeout=10)
+            response = http_get('naver.basic', url, headers=HEADERS, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 return data.get("stockName")
@@ -90,9 +101,6 @@ def main():
             failed.append(ticker)
             print(f"  [{i+1}/{len(tickers)}] {ticker}: FAILED")
         
-        # Rate limiting: 0.5 second delay
-        time.sleep(0.5)
-    
     print(f"\n✅ Success: {len(results)} | ❌ Failed: {len(failed)}")
     
     if results:
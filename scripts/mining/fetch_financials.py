@@ -2,7 +2,6 @@
 import os
 import sys
 import pandas as pd
-import yfinance as yf
 import json
 from datetime import datetime, timedelta
 import time
@@ -10,9 +9,12 @@ import time
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from scripts.config import PATHS, FETCH_MAP
+from scripts.core.universe import universe
+from scripts.core.http_cache import yahoo_info
 
-def update_financials(mode='smart'):
-    print(f"\n💰 [Financials Update] Starting... (Mode: {mode})")
+def update_financials(mode='smart', tickers=None):
+    """Update financials.csv ('smart': recent earnings + new members, 'all': everything, or explicit tickers)"""
+    print(f"\n💰 [Financials Update] Starting... (Mode: {'tickers' if tickers else mode})")
     
     # 1. Load existing financials
     csv_path = PATHS['FINANCIAL_INFO']
@@ -32,7 +34,11 @@ def update_financials(mode='smart'):
     # 2. Determine target tickers
     targets = []
     
-    if mode == 'smart':
+    if tickers:
+        # Explicit list (e.g. onboarding of new index members)
+        targets = list(tickers)
+
+    elif mode == 'smart':
         # Check calendar_data.json for earnings
         cal_path = os.path.join(os.path.dirname(csv_path), 'calendar_data.json')
         if os.path.exists(cal_path):
@@ -67,11 +73,17 @@ def update_financials(mode='smart'):
                     targets.append(ticker)
         else:
             print("⚠️ calendar_data.json not found. Skipping smart update.")
+
+        # New index members (cached universe) that have no financials yet
+        known = set(existing_tickers)
+        missing = [t for t in universe.tickers() if t not in known]
+        if missing:
+            print(f"🆕 {len(missing)} S&P 500 members without financials: {missing[:10]}")
+            targets.extend(missing)
             
     elif mode == 'all':
-        # Update ALL existing tickers (plus any new ones if passed/found?)
-        # For now, just refresh existing list
-        targets = existing_tickers
+        # Update ALL existing tickers plus current S&P 500 members (cached universe)
+        targets = existing_tickers + universe.tickers()
         if not targets:
             # Fallback if empty file
             targets = ['AAPL', 'MSFT', 'GOOGL'] # minimal fallback
@@ -111,22 +123,18 @@ def update_financials(mode='smart'):
         print(f"   Fetching batch {i//chunk_size + 1}/{len(yf_tickers_list)//chunk_size + 1} ({len(chunk)} stocks)...")
         
         try:
-            batch = yf.Tickers(" ".join(chunk))
-            
-            # yf.Tickers.tickers is dict {sym: Ticker}
-            # Note: keys in batch.tickers might be upper case or standardized
-            
-            for yf_sym, ticker_obj in batch.tickers.items():
+            # .info is one request per symbol either way (yf.Tickers does not batch it);
+            # yahoo_info shares the cached .info with consensus / shares outstanding
+            for yf_sym in chunk:
                 try:
                     # Find original ticker
-                    # batch.tickers keys usually match the input list, but sometimes yf normalizes
                     original_ticker = fetch_map_list.get(yf_sym, fetch_map_list.get(yf_sym.upper()))
                     
                     if not original_ticker:
                         # Reverse lookup fallback (unlikely needed)
                         continue
 
-                    info = ticker_obj.info
+                    info = yahoo_info(yf_sym)
                     if not info:
                         continue
                     
@@ -0,0 +1,64 @@
+"""
+Compile the Tailwind classes used by templates/ into assets/tailwind.css.
+generator.py / preview_gen.py inline that stylesheet instead of loading the
+Tailwind CDN (no network fetch, no in-browser JIT per slide).
+
+Re-run after editing templates:
+    python scripts/social_gen/build_css.py
+
+Tailwind CLI lookup: $TAILWINDCSS_BIN, `tailwindcss` on PATH, else
+`npx tailwindcss@3`. The templates are written for the v3 Play CDN, so the CLI
+must be v3 (v4 changes defaults such as the bare `border` color, rings and
+the color space).
+"""
+import os
+import re
+import sys
+import shutil
+import tempfile
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__)) # scripts/social_gen
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+ASSETS_DIR = os.path.join(BASE_DIR, 'assets')
+OUTPUT_CSS = os.path.join(ASSETS_DIR, 'tailwind.css')
+
+def find_cli():
+    if os.environ.get('TAILWINDCSS_BIN'):
+        return [os.environ['TAILWINDCSS_BIN']]
+    if shutil.which('tailwindcss') and cli_major_version([shutil.which('tailwindcss')]) == 3:
+        return [shutil.which('tailwindcss')]
+    if shutil.which('npx'):
+        return [shutil.which('npx'), '--yes', 'tailwindcss@3']
+    return None
+
+def cli_major_version(cli):
+    out = subprocess.run(cli + ['--help'], capture_output=True, text=True, timeout=300)
+    match = re.search(r'tailwindcss v(\d+)', out.stdout + out.stderr)
+    return int(match.group(1)) if match else 3
+
+def build_css():
+    cli = find_cli()
+    if cli is None:
+        print("❌ Tailwind v3 CLI not found (set TAILWINDCSS_BIN or install Node.js for npx)")
+        sys.exit(1)
+
+    major = cli_major_version(cli)
+    if major != 3:
+        print(f"❌ {cli[0]} is Tailwind v{major}; the templates need v3 (Play CDN defaults)")
+        sys.exit(1)
+
+    templates_glob = os.path.join(TEMPLATES_DIR, '*.html').replace(os.sep, '/')
+    with tempfile.TemporaryDirectory() as tmp:
+        input_css = os.path.join(tmp, 'input.css')
+        with open(input_css, 'w', encoding='utf-8') as f:
+            f.write('@tailwind base;\n@tailwind components;\n@tailwind utilities;\n')
+
+        cmd = cli + ['-i', input_css, '-o', OUTPUT_CSS, '--minify', '--content', templates_glob]
+        print("🎨 Compiling template CSS with Tailwind v3...")
+        subprocess.run(cmd, check=True)
+
+    print(f"✅ Wrote {OUTPUT_CSS} ({os.path.getsize(OUTPUT_CSS) / 1024:.1f} KB)")
+
+if __name__ == "__main__":
+    build_css()
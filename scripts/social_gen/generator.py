@@ -2,16 +2,15 @@
 import asyncio
 import os
 import json
+import re
 import base64
 import io
 import nest_asyncio
 from datetime import datetime, timedelta
 from jinja2 import Environment, FileSystemLoader
-from playwright.async_api import async_playwright
 import matplotlib.pyplot as plt
-import yfinance as yf
-import pandas as pd
 import requests
+from slide_cache import SlideCache
 
 # Apply nest_asyncio
 nest_asyncio.apply()
@@ -26,6 +25,23 @@ OUTPUT_DIR = os.path.join(BASE_DIR, 'output')
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Concurrent Chromium pages used to render slides
+RENDER_WORKERS = int(os.environ.get('NASPICK_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Screenshot settings (also part of the render cache key)
+VIEWPORT = {"width": 1080, "height": 1080}
+DEVICE_SCALE_FACTOR = 2
+
+# Readiness signal (replaces a fixed sleep): web fonts loaded and styles
+# applied (two animation frames after load)
+READY_JS = """async () => {
+    await document.fonts.ready;
+    await new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    return true;
+}"""
+
+TAILWIND_CDN_RE = re.compile(r"<script src=[\'\"]https://cdn\.tailwindcss\.com[^>]*></script>\s*")
+
 def load_json(filename):
     path = os.path.join(DATA_DIR, filename)
     if not os.path.exists(path):
@@ -41,30 +57,24 @@ def get_style_css():
             return f.read()
     return ""
 
-def calculate_technical_indicators(ticker):
-    """Fetch history and calculate MACD, RSI for Golden Cross/Oversold check"""
-    try:
-        df = yf.Ticker(ticker).history(period="3mo")
-        if len(df) < 26:
-            return None
-
-        # RSI (14)
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
+def get_tailwind_css():
+    """Precompiled Tailwind for the templates (build_css.py), None if not built"""
+    path = os.path.join(ASSETS_DIR, 'tailwind.css')
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    print("⚠️ assets/tailwind.css missing (run build_css.py), falling back to the Tailwind CDN")
+    return None
 
-        # MACD (12, 26, 9)
-        exp1 = df['Close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['Close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = exp1 - exp2
-        df['Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        
-        return df
-    except Exception as e:
-        print(f"❌ Tech calc failed for {ticker}: {e}")
-        return None
+def inline_tailwind(content, tailwind_css):
+    """Swap the template's Tailwind CDN script for the precompiled stylesheet"""
+    if tailwind_css is None:
+        # Inject tailwind if missing (safety net)
+        if "cdn.tailwindcss.com" not in content:
+            content = content.replace("<head>", "<head><script src='https://cdn.tailwindcss.com'></script>")
+        return content
+    content = TAILWIND_CDN_RE.sub("", content)
+    return content.replace("</head>", f"<style>{tailwind_css}</style></head>", 1)
 
 def get_real_data():
     stocks = load_json('data.json')
@@ -224,141 +234,193 @@ def chunk_list(lst, n):
     for i in range(0, len(lst), n):
         yield lst[i:i + n]
 
-async def generate_images():
-    print(f"🚀 Generating Premium Briefing (Top 25 Mode)...")
+def build_slides(data):
+    """Ordered [(template, output png, context)] for the daily briefing"""
+    base_slides = [
+        ("01_cover.html", "01_cover.png", {}),
+        ("06_cta.html", "07_cta.png", {
+            "slide_title": "NEXT LEVEL INVESTING"
+        })
+    ]
     
-    # NEW: Clean output directory first to prevent stale images
-    for f in os.listdir(OUTPUT_DIR):
-        if f.endswith(".png"):
-            os.remove(os.path.join(OUTPUT_DIR, f))
-    print(f"🧹 Output directory cleaned.")
+    # 1. Tier Flux Pagination
+    tier_paginated = []
+    in_flux = data['league_flux']['in']
+    out_flux = data['league_flux']['out']
+    max_len = max(len(in_flux), len(out_flux))
     
-    env = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
-    style_css = get_style_css()
-    data = get_real_data()
+    if max_len == 0:
+        tier_paginated.append(("02_tier.html", "02_tier.png", {
+            "slide_title": "👑 NEW 1티어, 왕좌의 교체",
+            "in_stocks": [], "out_stocks": []
+        }))
+    else:
+        chunks_count = (max_len + 3) // 4
+        for i in range(chunks_count):
+            idx_str = "" if chunks_count == 1 else f" ({i+1}/{chunks_count})"
+            fname = "02_tier.png" if i == 0 else f"02_tier_{i+1}.png"
+            
+            tier_paginated.append(("02_tier.html", fname, {
+                "slide_title": "👑 NEW 1티어, 왕좌의 교체" + idx_str,
+                "in_stocks": in_flux[i*4 : (i+1)*4],
+                "out_stocks": out_flux[i*4 : (i+1)*4]
+            }))
+
+    # 2. Content Slides (Oversold, Golden, Candles)
+    paginated_types = [
+        ('oversold', '03_oversold.html', '03_oversold', "📉 지금이 줍줍 찬스?!", "RSI < 30 (과매도) 진입한 1티어", "oversold"),
+        ('golden_cross', '04_golden.html', '04_golden', "🚀 돈 들어왔다! 골든크로스", "MACD 골든크로스 발생한 상승 전환 종목", "list"),
+        ('bullish_candles', '04_golden.html', '05_candles', "🕯️ 상승 시그널 떴다!", "강력한 상승 반전형 캔들 패턴 포착", "candle")
+    ]
     
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page(viewport={"width": 1080, "height": 1080}, device_scale_factor=2)
-        
-        base_slides = [
-            ("01_cover.html", "01_cover.png", {}),
-            ("06_cta.html", "07_cta.png", {
-                "slide_title": "NEXT LEVEL INVESTING"
-            })
-        ]
-        
-        # 1. Tier Flux Pagination
-        tier_paginated = []
-        in_flux = data['league_flux']['in']
-        out_flux = data['league_flux']['out']
-        max_len = max(len(in_flux), len(out_flux))
+    final_slides = []
+    for key, tmpl, prefix, title, subtitle, mode in paginated_types:
+        items = data[key]
+        chunks = list(chunk_list(items, 4))
         
-        if max_len == 0:
-            tier_paginated.append(("02_tier.html", "02_tier.png", {
-                "slide_title": "👑 NEW 1티어, 왕좌의 교체",
-                "in_stocks": [], "out_stocks": []
+        if not chunks:
+             final_slides.append((tmpl, f"{prefix}.png", {
+                "slide_title": title, "subtitle": subtitle, "items": [], "mode": mode
             }))
         else:
-            chunks_count = (max_len + 3) // 4
-            for i in range(chunks_count):
-                idx_str = "" if chunks_count == 1 else f" ({i+1}/{chunks_count})"
-                fname = "02_tier.png" if i == 0 else f"02_tier_{i+1}.png"
+            for i, chunk in enumerate(chunks):
+                idx_str = "" if len(chunks) == 1 else f" ({i+1}/{len(chunks)})"
+                fname = f"{prefix}.png" if i == 0 else f"{prefix}_{i+1}.png"
                 
-                tier_paginated.append(("02_tier.html", fname, {
-                    "slide_title": "👑 NEW 1티어, 왕좌의 교체" + idx_str,
-                    "in_stocks": in_flux[i*4 : (i+1)*4],
-                    "out_stocks": out_flux[i*4 : (i+1)*4]
+                final_slides.append((tmpl, fname, {
+                    "slide_title": title + idx_str, "subtitle": subtitle, "items": chunk, "mode": mode
                 }))
-
-        # 2. Content Slides (Oversold, Golden, Candles)
-        paginated_types = [
-            ('oversold', '03_oversold.html', '03_oversold', "📉 지금이 줍줍 찬스?!", "RSI < 30 (과매도) 진입한 1티어", "oversold"),
-            ('golden_cross', '04_golden.html', '04_golden', "🚀 돈 들어왔다! 골든크로스", "MACD 골든크로스 발생한 상승 전환 종목", "list"),
-            ('bullish_candles', '04_golden.html', '05_candles', "🕯️ 상승 시그널 떴다!", "강력한 상승 반전형 캔들 패턴 포착", "candle")
-        ]
-        
-        final_slides = []
-        for key, tmpl, prefix, title, subtitle, mode in paginated_types:
-            items = data[key]
-            chunks = list(chunk_list(items, 4))
+                
+    # 3. Earnings Pagination
+    earnings_slides = []
+    recent_all = data['earnings']['recent']
+    upcoming_all = data['earnings']['upcoming']
+    max_items = max(len(recent_all), len(upcoming_all))
+    
+    if max_items == 0:
+        earnings_slides.append(("05_calendar.html", "06_earnings.png", {
+            "slide_title": "📊 실적발표! 서프라이즈?",
+            "recent": [],
+            "upcoming": []
+        }))
+    else:
+        pages_needed = (max_items + 4) // 5 
+        for page_idx in range(pages_needed):
+            idx_str = "" if pages_needed == 1 else f" ({page_idx+1}/{pages_needed})"
+            fname = "06_earnings.png" if page_idx == 0 else f"06_earnings_{page_idx+1}.png"
             
-            if not chunks:
-                 final_slides.append((tmpl, f"{prefix}.png", {
-                    "slide_title": title, "subtitle": subtitle, "items": [], "mode": mode
-                }))
-            else:
-                for i, chunk in enumerate(chunks):
-                    idx_str = "" if len(chunks) == 1 else f" ({i+1}/{len(chunks)})"
-                    fname = f"{prefix}.png" if i == 0 else f"{prefix}_{i+1}.png"
-                    
-                    final_slides.append((tmpl, fname, {
-                        "slide_title": title + idx_str, "subtitle": subtitle, "items": chunk, "mode": mode
-                    }))
-                    
-        # 3. Earnings Pagination
-        earnings_slides = []
-        recent_all = data['earnings']['recent']
-        upcoming_all = data['earnings']['upcoming']
-        max_items = max(len(recent_all), len(upcoming_all))
-        
-        if max_items == 0:
-            earnings_slides.append(("05_calendar.html", "06_earnings.png", {
-                "slide_title": "📊 실적발표! 서프라이즈?",
-                "recent": [],
-                "upcoming": []
+            recent_chunk = recent_all[page_idx*5 : (page_idx+1)*5]
+            upcoming_chunk = upcoming_all[page_idx*5 : (page_idx+1)*5]
+            
+            earnings_slides.append(("05_calendar.html", fname, {
+                "slide_title": "📊 실적발표! 서프라이즈?" + idx_str,
+                "recent": recent_chunk,
+                "upcoming": upcoming_chunk
             }))
-        else:
-            pages_needed = (max_items + 4) // 5 
-            for page_idx in range(pages_needed):
-                idx_str = "" if pages_needed == 1 else f" ({page_idx+1}/{pages_needed})"
-                fname = "06_earnings.png" if page_idx == 0 else f"06_earnings_{page_idx+1}.png"
-                
-                recent_chunk = recent_all[page_idx*5 : (page_idx+1)*5]
-                upcoming_chunk = upcoming_all[page_idx*5 : (page_idx+1)*5]
-                
-                earnings_slides.append(("05_calendar.html", fname, {
-                    "slide_title": "📊 실적발표! 서프라이즈?" + idx_str,
-                    "recent": recent_chunk,
-                    "upcoming": upcoming_chunk
-                }))
 
-        # Re-construct orderly list
-        ordered = []
-        ordered.append(base_slides[0]) # Cover
-        
-        for tp in tier_paginated: ordered.append(tp)
-        for fs in final_slides: 
-            if "oversold" in fs[1]: ordered.append(fs)
-        for fs in final_slides: 
-            if "golden" in fs[1]: ordered.append(fs)
-        for fs in final_slides: 
-            if "candles" in fs[1]: ordered.append(fs)
-        for es in earnings_slides: ordered.append(es)
-        
-        ordered.append(base_slides[1]) # CTA
-        
-        for template_name, output_name, ctx in ordered:
-            print(f"📸 {output_name}...")
-            full_ctx = {
-                "style_css": style_css, 
-                "date_string": data['date_string'],
-                **ctx
-            }
+    # Re-construct orderly list
+    ordered = []
+    ordered.append(base_slides[0]) # Cover
+    
+    for tp in tier_paginated: ordered.append(tp)
+    for fs in final_slides: 
+        if "oversold" in fs[1]: ordered.append(fs)
+    for fs in final_slides: 
+        if "golden" in fs[1]: ordered.append(fs)
+    for fs in final_slides: 
+        if "candles" in fs[1]: ordered.append(fs)
+    for es in earnings_slides: ordered.append(es)
+    
+    ordered.append(base_slides[1]) # CTA
+    return ordered
+
+def render_html(env, template_name, ctx, style_css, tailwind_css, date_string):
+    full_ctx = {
+        "style_css": style_css, 
+        "date_string": date_string,
+        **ctx
+    }
+    content = env.get_template(template_name).render(full_ctx)
+    return inline_tailwind(content, tailwind_css)
+
+async def render_slides(jobs, workers=None, out_dir=OUTPUT_DIR):
+    """
+    Screenshot [(output png, html)] into out_dir with a pool of Chromium pages.
+    Each job writes to its own fixed file name, so results are identical
+    to a sequential run regardless of completion order.
+    """
+    from playwright.async_api import async_playwright  # only needed to render (preview_gen reuses the HTML helpers)
+
+    workers = max(1, min(workers or RENDER_WORKERS, len(jobs) or 1))
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    failed = []
+
+    async def worker(context):
+        page = await context.new_page()
+        while True:
+            try:
+                output_name, content = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
             try:
-                content = env.get_template(template_name).render(full_ctx)
-                # Inject tailwind if missing (safety net)
-                if "cdn.tailwindcss.com" not in content:
-                    content = content.replace("<head>", "<head><script src='https://cdn.tailwindcss.com'></script>")
-                    
-                await page.set_content(content)
-                await page.wait_for_timeout(200)
-                await page.screenshot(path=os.path.join(OUTPUT_DIR, output_name), type='png')
+                await page.set_content(content, wait_until="load")
+                await page.evaluate(READY_JS)
+                await page.screenshot(path=os.path.join(out_dir, output_name), type='png')
+                print(f"📸 {output_name}")
             except Exception as e:
+                failed.append(output_name)
                 print(f"❌ Failed to generate {output_name}: {e}")
-            
+        await page.close()
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        # One context per worker (isolated, renders in parallel)
+        contexts = [await browser.new_context(viewport=VIEWPORT, device_scale_factor=DEVICE_SCALE_FACTOR)
+                    for _ in range(workers)]
+        await asyncio.gather(*(worker(c) for c in contexts))
         await browser.close()
-        print("✅ Generation Complete.")
+    return failed
+
+async def generate_images():
+    print(f"🚀 Generating Premium Briefing (Top 25 Mode)...")
+    
+    env = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
+    style_css = get_style_css()
+    tailwind_css = get_tailwind_css()
+    data = get_real_data()
+    
+    jobs = []
+    for template_name, output_name, ctx in build_slides(data):
+        try:
+            jobs.append((output_name, render_html(env, template_name, ctx, style_css, tailwind_css, data['date_string'])))
+        except Exception as e:
+            print(f"❌ Failed to generate {output_name}: {e}")
+
+    # Clean output directory (stale images); today's slides come back from
+    # the render cache or a fresh screenshot
+    for f in os.listdir(OUTPUT_DIR):
+        if f.endswith(".png"):
+            os.remove(os.path.join(OUTPUT_DIR, f))
+
+    # Byte-identical slides are copied from the render cache
+    cache = SlideCache(render_opts=f"{VIEWPORT}@{DEVICE_SCALE_FACTOR}")
+    keys = {name: cache.key(content) for name, content in jobs}
+    pending = [(name, content) for name, content in jobs
+               if not cache.fetch(keys[name], os.path.join(OUTPUT_DIR, name))]
+    print(f"♻️ Render cache: {cache.hits} slides reused, {len(pending)} to render")
+
+    if pending:
+        print(f"🖼️ Rendering {len(pending)} slides ({min(RENDER_WORKERS, len(pending))} workers)...")
+        failed = set(await render_slides(pending))
+        for name, _ in pending:
+            if name not in failed:
+                cache.store(keys[name], os.path.join(OUTPUT_DIR, name))
+    evicted = cache.evict()
+    if evicted:
+        print(f"🧹 Evicted {evicted} cached slides.")
+    print("✅ Generation Complete.")
 
 if __name__ == "__main__":
     asyncio.run(generate_images())
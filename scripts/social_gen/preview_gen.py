@@ -1,5 +1,6 @@
 
 import os
+import asyncio
 import json
 import base64
 import io
@@ -7,12 +8,13 @@ import math
 from datetime import datetime, timedelta
 from jinja2 import Environment, FileSystemLoader
 import matplotlib.pyplot as plt
-import yfinance as yf
 import pandas as pd
 import http.server
 import socketserver
 import webbrowser
 import threading
+from slide_cache import SlideCache
+from generator import get_tailwind_css, render_html  # same HTML as the rendered slides
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__)) # scripts/social_gen
@@ -24,6 +26,8 @@ PREVIEW_DIR = os.path.join(BASE_DIR, 'preview')
 
 os.makedirs(PREVIEW_DIR, exist_ok=True)
 
+PREVIEW_PAGES = []  # preview html files of the last generate_preview()
+
 def load_json(filename):
     path = os.path.join(DATA_DIR, filename)
     if not os.path.exists(path):
@@ -38,21 +42,18 @@ def get_style_css():
             return f.read()
     return ""
 
-def calculate_technical_indicators(ticker):
-    try:
-        df = yf.Ticker(ticker).history(period="3mo")
-        if len(df) < 26: return None
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        exp1 = df['Close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['Close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = exp1 - exp2
-        df['Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        return df
-    except: return None
+def calculate_technical_indicators(ticker, panel):
+    """Close / RSI / MACD / Signal history from the engine's indicator panel (no network)"""
+    series = panel.get('tickers', {}).get(ticker)
+    if not series:
+        return None
+    df = pd.DataFrame({
+        'Close': series['close'], 'RSI': series['rsi'],
+        'MACD': series['macd'], 'Signal': series['signal'],
+    }, index=pd.to_datetime(panel['dates'])).dropna(subset=['Close'])
+    if len(df) < 2:
+        return None
+    return df
 
 def get_real_data():
     stocks = load_json('data.json')
@@ -89,9 +90,10 @@ def get_real_data():
     
     # 3. Golden Cross
     golden_cross_candidates = []
+    panel = load_json('indicator_panel.json')
     for s in stocks[:500]: 
         ticker = s['ticker']
-        df = calculate_technical_indicators(ticker)
+        df = calculate_technical_indicators(ticker, panel)
         if df is not None:
             last = df.iloc[-1]
             prev = df.iloc[-2]
@@ -185,6 +187,7 @@ def generate_preview():
     print("🚀 Generating Preview HTMLs...")
     env = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
     style_css = get_style_css()
+    tailwind_css = get_tailwind_css()
     data = get_real_data()
     
     # Earnings pagination (max 5 per side per page)
@@ -278,22 +281,52 @@ def generate_preview():
     for es in earnings_slides: ordered.append(es)  # Earnings (paginated)
     ordered.append(base_slides[1]) # CTA
 
-    # Generate Pages
+    # Generate Pages (unchanged pages are not rewritten)
     preview_links = []
     for tmpl_name, out_name, ctx in ordered:
-        full_ctx = {"style_css": style_css, "date_string": data['date_string'], **ctx}
-        content = env.get_template(tmpl_name).render(full_ctx)
-        
-        # Inject standard style just in case
-        if "https://cdn.tailwindcss.com" not in content:
-             pass # Assumed template has it
-             
+        content = render_html(env, tmpl_name, ctx, style_css, tailwind_css, data['date_string'])
+
         out_path = os.path.join(PREVIEW_DIR, out_name)
+        preview_links.append(out_name)
+        if os.path.exists(out_path):
+            with open(out_path, 'r', encoding='utf-8') as f:
+                if f.read() == content:
+                    continue
         with open(out_path, 'w', encoding='utf-8') as f:
             f.write(content)
-        preview_links.append(out_name)
         print(f"✅ Generated {out_name}")
 
+    PREVIEW_PAGES[:] = preview_links
+    write_dashboard(preview_links)
+
+def render_preview_pngs():
+    """
+    Screenshot the preview pages through the shared slide render cache:
+    only pages whose HTML changed since any earlier render (preview or
+    generator.py) hit Chromium.
+    """
+    from generator import render_slides, VIEWPORT, DEVICE_SCALE_FACTOR
+
+    cache = SlideCache(render_opts=f"{VIEWPORT}@{DEVICE_SCALE_FACTOR}")
+    jobs, keys = [], {}
+    for page in PREVIEW_PAGES:
+        with open(os.path.join(PREVIEW_DIR, page), 'r', encoding='utf-8') as f:
+            content = f.read()
+        png = page.replace('.html', '.png')
+        keys[png] = cache.key(content)
+        if not cache.fetch(keys[png], os.path.join(PREVIEW_DIR, png)):
+            jobs.append((png, content))
+    print(f"♻️ Render cache: {cache.hits} slides reused, {len(jobs)} to render")
+
+    if jobs:
+        failed = set(asyncio.run(render_slides(jobs, out_dir=PREVIEW_DIR)))
+        for png, _ in jobs:
+            if png not in failed:
+                cache.store(keys[png], os.path.join(PREVIEW_DIR, png))
+    cache.evict()
+    write_dashboard(PREVIEW_PAGES)
+
+def write_dashboard(preview_links):
     # Generate Dashboard
     index_html = """
     <!DOCTYPE html>
@@ -323,10 +356,14 @@ def generate_preview():
     for link in preview_links:
         name = link.replace('.html', '').replace('_', ' ').title()
         index_html += f'<a onclick="setFrame(\'{link}\', this)">{name}</a>'
+        png = link.replace('.html', '.png')
+        if os.path.exists(os.path.join(PREVIEW_DIR, png)):
+            index_html += f'<a onclick="setFrame(\'{png}\', this)" style="padding-left: 24px;">↳ PNG</a>'
     
     index_html += """
         <div style="margin-top: 20px; border-top: 1px solid #333; padding-top: 20px;">
             <a href="/refresh" style="color: #4ade80; border: 1px solid #4ade80; text-align: center; border-radius: 4px;">⚡ Refresh All</a>
+            <a href="/render" style="color: #fbbf24; border: 1px solid #fbbf24; text-align: center; border-radius: 4px; margin-top: 10px;">📸 Render PNGs</a>
         </div>
         </div>
         <div id="content">
@@ -353,6 +390,13 @@ class Handler(http.server.SimpleHTTPRequestHandler):
             self.send_header('Location', '/index.html')
             self.end_headers()
             return
+        if self.path == '/render':
+            print("📸 Rendering PNGs...")
+            render_preview_pngs()
+            self.send_response(302)
+            self.send_header('Location', '/index.html')
+            self.end_headers()
+            return
         super().do_GET()
 
 def start_server():
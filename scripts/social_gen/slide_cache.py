@@ -0,0 +1,77 @@
+"""
+Render cache for social slides.
+A slide PNG is stored under the sha1 of its fully rendered HTML (template +
+context + inlined CSS) plus the render settings, so a byte-identical slide is
+copied from the cache instead of being screenshotted again.
+Every template shows the date, so hits come from reruns on the same day
+(a retried snapshot job, preview renders after editing one template).
+Eviction is bounded by entry age and total cache size (oldest use first).
+"""
+import os
+import time
+import shutil
+import hashlib
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__)) # scripts/social_gen
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BASE_DIR)) # Naspick
+SLIDE_CACHE_DIR = os.path.join(PROJECT_ROOT, 'data', 'cache', 'slides')
+SLIDE_CACHE_MAX_AGE_DAYS = float(os.environ.get('NASPICK_SLIDE_CACHE_DAYS', 14))
+SLIDE_CACHE_MAX_MB = float(os.environ.get('NASPICK_SLIDE_CACHE_MB', 200))
+
+class SlideCache:
+    def __init__(self, cache_dir=SLIDE_CACHE_DIR, max_age_days=SLIDE_CACHE_MAX_AGE_DAYS,
+                 max_mb=SLIDE_CACHE_MAX_MB, render_opts=""):
+        """render_opts: viewport / scale etc. (part of every key)"""
+        self.cache_dir = cache_dir
+        self.max_age_s = max_age_days * 86400
+        self.max_bytes = max_mb * 1024 * 1024
+        self.render_opts = render_opts
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, html):
+        h = hashlib.sha1(self.render_opts.encode('utf-8'))
+        h.update(html.encode('utf-8'))
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + '.png')
+
+    def fetch(self, key, dest):
+        """Copy the cached PNG for key to dest. Returns False on a miss."""
+        src = self.path(key)
+        if not os.path.exists(src):
+            self.misses += 1
+            return False
+        shutil.copyfile(src, dest)
+        os.utime(src)  # mtime = last use (eviction order)
+        self.hits += 1
+        return True
+
+    def store(self, key, src):
+        tmp = self.path(key) + '.tmp'
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, self.path(key))
+
+    def evict(self):
+        """Drop entries unused for max_age, then oldest until under max_mb"""
+        now = time.time()
+        entries, removed = [], 0
+        for fname in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, fname)
+            st = os.stat(path)
+            if now - st.st_mtime > self.max_age_s:
+                os.remove(path)
+                removed += 1
+            else:
+                entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
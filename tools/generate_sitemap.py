@@ -1,12 +1,25 @@
 """
 Sitemap Generator for Naspick
-Generates sitemap.xml with current date, stock pages, and sector pages
+Streams a sitemap index (sitemap.xml) plus child sitemaps per language and
+page type (sitemap-ko-pages-1.xml, sitemap-en-stocks-1.xml, ...), each with a
+.gz variant. Stock lastmod comes from a hash ledger, so it only moves when a
+ticker's data really changed.
 """
+import os
+import glob
+import gzip
 import json
+import hashlib
 import datetime
-import os
+from xml.sax.saxutils import escape
 
 BASE_URL = "https://naspick.com"
+MAX_URLS_PER_SITEMAP = 50000  # sitemaps.org limit per child file
+LEDGER_FILE = 'sitemap_ledger.json'
+
+# Item fields whose change counts as a real page update. Daily-moving fields
+# (price, rank, score, signals) are left out, so lastmod does not move every day.
+LEDGER_FIELDS = ('name', 'name_en', 'sector', 'tier', 'consensus', 'calendar', 'financial_health')
 
 # Sector mapping (Korean to URL slug)
 SECTOR_SLUGS = {
@@ -23,18 +36,116 @@ SECTOR_SLUGS = {
     "유틸리티": "utilities"
 }
 
+class _DualFile:
+    """Writes the same bytes to path and path.gz (temp files, renamed on close)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._plain = open(path + '.tmp', 'wb')
+        self._gz = gzip.GzipFile(path + '.gz.tmp', mode='wb', mtime=0)
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        self._plain.write(data)
+        self._gz.write(data)
+
+    def close(self):
+        self._plain.close()
+        self._gz.close()
+        os.replace(self.path + '.tmp', self.path)
+        os.replace(self.path + '.gz.tmp', self.path + '.gz')
+
+class SitemapWriter:
+    """
+    Streams <url> entries into numbered child sitemaps
+    (sitemap-<name>-1.xml, -2.xml, ...), rolling over every max_urls entries.
+    self.files collects (filename, newest lastmod) for the sitemap index.
+    """
+
+    def __init__(self, out_dir, name, max_urls=MAX_URLS_PER_SITEMAP):
+        self.out_dir = out_dir
+        self.name = name
+        self.max_urls = max_urls
+        self.files = []
+        self.count = 0
+        self._fh = None
+        self._lastmod = None
+
+    def _roll(self):
+        self._close_part()
+        filename = f"sitemap-{self.name}-{len(self.files) + 1}.xml"
+        self._fh = _DualFile(os.path.join(self.out_dir, filename))
+        self._fh.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                       '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        self.files.append([filename, None])
+        self._part_count = 0
+
+    def _close_part(self):
+        if self._fh is not None:
+            self._fh.write('</urlset>\n')
+            self._fh.close()
+            self._fh = None
+
+    def add(self, loc, lastmod, changefreq='daily', priority='0.8'):
+        if self._fh is None or self._part_count >= self.max_urls:
+            self._roll()
+        self._fh.write(
+            f'    <url>\n'
+            f'        <loc>{escape(loc)}</loc>\n'
+            f'        <lastmod>{lastmod}</lastmod>\n'
+            f'        <changefreq>{changefreq}</changefreq>\n'
+            f'        <priority>{priority}</priority>\n'
+            f'    </url>\n')
+        part = self.files[-1]
+        part[1] = max(part[1] or lastmod, lastmod)
+        self._part_count += 1
+        self.count += 1
+
+    def close(self):
+        self._close_part()
+        # Remove parts left over from an earlier, larger run
+        keep = {f for f, _ in self.files}
+        for path in glob.glob(os.path.join(self.out_dir, f"sitemap-{self.name}-*.xml")):
+            if os.path.basename(path) not in keep:
+                os.remove(path)
+                if os.path.exists(path + '.gz'):
+                    os.remove(path + '.gz')
+        return self.files
+
+def _item_hash(item):
+    payload = {k: item.get(k) for k in LEDGER_FIELDS}
+    if isinstance(payload['consensus'], dict):
+        # Fetch timestamp changes on every consensus run, the content may not
+        payload['consensus'] = {k: v for k, v in payload['consensus'].items() if k != 'last_updated'}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def load_ledger(path):
+    """{ticker: {"hash": sha1 of LEDGER_FIELDS, "lastmod": YYYY-MM-DD}}"""
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Failed to load sitemap ledger ({e}), resetting lastmod.")
+    return {}
+
+def save_ledger(path, ledger):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(ledger, f, indent=0, sort_keys=True)
+    os.replace(tmp, path)
+
 def generate_sitemap():
     print("🗺️ Generating Sitemap...")
 
-    # Get correct data path relative to script location
+    # Project root: tools/.. when run from tools/, otherwise the working directory
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
+    if not os.path.exists(os.path.join(project_root, 'data', 'data.json')):
+        project_root = '.'
     data_path = os.path.join(project_root, 'data', 'data.json')
-    
-    # Fallback for running from project root
-    if not os.path.exists(data_path):
-        data_path = 'data/data.json'
-    
+    ledger_path = os.path.join(project_root, 'data', LEDGER_FILE)
+
     try:
         with open(data_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -43,99 +154,64 @@ def generate_sitemap():
         return
 
     today = datetime.date.today().isoformat()
-    
-    xml_parts = [
-        '<?xml version="1.0" encoding="UTF-8"?>',
-        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
-        '',
-        '    <!-- Korean Homepage -->',
-        '    <url>',
-        f'        <loc>{BASE_URL}/</loc>',
-        f'        <lastmod>{today}</lastmod>',
-        '        <changefreq>daily</changefreq>',
-        '        <priority>1.0</priority>',
-        '    </url>',
-        '',
-        '    <!-- English Homepage -->',
-        '    <url>',
-        f'        <loc>{BASE_URL}/en/</loc>',
-        f'        <lastmod>{today}</lastmod>',
-        '        <changefreq>daily</changefreq>',
-        '        <priority>1.0</priority>',
-        '    </url>',
-    ]
-
-    # Korean Sector pages
-    xml_parts.append('')
-    xml_parts.append('    <!-- Korean Sector Pages -->')
-    for sector_kr, sector_slug in SECTOR_SLUGS.items():
-        xml_parts.extend([
-            '    <url>',
-            f'        <loc>{BASE_URL}/sector/{sector_slug}</loc>',
-            f'        <lastmod>{today}</lastmod>',
-            '        <changefreq>daily</changefreq>',
-            '        <priority>0.9</priority>',
-            '    </url>',
-        ])
-
-    # English Sector pages
-    xml_parts.append('')
-    xml_parts.append('    <!-- English Sector Pages -->')
-    for sector_kr, sector_slug in SECTOR_SLUGS.items():
-        xml_parts.extend([
-            '    <url>',
-            f'        <loc>{BASE_URL}/en/sector/{sector_slug}</loc>',
-            f'        <lastmod>{today}</lastmod>',
-            '        <changefreq>daily</changefreq>',
-            '        <priority>0.9</priority>',
-            '    </url>',
-        ])
-
-    # Korean Stock pages
-    xml_parts.append('')
-    xml_parts.append('    <!-- Korean Stock Pages -->')
+
+    # lastmod per ticker: only advances when its tracked fields change
+    old_ledger = load_ledger(ledger_path)
+    ledger = {}
+    changed = 0
     for item in data:
         ticker = item.get('ticker')
-        if ticker:
-            xml_parts.extend([
-                '    <url>',
-                f'        <loc>{BASE_URL}/stock/{ticker}</loc>',
-                f'        <lastmod>{today}</lastmod>',
-                '        <changefreq>daily</changefreq>',
-                '        <priority>0.8</priority>',
-                '    </url>',
-            ])
-
-    # English Stock pages
-    xml_parts.append('')
-    xml_parts.append('    <!-- English Stock Pages -->')
+        if not ticker:
+            continue
+        h = _item_hash(item)
+        prev = old_ledger.get(ticker)
+        if prev and prev['hash'] == h:
+            ledger[ticker] = prev
+        else:
+            ledger[ticker] = {"hash": h, "lastmod": today}
+            changed += 1
+    save_ledger(ledger_path, ledger)
+
+    # Sector / home lastmod = newest lastmod of their stocks
+    sector_lastmod = {}
     for item in data:
-        ticker = item.get('ticker')
-        if ticker:
-            xml_parts.extend([
-                '    <url>',
-                f'        <loc>{BASE_URL}/en/stock/{ticker}</loc>',
-                f'        <lastmod>{today}</lastmod>',
-                '        <changefreq>daily</changefreq>',
-                '        <priority>0.8</priority>',
-                '    </url>',
-            ])
-
-    xml_parts.append('</urlset>')
-
-    # Write sitemap
-    sitemap_path = os.path.join(project_root, 'sitemap.xml') if 'project_root' in dir() else 'sitemap.xml'
-    if os.path.exists(os.path.join(project_root, 'sitemap.xml')):
-        sitemap_path = os.path.join(project_root, 'sitemap.xml')
-    else:
-        sitemap_path = 'sitemap.xml'
-        
-    with open(sitemap_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(xml_parts))
-    
+        entry = ledger.get(item.get('ticker'))
+        if entry:
+            sec = item.get('sector')
+            sector_lastmod[sec] = max(sector_lastmod.get(sec, entry['lastmod']), entry['lastmod'])
+    site_lastmod = max((e['lastmod'] for e in ledger.values()), default=today)
+
+    children = []
+    for lang, prefix in (('ko', ''), ('en', '/en')):
+        pages = SitemapWriter(project_root, f"{lang}-pages")
+        pages.add(f"{BASE_URL}{prefix}/", site_lastmod, priority='1.0')
+        for sector_kr, sector_slug in SECTOR_SLUGS.items():
+            pages.add(f"{BASE_URL}{prefix}/sector/{sector_slug}",
+                      sector_lastmod.get(sector_kr, site_lastmod), priority='0.9')
+        children += pages.close()
+
+        stocks = SitemapWriter(project_root, f"{lang}-stocks")
+        for item in data:
+            ticker = item.get('ticker')
+            if ticker:
+                stocks.add(f"{BASE_URL}{prefix}/stock/{ticker}", ledger[ticker]['lastmod'])
+        children += stocks.close()
+
+    # Sitemap index
+    index = _DualFile(os.path.join(project_root, 'sitemap.xml'))
+    index.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+    for filename, lastmod in children:
+        index.write(f'    <sitemap>\n'
+                    f'        <loc>{BASE_URL}/{filename}</loc>\n'
+                    f'        <lastmod>{lastmod}</lastmod>\n'
+                    f'    </sitemap>\n')
+    index.write('</sitemapindex>\n')
+    index.close()
+
     print(f"✅ Sitemap generated: {len(data)} stocks × 2 languages + {len(SECTOR_SLUGS)} sectors × 2 languages")
-    print(f"   Total URLs: {2 + len(SECTOR_SLUGS)*2 + len(data)*2}")
-    print(f"   Updated: {today}")
+    print(f"   Total URLs: {2 + len(SECTOR_SLUGS)*2 + len(data)*2} in {len(children)} child sitemaps")
+    print(f"   lastmod advanced for {changed} stocks")
 
 if __name__ == "__main__":
     generate_sitemap()
@@ -12,8 +12,8 @@ print("🔄 [Init] Setting up paths...", flush=True)
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from scripts.core.consensus import ConsensusManager
-from scripts.core.fetcher import StockDataFetcher
-import json
+from scripts.core.universe import universe
+from scripts.core.calendar_fetcher import CalendarFetcher
 
 def run_daily_update():
     """
@@ -40,17 +40,10 @@ def run_daily_update():
     print("📅 STEP 2: Fetching Calendar Data (Earnings & Dividends)")
     print("="*50)
     try:
-        fetcher = StockDataFetcher()
-        tickers = fetcher.get_sp500_tickers()
-        print(f"   Fetching calendar data for {len(tickers)} tickers...")
+        tickers = universe.tickers()
         
-        calendar_data = fetcher.fetch_calendar_data_bulk(tickers)
-        
-        output_path = os.path.join("data", "calendar_data.json")
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(calendar_data, f, indent=4)
-            
-        print(f"✅ Calendar Data saved to {output_path} ({len(calendar_data)} items)")
+        # Incremental: only tickers whose earnings / dividend window is due
+        CalendarFetcher().update(tickers)
         
     except Exception as e:
         print(f"❌ Calendar Update Failed: {e}")